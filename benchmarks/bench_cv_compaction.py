@@ -0,0 +1,113 @@
+"""Benchmark de la compactación del CV: corte fijo cv_text[:4000] frente a compact_cv_text.
+
+Genera CVs sintéticos (corto, largo con encabezados de página repetidos y uno con un
+solo párrafo de experiencia muy largo) y compara los tokens enviados, el tiempo de
+compactación y qué secciones llegan al modelo. Con --openai además mide la latencia
+real de la extracción con cada texto (requiere OPENAI_API_KEY).
+
+Uso:
+	python benchmarks/bench_cv_compaction.py [--budget 1000] [--repeat 5] [--openai]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+HEADER = "Juan Pérez Soto - Curriculum Vitae"
+PERSONAL = ["Juan Pérez Soto", "RUT 12.345.678-5", "juan.perez@correo.cl", "+56 9 1234 5678", "Santiago, Chile"]
+JOB = "Inspector técnico de obras en proyecto {number} de edificación; supervisión de montaje eléctrico y control de calidad."
+SECTION_MARKERS = ("EXPERIENCIA", "FORMACIÓN", "CERTIFICACIONES")
+
+
+def build_cv(jobs: int, page_size: int = 0, one_paragraph: bool = False) -> str:
+	"""CV con datos personales, experiencia, formación y certificaciones; page_size > 0 agrega encabezado y pie por página"""
+	lines = list(PERSONAL) + ["EXPERIENCIA"]
+	if one_paragraph:
+		lines.append(" ".join(JOB.format(number=number) for number in range(jobs)))
+	else:
+		lines += [JOB.format(number=number) for number in range(jobs)]
+	lines += ["FORMACIÓN", "Ingeniero Constructor, Universidad Adolfo Ibáñez, 2012"]
+	lines += ["CERTIFICACIONES", "Licencia SEC clase A", "Curso de prevención de riesgos, 2019"]
+	if not page_size:
+		return "\n".join(lines)
+	paged = []
+	for page, start in enumerate(range(0, len(lines), page_size), start=1):
+		paged += [HEADER] + lines[start:start + page_size] + [f"Página {page}"]
+	return "\n".join(paged)
+
+
+def sections_kept(text: str) -> str:
+	"""Secciones del CV cuyo encabezado llega al modelo"""
+	return ",".join(marker[:4].lower() for marker in SECTION_MARKERS if marker in text) or "-"
+
+
+def measure_compaction(cv_text: str, budget: int, repeat: int) -> tuple:
+	"""Mejor tiempo de compactación en milisegundos y texto compactado"""
+	best = float("inf")
+	for _ in range(repeat):
+		start = time.perf_counter()
+		compacted = main.compact_cv_text(cv_text, budget)
+		best = min(best, time.perf_counter() - start)
+	return best * 1000, compacted
+
+
+def measure_openai(client, text: str) -> tuple:
+	"""Latencia en segundos y tokens del prompt de una extracción con el texto dado"""
+	prompt = main.CV_EXTRACTION_PROMPT.format(
+		fields="\n\t".join(f"- {name}: {description}" for name, description in main.CV_EXTRACTION_FIELDS.items()),
+		cv_text=text
+	)
+	start = time.perf_counter()
+	response = client.chat.completions.create(
+		model=main.CV_EXTRACTION_MODEL,
+		messages=[
+			{"role": "system", "content": main.CV_EXTRACTION_SYSTEM_PROMPT},
+			{"role": "user", "content": prompt}
+		],
+		temperature=0.3,
+		response_format={"type": "json_object"}
+	)
+	return time.perf_counter() - start, response.usage.prompt_tokens
+
+
+def main_benchmark():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--budget", type=int, default=main.CV_TOKEN_BUDGET)
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--openai", action="store_true", help="mide también la latencia de la llamada a OpenAI")
+	args = parser.parse_args()
+
+	client = None
+	if args.openai:
+		from openai import OpenAI
+		client = OpenAI()
+
+	cvs = [
+		("corto", build_cv(5)),
+		("largo", build_cv(150, page_size=40)),
+		("párrafo", build_cv(150, one_paragraph=True))
+	]
+	print(f"{'CV':>8} {'tokens':>7} {'[:4000]':>8} {'secciones':>15} {'compacto':>9} {'secciones':>15} {'ms':>7}", end="")
+	print(f" {'s [:4000]':>10} {'s compacto':>11}" if client else "")
+	for name, cv_text in cvs:
+		truncated = cv_text[:4000]
+		milliseconds, compacted = measure_compaction(cv_text, args.budget, args.repeat)
+		print(
+			f"{name:>8} {main.count_tokens(cv_text):>7} {main.count_tokens(truncated):>8} {sections_kept(truncated):>15}"
+			f" {main.count_tokens(compacted):>9} {sections_kept(compacted):>15} {milliseconds:>7.2f}",
+			end=""
+		)
+		if client:
+			before, _ = measure_openai(client, truncated)
+			after, _ = measure_openai(client, compacted)
+			print(f" {before:>10.2f} {after:>11.2f}")
+		else:
+			print()
+
+
+if __name__ == "__main__":
+	main_benchmark()
@@ -0,0 +1,84 @@
+"""Benchmark de la extracción de texto de DOCX: python-docx frente al lector en streaming.
+
+Genera DOCX sintéticos con párrafos y tablas (como las plantillas de CV) y compara
+el tiempo, la memoria máxima y la cantidad de texto que obtiene cada método.
+
+Uso:
+	python benchmarks/bench_docx_extraction.py [--paragraphs 100 1000 10000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+import docx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cv_extraction import extract_docx_text  # noqa: E402
+
+LINE = "Inspector técnico de obras con experiencia en proyectos de edificación y montaje eléctrico"
+
+
+def build_docx(paragraph_count: int) -> bytes:
+	"""Construye un DOCX con encabezado, párrafos y una tabla de datos cada 10 párrafos"""
+	document = docx.Document()
+	document.sections[0].header.paragraphs[0].text = "Juan Pérez Soto - Curriculum Vitae"
+	table = document.add_table(rows=3, cols=2)
+	for row, (label, value) in enumerate([("RUT", "12.345.678-5"), ("Correo", "juan@correo.cl"), ("Teléfono", "+56 9 1234 5678")]):
+		table.cell(row, 0).text = label
+		table.cell(row, 1).text = value
+	for number in range(paragraph_count):
+		document.add_paragraph(f"{LINE} {number}")
+		if number % 10 == 9:
+			table = document.add_table(rows=2, cols=3)
+			for column, text in enumerate(("Empresa", "Cargo", "Periodo")):
+				table.cell(0, column).text = text
+			for column, text in enumerate((f"Constructora {number}", "Inspector", "2015 - 2020")):
+				table.cell(1, column).text = text
+	output = BytesIO()
+	document.save(output)
+	return output.getvalue()
+
+
+def extract_python_docx(data: bytes) -> str:
+	"""Método anterior: modelo completo de python-docx, solo doc.paragraphs"""
+	document = docx.Document(BytesIO(data))
+	return "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+def measure(extract, data: bytes, repeat: int) -> tuple:
+	"""Mejor tiempo en segundos, memoria máxima en MB y caracteres extraídos"""
+	best = float("inf")
+	for _ in range(repeat):
+		start = time.perf_counter()
+		text = extract(data)
+		best = min(best, time.perf_counter() - start)
+	tracemalloc.start()
+	extract(data)
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return best, peak / 1024 / 1024, len(text)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--paragraphs", type=int, nargs="+", default=[100, 1000, 10000])
+	parser.add_argument("--repeat", type=int, default=3)
+	args = parser.parse_args()
+
+	methods = [("python-docx", extract_python_docx), ("streaming", extract_docx_text)]
+	print(f"{'párrafos':>9} {'método':>12} {'segundos':>9} {'MB máx':>8} {'caracteres':>11} {'speedup':>8}")
+	for paragraph_count in args.paragraphs:
+		data = build_docx(paragraph_count)
+		baseline = None
+		for name, extract in methods:
+			seconds, peak_mb, characters = measure(extract, data, args.repeat)
+			baseline = baseline or seconds
+			print(f"{paragraph_count:>9} {name:>12} {seconds:>9.3f} {peak_mb:>8.1f} {characters:>11} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+	main()
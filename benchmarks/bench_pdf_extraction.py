@@ -0,0 +1,95 @@
+"""Benchmark de la extracción de texto de PDF por páginas en un pool de procesos.
+
+Genera PDFs sintéticos con texto en cada página y mide el tiempo de extracción
+según el número de páginas y de procesos, junto con los bytes del PDF que se copian
+a los procesos hijos (cada uno recibe el archivo completo).
+
+Uso:
+	python benchmarks/bench_pdf_extraction.py [--pages 8 32 128] [--workers 1 2 4]
+"""
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+
+from PyPDF2 import PageObject, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cv_extraction import _page_ranges, extract_pdf_text  # noqa: E402
+
+LINE = "Inspector tecnico de obras con experiencia en proyectos de edificacion y montaje electrico"
+
+
+def build_pdf(page_count: int, lines_per_page: int = 45) -> bytes:
+	"""Construye un PDF con texto real en cada página"""
+	writer = PdfWriter()
+	font = DictionaryObject({
+		NameObject("/Type"): NameObject("/Font"),
+		NameObject("/Subtype"): NameObject("/Type1"),
+		NameObject("/BaseFont"): NameObject("/Helvetica"),
+	})
+	font_ref = writer._add_object(font)
+	for page_number in range(page_count):
+		page = PageObject.create_blank_page(width=612, height=792)
+		commands = ["BT", "/F1 9 Tf", "40 760 Td", "11 TL"]
+		for line_number in range(lines_per_page):
+			commands.append(f"({LINE} {page_number}-{line_number}) Tj T*")
+		commands.append("ET")
+		stream = DecodedStreamObject()
+		stream.set_data("\n".join(commands).encode("latin-1"))
+		page[NameObject("/Contents")] = writer._add_object(stream)
+		page[NameObject("/Resources")] = DictionaryObject({
+			NameObject("/Font"): DictionaryObject({NameObject("/F1"): font_ref})
+		})
+		writer.add_page(page)
+	output = BytesIO()
+	writer.write(output)
+	return output.getvalue()
+
+
+def timed(data: bytes, workers: int, repeat: int) -> float:
+	"""Mejor tiempo de extracción en segundos"""
+	best = float("inf")
+	for _ in range(repeat):
+		start = time.perf_counter()
+		extract_pdf_text(data, max_workers=workers, min_parallel_pages=0 if workers > 1 else 10**9)
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def copied_bytes(data: bytes, page_count: int, workers: int) -> int:
+	"""Bytes del PDF enviados a los procesos hijos (una copia por rango de páginas)"""
+	if workers <= 1:
+		return 0
+	return len(data) * len(_page_ranges(page_count, min(workers, page_count)))
+
+
+def main():
+	cpu_count = os.cpu_count() or 1
+	default_workers = sorted({1, 2, 4, cpu_count})
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--pages", type=int, nargs="+", default=[8, 32, 128])
+	parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+	parser.add_argument("--repeat", type=int, default=3)
+	args = parser.parse_args()
+
+	print(f"CPUs disponibles: {cpu_count}")
+	print(f"{'páginas':>8} {'MB PDF':>7} {'procesos':>9} {'segundos':>9} {'speedup':>8} {'MB copiados':>12}")
+	for page_count in args.pages:
+		data = build_pdf(page_count)
+		baseline = None
+		for workers in args.workers:
+			# Calentar el pool para no medir el arranque de los procesos
+			if workers > 1:
+				timed(data, workers, 1)
+			seconds = timed(data, workers, args.repeat)
+			baseline = baseline or seconds
+			copied = copied_bytes(data, page_count, workers) / 1024 / 1024
+			print(f"{page_count:>8} {len(data) / 1024 / 1024:>7.2f} {workers:>9} {seconds:>9.3f} {baseline / seconds:>7.2f}x {copied:>12.2f}")
+
+
+if __name__ == "__main__":
+	main()
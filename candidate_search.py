@@ -0,0 +1,592 @@
+"""Búsqueda de candidatos por similitud de embeddings y por palabras clave (BM25).
+
+Los embeddings de cada candidato (estudios, experiencia, certificaciones y resumen)
+se calculan al guardarlo y se comparan en un índice en memoria con similitud coseno
+exacta (NumPy). El proveedor de embeddings es intercambiable: OpenAI en
+producción o un embedder local por hashing, determinista y sin red, para pruebas.
+
+El índice BM25 cubre las columnas de texto con tokenización para español (sin
+tildes, sin palabras vacías y con stemming) y sirve como señal del ranking o como búsqueda
+por palabras clave sin llamar a OpenAI.
+
+`first_pass_scores` combina, vectorizado sobre todos los candidatos, la similitud de
+embeddings, el puntaje BM25, la puntuación de calidad y los años de experiencia: es la
+primera etapa (barata) del ranking en cascada, antes de que el LLM reordene los mejores.
+
+`parse_search_constraints` reconoce en la descripción de la búsqueda los requisitos
+estrictos (años de experiencia, carrera, certificaciones, puntuación mínima) para
+filtrarlos directamente en la consulta a la base de datos.
+
+Este módulo no depende de Streamlit.
+"""
+import hashlib
+import math
+import re
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Campos del candidato que forman el texto del embedding
+EMBEDDING_FIELDS = ("carrera_estudios", "experiencia", "certificaciones", "resumen_ia")
+
+
+def candidate_embedding_text(record: Dict[str, Any]) -> str:
+	"""Texto del candidato que se convierte en embedding"""
+	return "\n".join(str(record[field]) for field in EMBEDDING_FIELDS if record.get(field))
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+	"""Normaliza cada fila a largo 1 (el producto punto pasa a ser la similitud coseno)"""
+	norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+	norms[norms == 0] = 1.0
+	return matrix / norms
+
+
+class HashingEmbedder:
+	"""Embedder local y determinista: palabras y pares de palabras repartidos por hashing en `dimensions` posiciones"""
+
+	def __init__(self, dimensions: int = 256):
+		self.dimensions = dimensions
+		self.name = f"hashing-{dimensions}"
+
+	def _features(self, text: str) -> List[str]:
+		folded = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+		words = re.findall(r"[a-z0-9]+", folded)
+		return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+	def embed(self, texts: Sequence[str]) -> np.ndarray:
+		matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+		for row, text in enumerate(texts):
+			for feature in self._features(text or ""):
+				digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+				value = int.from_bytes(digest, "little")
+				matrix[row, value % self.dimensions] += 1.0 if value >> 63 else -1.0
+		return _normalize_rows(matrix)
+
+
+class OpenAIEmbedder:
+	"""Embedder de OpenAI; `create` recibe una lista de textos y retorna sus vectores"""
+
+	def __init__(self, create: Callable[[List[str]], List[List[float]]], name: str, batch_size: int = 100):
+		self._create = create
+		self.name = name
+		self.batch_size = batch_size
+
+	def embed(self, texts: Sequence[str]) -> np.ndarray:
+		vectors = []
+		for start in range(0, len(texts), self.batch_size):
+			# La API rechaza textos vacíos
+			batch = [text or " " for text in texts[start:start + self.batch_size]]
+			vectors.extend(self._create(batch))
+		return _normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1))
+
+
+class VectorIndex:
+	"""Índice de vectores en memoria, sincronizado por id con la tabla de candidatos
+
+	La similitud es exacta (un producto matriz-vector): el primer puntaje del ranking
+	necesita la de todos los candidatos, no solo la de los más cercanos.
+	"""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._ids: List[Any] = []
+		self._positions: Dict[Any, int] = {}
+		self._signatures: Dict[Any, Any] = {}
+		self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+	def __len__(self):
+		return len(self._ids)
+
+	def stale_ids(self, signatures: Dict[Any, Any]) -> List[Any]:
+		"""ids de `signatures` ({id: firma}) que no están en el índice o cuya firma cambió"""
+		with self._lock:
+			return [
+				item_id for item_id, signature in signatures.items()
+				if item_id not in self._positions or self._signatures[item_id] != signature
+			]
+
+	def sync(self, items: Dict[Any, Tuple[Any, Sequence[float]]], remove_missing: bool = True) -> bool:
+		"""Deja en el índice exactamente `items` ({id: (firma, vector)}); retorna si hubo cambios
+
+		Solo se copian los vectores de las filas nuevas o cuya firma cambió (en las demás
+		el vector puede ser None). Con `remove_missing=False` (`items` es solo una parte de
+		las filas) no se quita nada.
+		"""
+		with self._lock:
+			if not remove_missing:
+				# Las filas que no vienen se conservan con su vector actual
+				items = {**{item_id: (self._signatures[item_id], None) for item_id in self._ids}, **items}
+			if len(items) == len(self._ids) and all(
+				self._signatures.get(item_id) == signature for item_id, (signature, _) in items.items()
+			):
+				return False
+
+			positions = self._positions
+			ids = list(items)
+			changed = [
+				row for row, item_id in enumerate(ids)
+				if item_id not in positions or self._signatures[item_id] != items[item_id][0]
+			]
+			kept = [row for row, item_id in enumerate(ids) if item_id in positions and self._signatures[item_id] == items[item_id][0]]
+
+			dimensions = len(items[ids[changed[0]]][1]) if changed else self._matrix.shape[1]
+			matrix = np.empty((len(ids), dimensions), dtype=np.float32)
+			if kept:
+				matrix[kept] = self._matrix[[positions[ids[row]] for row in kept]]
+			if changed:
+				matrix[changed] = _normalize_rows(np.asarray([items[ids[row]][1] for row in changed], dtype=np.float32))
+
+			self._ids = ids
+			self._positions = {item_id: position for position, item_id in enumerate(ids)}
+			self._signatures = {item_id: items[item_id][0] for item_id in ids}
+			self._matrix = matrix
+			return True
+
+	def similarities(self, query: Sequence[float], ids: Sequence[Any]) -> np.ndarray:
+		"""Similitud coseno exacta de la consulta con cada id de `ids`, en ese orden (0 si no está en el índice)"""
+		with self._lock:
+			scores = np.zeros(len(ids), dtype=np.float32)
+			if not self._ids:
+				return scores
+			query_vector = _normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+			found = [index for index, item_id in enumerate(ids) if item_id in self._positions]
+			if found:
+				rows = np.asarray([self._positions[ids[index]] for index in found], dtype=np.int64)
+				scores[found] = self._matrix[rows] @ query_vector
+			return scores
+
+	def search(self, query: Sequence[float], k: int, allowed_ids=None) -> List[Tuple[Any, float]]:
+		"""Retorna hasta k pares (id, similitud coseno) ordenados de mayor a menor
+
+		Con `allowed_ids` solo se consideran esos ids (p. ej. los que pasaron un prefiltro).
+		"""
+		with self._lock:
+			if not self._ids:
+				return []
+			query_vector = _normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+			if allowed_ids is not None:
+				rows = np.asarray([self._positions[item_id] for item_id in allowed_ids if item_id in self._positions], dtype=np.int64)
+			else:
+				rows = np.arange(len(self._ids))
+			if not len(rows):
+				return []
+			scores = self._matrix[rows] @ query_vector
+			k = min(k, len(rows))
+			top = np.argpartition(-scores, k - 1)[:k]
+			top = top[np.argsort(-scores[top])]
+			return [(self._ids[rows[index]], float(scores[index])) for index in top]
+
+
+# Palabras vacías del español (ya sin tildes)
+SPANISH_STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aqui asi aun cada como con contra cual cuales cuando de del
+desde donde dos durante e el ella ellas ello ellos en entre era eran es esa esas ese eso esos esta estaba estan estar
+estas este esto estos fue fueron ha habia han hasta hay la las le les lo los mas me mi mis muy nada ni no nos nosotros
+o otra otras otro otros para pero poco por porque que quien quienes se sea ser si sin sobre solo son su sus tambien
+tanto te tiene tienen todo todos tu tus u un una unas uno unos y ya busco necesito requiere requerimos buscamos minimo
+""".split())
+
+# Palabras tras las que una sola letra o número es parte del término ("clase A", "licencia B")
+_QUALIFIED_TERMS = frozenset(("clase", "licencia", "tipo", "categoria", "nivel"))
+
+# Sufijos derivativos, del más largo al más corto (stemmer liviano para español)
+_SPANISH_SUFFIXES = (
+	"amientos", "imientos", "amiento", "imiento", "aciones", "uciones", "adoras", "adores", "ancias",
+	"idades", "mente", "acion", "ucion", "adora", "ador", "ancia", "idad", "ismo", "ista", "able", "ible"
+)
+
+
+def stem_es(word: str) -> str:
+	"""Stemmer liviano: quita sufijos derivativos, plurales y la vocal final de género"""
+	if len(word) <= 4 or word.isdigit():
+		return word
+	for suffix in _SPANISH_SUFFIXES:
+		if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+			return word[:-len(suffix)]
+	if word.endswith("es") and len(word) > 5 and word[-3] not in "aeiou":
+		word = word[:-2]
+	elif word.endswith("s"):
+		word = word[:-1]
+	if word[-1] in "aoe" and len(word) > 4:
+		word = word[:-1]
+	return word
+
+
+def tokenize_es(text: str) -> List[str]:
+	"""Tokeniza texto en español: minúsculas, sin tildes, sin palabras vacías y con stemming"""
+	if not text:
+		return []
+	folded = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+	words = re.findall(r"[a-z0-9]+", folded)
+	tokens = []
+	for position, word in enumerate(words):
+		if len(word) == 1 and position and words[position - 1] in _QUALIFIED_TERMS:
+			tokens.append(f"{words[position - 1]} {word}")
+		elif len(word) > 1 and word not in SPANISH_STOPWORDS:
+			tokens.append(stem_es(word))
+		elif word.isdigit():
+			tokens.append(word)
+	return tokens
+
+
+# Columnas de personal en el índice léxico y su peso (las de certificaciones y estudios pesan más)
+LEXICAL_FIELDS = {
+	"carrera_estudios": 2,
+	"certificaciones": 2,
+	"experiencia": 1,
+	"resumen_ia": 1,
+	"otros": 1
+}
+
+
+class BM25Index:
+	"""Índice invertido BM25 en memoria sobre las columnas de texto de personal
+
+	Se actualiza por fila: `upsert` reemplaza los términos de un documento y `sync`
+	deja el índice igual a un conjunto de filas tocando solo las que cambiaron de firma.
+	Los campos de LEXICAL_FIELDS pesan según su peso (sus términos se cuentan repetidos).
+	"""
+
+	def __init__(self, k1: float = 1.5, b: float = 0.75):
+		self.k1 = k1
+		self.b = b
+		self._lock = threading.Lock()
+		self._postings: Dict[str, Dict[Any, int]] = {}
+		self._doc_terms: Dict[Any, Dict[str, int]] = {}
+		self._doc_lengths: Dict[Any, int] = {}
+		self._signatures: Dict[Any, Any] = {}
+		self._total_length = 0
+
+	def __len__(self):
+		return len(self._doc_terms)
+
+	@staticmethod
+	def _row_terms(row: Dict[str, Any]) -> Dict[str, int]:
+		terms: Dict[str, int] = {}
+		for field, weight in LEXICAL_FIELDS.items():
+			for token in tokenize_es(str(row.get(field) or "")):
+				terms[token] = terms.get(token, 0) + weight
+		return terms
+
+	def _remove(self, doc_id):
+		for term in self._doc_terms.pop(doc_id, {}):
+			postings = self._postings[term]
+			del postings[doc_id]
+			if not postings:
+				del self._postings[term]
+		self._total_length -= self._doc_lengths.pop(doc_id, 0)
+		self._signatures.pop(doc_id, None)
+
+	def _add(self, doc_id, row: Dict[str, Any], signature):
+		terms = self._row_terms(row)
+		for term, frequency in terms.items():
+			self._postings.setdefault(term, {})[doc_id] = frequency
+		self._doc_terms[doc_id] = terms
+		self._doc_lengths[doc_id] = sum(terms.values())
+		self._total_length += self._doc_lengths[doc_id]
+		self._signatures[doc_id] = signature
+
+	def upsert(self, doc_id, row: Dict[str, Any], signature=None):
+		"""Agrega o reemplaza un documento"""
+		with self._lock:
+			self._remove(doc_id)
+			self._add(doc_id, row, signature)
+
+	def remove(self, doc_id):
+		"""Quita un documento del índice"""
+		with self._lock:
+			self._remove(doc_id)
+
+	def stale_ids(self, signatures: Dict[Any, Any]) -> List[Any]:
+		"""ids de `signatures` ({id: firma}) que no están en el índice o cuya firma cambió"""
+		with self._lock:
+			return [
+				doc_id for doc_id, signature in signatures.items()
+				if doc_id not in self._doc_terms or signature is None or self._signatures.get(doc_id) != signature
+			]
+
+	def sync(self, rows: Dict[Any, Tuple[Any, Dict[str, Any]]], remove_missing: bool = True) -> int:
+		"""Deja en el índice exactamente `rows` ({id: (firma, fila)}); retorna cuántos documentos cambiaron
+
+		La fila solo se lee si es nueva o su firma cambió (en las demás puede ser None). Con
+		`remove_missing=False` (`rows` es solo una parte de las filas) no se quita nada.
+		"""
+		with self._lock:
+			changes = 0
+			for doc_id in [doc_id for doc_id in self._doc_terms if remove_missing and doc_id not in rows]:
+				self._remove(doc_id)
+				changes += 1
+			for doc_id, (signature, row) in rows.items():
+				if doc_id in self._doc_terms and signature is not None and self._signatures.get(doc_id) == signature:
+					continue
+				self._remove(doc_id)
+				self._add(doc_id, row, signature)
+				changes += 1
+			return changes
+
+	def search(self, query: str, k: Optional[int] = None, allowed_ids=None) -> List[Tuple[Any, float]]:
+		"""Retorna los documentos con algún término de la consulta, por puntaje BM25 descendente"""
+		terms = set(tokenize_es(query))
+		with self._lock:
+			documents = len(self._doc_terms)
+			if not documents or not terms:
+				return []
+			average_length = self._total_length / documents or 1.0
+			scores: Dict[Any, float] = {}
+			for term in terms:
+				postings = self._postings.get(term)
+				if not postings:
+					continue
+				idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+				for doc_id, frequency in postings.items():
+					if allowed_ids is not None and doc_id not in allowed_ids:
+						continue
+					norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+					scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+		ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+		return ranked[:k] if k else ranked
+
+
+# Años de experiencia desde los que el primer puntaje ya no sube
+EXPERIENCE_CAP_YEARS = 15
+
+
+def _as_numbers(values: Sequence[Any]) -> np.ndarray:
+	"""Valores numéricos de una columna; los vacíos o no numéricos cuentan 0"""
+	numbers = np.zeros(len(values), dtype=np.float64)
+	for index, value in enumerate(values):
+		try:
+			numbers[index] = float(value or 0)
+		except (TypeError, ValueError):
+			pass
+	return numbers
+
+
+def first_pass_scores(
+	similarities: Optional[Sequence[float]],
+	lexical_scores: Sequence[float],
+	quality: Sequence[Any],
+	experience_years: Sequence[Any],
+	lexical_weight: float,
+	quality_weight: float,
+	experience_weight: float
+) -> np.ndarray:
+	"""Puntaje barato de todos los candidatos para la primera etapa del ranking en cascada
+
+	Suma la similitud coseno (0 si no hay embeddings) con, ponderados: el puntaje BM25
+	relativo al mejor (0 a 1), la puntuación de calidad centrada en 3 (-1 a 1; sin
+	puntuación cuenta 0) y los años de experiencia hasta EXPERIENCE_CAP_YEARS (0 a 1).
+	"""
+	lexical = _as_numbers(lexical_scores)
+	if lexical.max(initial=0) > 0:
+		lexical /= lexical.max()
+	stars = _as_numbers(quality)
+	quality_feature = np.where(stars > 0, (stars - 3) / 2, 0.0)
+	experience_feature = np.clip(_as_numbers(experience_years) / EXPERIENCE_CAP_YEARS, 0, 1)
+	scores = lexical_weight * lexical + quality_weight * quality_feature + experience_weight * experience_feature
+	if similarities is not None:
+		scores += np.asarray(similarities, dtype=np.float64)
+	return scores
+
+# Profesiones reconocidas en la descripción (sustantivos, no "ingeniería" ni "arquitectura")
+_PROFESSION_PATTERN = re.compile(r"(?:ingenier|arquitect|geolog|topograf|tecnic)[oa]s?|constructor(?:a|es|as)?|prevencionistas?")
+
+# Profesiones que solo cuentan con especialidad ("técnico eléctrico", no "inspecciones técnicas")
+_PROFESSIONS_NEEDING_SPECIALTY = ("tecnic",)
+
+# Inicio de las palabras que especifican una profesión ("civil", "eléctrico", "en construcción", ...)
+_SPECIALTY_PREFIXES = (
+	"civil", "electric", "electronic", "mecanic", "industrial", "quimic", "estructural", "hidraulic",
+	"sanitari", "ambiental", "informatic", "computacion", "minas", "miner", "metalurg", "comercial",
+	"construccion", "prevencion", "riesgo", "ejecucion", "geomensur", "automatizacion", "control"
+)
+
+# Palabras que introducen una certificación; las licencias se buscan con la palabra "licencia"
+_CERTIFICATION_CUE_PATTERN = re.compile(r"certificacion(?:es)?|certificad[oa]s?|acreditacion(?:es)?|acreditad[oa]s?")
+_LICENSE_CUE_PATTERN = re.compile(r"licencias?")
+
+# Palabras que se saltan al leer el nombre de una certificación ("licencia de conducir clase B" → "licencia clase b")
+_CERTIFICATION_FILLER = frozenset((
+	"en", "de", "del", "como", "conducir", "vigente", "vigentes", "valida", "validas", "actualizada", "actualizadas",
+	"requerida", "requeridas", "obligatoria", "obligatorias"
+))
+
+# Palabras que cierran el nombre de una certificación o especialidad
+_PHRASE_END = frozenset(("y", "o", "u", "e", "ni", "con", "para", "que", "a", "al", "sin", "ademas", "como", "minimo"))
+
+# Palabras que marcan un requisito deseable (no se filtra por él)
+_SOFT_REQUIREMENT_WORDS = frozenset(("deseable", "deseables", "idealmente", "preferentemente", "preferible", "ojala", "valorable"))
+
+# Números escritos con palabras
+_NUMBER_WORDS = {
+	"un": 1, "uno": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5, "seis": 6,
+	"siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "quince": 15, "veinte": 20
+}
+_NUMBER = r"(\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")"
+
+# "entre 3 y 5 años" exige el menor de los dos
+_YEARS_RANGE_PATTERN = re.compile(r"entre\s+" + _NUMBER + r"\s+y\s+(?:\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")(?=\s+anos)")
+
+# "mínimo 5 años de experiencia", "5+ años de experiencia", "experiencia de al menos 5 años"
+_YEARS_PATTERNS = (
+	re.compile(_NUMBER + r"\s*\+?\s*anos?\s+(?:o\s+mas\s+)?(?:de\s+)?(?:experiencia|trayectoria)"),
+	re.compile(r"experiencia\s+(?:laboral\s+|profesional\s+)?(?:minima\s+)?(?:de\s+)?(?:al\s+menos\s+|mas\s+de\s+|sobre\s+)?" + _NUMBER + r"\s*\+?\s*anos"),
+)
+
+# "4 estrellas", "puntuación mínima de 4", "calificación de calidad 4/5"
+_SCORE_PATTERNS = (
+	re.compile(r"([1-5])\s*(?:o\s+mas\s+)?estrellas"),
+	re.compile(r"(?:puntuacion|calificacion|evaluacion)\s+(?:de\s+calidad\s+)?(?:minima\s+)?(?:de\s+)?(?:al\s+menos\s+)?([1-5])\b"),
+)
+
+
+def _fold(text: str) -> str:
+	"""Minúsculas y sin tildes"""
+	return unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+
+
+def _is_soft_requirement(tokens: List[str], position: int) -> bool:
+	"""Indica si la frase que contiene `tokens[position]` marca el requisito como deseable"""
+	start = position
+	while start > 0 and tokens[start - 1] not in ",.;:()\n":
+		start -= 1
+	end = position
+	while end < len(tokens) and tokens[end] not in ",.;:()\n":
+		end += 1
+	return any(token in _SOFT_REQUIREMENT_WORDS for token in tokens[start:end])
+
+
+def _match_is_soft(folded: str, match) -> bool:
+	"""Como _is_soft_requirement, para un match de regex sobre el texto"""
+	start = max(folded.rfind(mark, 0, match.start()) for mark in ",.;:()\n") + 1
+	ends = [folded.find(mark, match.end()) for mark in ",.;:()\n"]
+	end = min([index for index in ends if index >= 0] or [len(folded)])
+	return any(word in _SOFT_REQUIREMENT_WORDS for word in re.findall(r"[a-z]+", folded[start:end]))
+
+
+def _required_number(folded: str, patterns) -> Optional[int]:
+	"""Mayor número exigido por los patrones (sin contar los requisitos deseables)"""
+	values = []
+	for pattern in patterns:
+		for match in pattern.finditer(folded):
+			if not _match_is_soft(folded, match):
+				value = match.group(1)
+				values.append(int(value) if value.isdigit() else _NUMBER_WORDS[value])
+	return max(values) if values else None
+
+
+def _specialty_words(tokens: List[str], start: int) -> List[str]:
+	"""Palabras de especialidad desde `start` ("civil", "en obras civiles", ...), con sus conectores"""
+	words = []
+	position = start
+	while position < len(tokens) and len(words) < 6:
+		token = tokens[position]
+		if token.startswith(_SPECIALTY_PREFIXES):
+			words.append(token)
+		elif token in ("en", "de", "del") and position + 1 < len(tokens) and tokens[position + 1].startswith(_SPECIALTY_PREFIXES):
+			words.append(token)
+		else:
+			break
+		position += 1
+	return words
+
+
+def _certification_words(tokens: List[str], start: int) -> List[str]:
+	"""Nombre de la certificación que empieza en `start` (hasta 3 palabras con contenido)"""
+	words = []
+	position = start
+	while position < len(tokens) and len([word for word in words if word not in _CERTIFICATION_FILLER]) < 3:
+		token = tokens[position]
+		qualified = len(token) == 1 and words and words[-1] in _QUALIFIED_TERMS
+		if (token in _PHRASE_END and not qualified) or not re.fullmatch(r"[a-z0-9]+", token):
+			break
+		if words or token not in _CERTIFICATION_FILLER:
+			words.append(token)
+		position += 1
+	while words and words[-1] in _CERTIFICATION_FILLER:
+		words.pop()
+	return words
+
+
+def parse_search_constraints(description: str) -> Dict[str, Any]:
+	"""Reconoce en la descripción los requisitos que se pueden filtrar en la base de datos
+
+	Retorna solo las llaves encontradas: `min_anos_experiencia`, `min_puntuacion_calidad`,
+	`carreras` (alternativas, basta cumplir una) y `certificaciones` (se exigen todas).
+	Los requisitos marcados como deseables no se incluyen.
+	"""
+	folded = _fold(description or "")
+	tokens = re.findall(r"[a-z0-9]+|[,.;:()\n]", folded)
+	constraints: Dict[str, Any] = {}
+
+	years = _required_number(_YEARS_RANGE_PATTERN.sub(r"\1", folded), _YEARS_PATTERNS)
+	if years:
+		constraints["min_anos_experiencia"] = years
+	score = _required_number(folded, _SCORE_PATTERNS)
+	if score:
+		constraints["min_puntuacion_calidad"] = score
+
+	careers = []
+	certifications = []
+	for position, token in enumerate(tokens):
+		if _PROFESSION_PATTERN.fullmatch(token):
+			specialty = _specialty_words(tokens, position + 1)
+			if token.startswith(_PROFESSIONS_NEEDING_SPECIALTY) and not specialty:
+				continue
+			phrase = " ".join([token] + specialty)
+		elif _CERTIFICATION_CUE_PATTERN.fullmatch(token):
+			words = _certification_words(tokens, position + 1)
+			if not words:
+				continue
+			phrase = " ".join(words)
+		elif _LICENSE_CUE_PATTERN.fullmatch(token):
+			words = _certification_words(tokens, position + 1)
+			if not words:
+				continue
+			phrase = " ".join(["licencia"] + words)
+		else:
+			continue
+		if _is_soft_requirement(tokens, position):
+			continue
+		target = careers if _PROFESSION_PATTERN.fullmatch(token) else certifications
+		if phrase not in target:
+			target.append(phrase)
+
+	if careers:
+		constraints["carreras"] = careers
+	if certifications:
+		constraints["certificaciones"] = certifications
+	return constraints
+
+
+def constraint_like_pattern(phrase: str) -> str:
+	"""Patrón ILIKE que encuentra la frase sin importar tildes, género ni plural
+
+	Cada palabra se reduce a su raíz y sus vocales se reemplazan por "_" (cualquier
+	carácter, con o sin tilde): "ingeniero eléctrico" → "%_ng_n__r%_l_ctr_c%".
+	"""
+	tokens = tokenize_es(phrase)
+	# "clase" ya está incluida en "clase a"
+	tokens = [
+		token for position, token in enumerate(tokens)
+		if not (position + 1 < len(tokens) and " " in tokens[position + 1] and tokens[position + 1].startswith(token))
+	]
+	parts = [token if " " in token else re.sub(r"[aeiou]", "_", token) for token in tokens]
+	return "%" + "%".join(parts) + "%"
+
+
+def describe_search_constraints(constraints: Dict[str, Any]) -> List[str]:
+	"""Descripción legible de cada requisito reconocido"""
+	descriptions = []
+	if constraints.get("carreras"):
+		descriptions.append("Carrera: " + " o ".join(constraints["carreras"]))
+	if constraints.get("min_anos_experiencia"):
+		descriptions.append(f"Experiencia: {constraints['min_anos_experiencia']} años o más")
+	for certification in constraints.get("certificaciones", []):
+		descriptions.append(f"Certificación: {certification}")
+	if constraints.get("min_puntuacion_calidad"):
+		descriptions.append(f"Puntuación de calidad: {constraints['min_puntuacion_calidad']}/5 o más")
+	return descriptions
@@ -0,0 +1,211 @@
+"""Extracción de texto de CVs fuera del hilo de Streamlit.
+
+Este módulo no depende de Streamlit para que sus funciones puedan ejecutarse en
+procesos hijos (el script principal se re-ejecuta en cada interacción y no es
+importable desde otro proceso).
+"""
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import List, Optional
+from xml.etree.ElementTree import iterparse
+
+import PyPDF2
+
+# Versión de los extractores: cambiarla invalida el texto guardado en la caché de CVs
+EXTRACTOR_VERSION = "2"
+
+# Documentos con menos páginas se procesan en el mismo proceso (el costo de repartir no se justifica)
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+# Número máximo de procesos para extraer páginas de PDF
+PDF_MAX_WORKERS = max(1, int(os.getenv("PDF_MAX_WORKERS", str(os.cpu_count() or 1))))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+	"""Retorna el pool de procesos compartido, recreándolo si cambia el número de procesos"""
+	global _pool, _pool_workers
+	with _pool_lock:
+		if _pool is None or _pool_workers != max_workers:
+			if _pool is not None:
+				_pool.shutdown(wait=False)
+			# "spawn" evita hacer fork de un servidor con muchos hilos (Streamlit)
+			_pool = ProcessPoolExecutor(
+				max_workers=max_workers,
+				mp_context=multiprocessing.get_context("spawn")
+			)
+			_pool_workers = max_workers
+		return _pool
+
+
+def _open_pdf(data: bytes) -> PyPDF2.PdfReader:
+	"""Abre un PDF desde sus bytes en memoria"""
+	return PyPDF2.PdfReader(BytesIO(data))
+
+
+def _extract_page_range(data: bytes, start: int, stop: int) -> List[str]:
+	"""Extrae el texto de las páginas [start, stop) de un PDF (se ejecuta en un proceso hijo)"""
+	reader = _open_pdf(data)
+	return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _page_ranges(page_count: int, chunk_count: int) -> List[tuple]:
+	"""Divide las páginas en rangos contiguos de tamaño similar"""
+	size, extra = divmod(page_count, chunk_count)
+	ranges = []
+	start = 0
+	for i in range(chunk_count):
+		stop = start + size + (1 if i < extra else 0)
+		if stop > start:
+			ranges.append((start, stop))
+		start = stop
+	return ranges
+
+
+def extract_pdf_text(data: bytes, max_workers: Optional[int] = None, min_parallel_pages: Optional[int] = None) -> str:
+	"""Extrae el texto de un PDF repartiendo las páginas en un pool de procesos
+
+	Cada proceso recibe una copia de los bytes del PDF completo (y lo vuelve a abrir),
+	por lo que se envía un solo rango de páginas por proceso: mientras dura la
+	extracción hay a lo más `max_workers` copias adicionales del archivo. Las páginas
+	se unen en orden con un solo join. Los documentos pequeños (o si solo hay un
+	proceso disponible) se extraen en el proceso actual, sin copias.
+	"""
+	max_workers = max_workers or PDF_MAX_WORKERS
+	min_parallel_pages = PDF_PARALLEL_MIN_PAGES if min_parallel_pages is None else min_parallel_pages
+
+	reader = _open_pdf(data)
+	page_count = len(reader.pages)
+	workers = min(max_workers, page_count)
+
+	if page_count < min_parallel_pages or workers <= 1:
+		return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+	pool = _get_pool(max_workers)
+	futures = [
+		pool.submit(_extract_page_range, data, start, stop)
+		for start, stop in _page_ranges(page_count, workers)
+	]
+	return "\n".join(text for future in futures for text in future.result())
+
+
+# Espacio de nombres de WordprocessingML y de los bloques alternativos de Office
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+
+def _docx_part_lines(archive: zipfile.ZipFile, part_name: str) -> List[str]:
+	"""Recorre una parte XML del DOCX con un parser incremental y retorna sus líneas en orden
+	
+	Cada párrafo es una línea y cada fila de tabla una línea con sus celdas separadas
+	por " | ", así una etiqueta queda junto a su valor ("RUT | 12.345.678-5"). Los
+	elementos ya leídos se liberan, por lo que la memoria no crece con el documento.
+	"""
+	lines = []
+	paragraphs = []  # texto de los párrafos abiertos (los cuadros de texto anidan párrafos)
+	cells = []       # párrafos de las celdas abiertas
+	rows = []        # celdas de las filas abiertas
+	skip_depth = 0   # dentro de un mc:Fallback (copia del contenido de mc:Choice)
+	
+	def emit(text):
+		if not text:
+			return
+		if cells:
+			cells[-1].append(text)
+		else:
+			lines.append(text)
+	
+	with archive.open(part_name) as part:
+		body = None
+		for event, elem in iterparse(part, events=("start", "end")):
+			tag = elem.tag
+			if event == "start":
+				if tag == _MC_FALLBACK:
+					skip_depth += 1
+				elif skip_depth:
+					continue
+				elif tag == _W + "body":
+					body = elem
+				elif tag == _W + "p":
+					paragraphs.append([])
+				elif tag == _W + "tc":
+					cells.append([])
+				elif tag == _W + "tr":
+					rows.append([])
+				continue
+			
+			if tag == _MC_FALLBACK:
+				skip_depth -= 1
+			elif skip_depth:
+				pass
+			elif tag == _W + "t" and paragraphs:
+				paragraphs[-1].append(elem.text or "")
+			elif tag == _W + "tab" and paragraphs:
+				paragraphs[-1].append("\t")
+			elif tag in (_W + "br", _W + "cr") and paragraphs:
+				paragraphs[-1].append("\n")
+			elif tag == _W + "p" and paragraphs:
+				emit("".join(paragraphs.pop()).strip())
+			elif tag == _W + "tc" and cells:
+				cell_text = " ".join(cells.pop())
+				if rows:
+					rows[-1].append(cell_text)
+			elif tag == _W + "tr" and rows:
+				emit(" | ".join(cell for cell in rows.pop() if cell))
+			
+			elem.clear()
+			# Los hijos directos del cuerpo ya procesados no se necesitan más
+			if body is not None and tag in (_W + "p", _W + "tbl", _W + "sdt") and not paragraphs and not rows:
+				body.clear()
+	return lines
+
+
+def _docx_header_parts(archive: zipfile.ZipFile, kind: str) -> List[str]:
+	"""Nombres de las partes de encabezado o pie de página, en orden (header1.xml, header2.xml, ...)"""
+	pattern = re.compile(rf"word/{kind}(\d*)\.xml")
+	parts = []
+	for name in archive.namelist():
+		match = pattern.fullmatch(name)
+		if match:
+			parts.append((int(match.group(1) or 0), name))
+	return [name for _, name in sorted(parts)]
+
+
+def _unique_lines(lines: List[str], exclude: frozenset = frozenset()) -> List[str]:
+	"""Quita las líneas repetidas (y las de `exclude`) conservando el orden"""
+	seen = set(exclude)
+	unique = []
+	for line in lines:
+		if line not in seen:
+			seen.add(line)
+			unique.append(line)
+	return unique
+
+
+def extract_docx_text(source) -> str:
+	"""Extrae el texto de un DOCX leyendo su XML en streaming, sin construir el modelo de python-docx
+	
+	`source` son los bytes del DOCX, la ruta de un archivo o un objeto tipo archivo.
+	Incluye, en el orden del documento, los párrafos y el texto de las tablas (frecuente
+	en las plantillas de CV), y además los encabezados (al inicio) y pies de página (al
+	final), sin repetir las líneas que se repiten entre secciones.
+	"""
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		source = BytesIO(source)
+	with zipfile.ZipFile(source) as archive:
+		headers = [line for name in _docx_header_parts(archive, "header") for line in _docx_part_lines(archive, name)]
+		body = _docx_part_lines(archive, "word/document.xml")
+		footers = [line for name in _docx_header_parts(archive, "footer") for line in _docx_part_lines(archive, name)]
+	
+	# Los encabezados y pies de cada sección suelen ser copias del mismo texto
+	header_lines = _unique_lines(headers)
+	footer_lines = _unique_lines(footers, frozenset(header_lines))
+	return "\n".join(header_lines + body + footer_lines)
@@ -0,0 +1,292 @@
+"""Cola durable de trabajos de ingesta de CVs.
+
+La interfaz de Streamlit solo encola trabajos y consulta su estado; el procesamiento
+lo hacen uno o más procesos `worker.py`. Hay dos implementaciones con la misma
+interfaz: SQLite (un solo equipo) y una tabla `jobs` en Supabase (producción).
+
+Estados de un trabajo: queued -> running -> done | skipped | failed. Un trabajo en
+"running" tiene un arriendo (lease) que el worker renueva mientras lo procesa; si el
+worker muere y el arriendo vence, otro worker puede tomarlo de nuevo. `renew`, `finish`
+y `retry` solo aplican si el trabajo sigue siendo del mismo worker y del mismo intento,
+así un worker que perdió el arriendo no pisa el resultado del que lo retomó.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Estados finales: el trabajo ya no vuelve a la cola
+FINAL_STATUSES = ("done", "skipped", "failed")
+
+# Intentos máximos por trabajo antes de marcarlo como fallido
+JOB_MAX_ATTEMPTS = int(os.getenv("CV_JOB_MAX_ATTEMPTS", "3"))
+
+# Segundos base del backoff exponencial entre reintentos
+JOB_RETRY_BASE_SECONDS = float(os.getenv("CV_JOB_RETRY_BASE_SECONDS", "10"))
+
+# Extensiones de archivo según el tipo MIME
+FILE_EXTENSIONS = {
+	"application/pdf": "pdf",
+	"application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+}
+
+
+def _now() -> datetime:
+	return datetime.now(timezone.utc)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+	"""Espera antes del siguiente intento (exponencial según los intentos ya hechos)"""
+	return timedelta(seconds=JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+
+
+class SQLiteJobQueue:
+	"""Cola de trabajos en un archivo SQLite local (compartido por la app y los workers del mismo equipo)"""
+
+	def __init__(self, path: str):
+		directory = os.path.dirname(path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		self._lock = threading.Lock()
+		# isolation_level=None para controlar las transacciones con BEGIN IMMEDIATE
+		self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+		self._conn.row_factory = sqlite3.Row
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute(
+			"CREATE TABLE IF NOT EXISTS jobs ("
+			"id TEXT PRIMARY KEY, file_name TEXT NOT NULL, file_type TEXT NOT NULL, payload BLOB NOT NULL, "
+			"status TEXT NOT NULL DEFAULT 'queued', attempts INTEGER NOT NULL DEFAULT 0, "
+			"max_attempts INTEGER NOT NULL, available_at TEXT NOT NULL, lease_until TEXT, worker_id TEXT, "
+			"message TEXT, created_at TEXT NOT NULL, updated_at TEXT NOT NULL)"
+		)
+		self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)")
+
+	def enqueue(self, file_name: str, file_type: str, data: bytes) -> str:
+		"""Agrega un trabajo a la cola y retorna su id"""
+		job_id = str(uuid.uuid4())
+		now = _now().isoformat()
+		with self._lock:
+			self._conn.execute(
+				"INSERT INTO jobs (id, file_name, file_type, payload, max_attempts, available_at, created_at, updated_at) "
+				"VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+				(job_id, file_name, file_type, sqlite3.Binary(data), JOB_MAX_ATTEMPTS, now, now, now)
+			)
+		return job_id
+
+	def claim(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+		"""Toma el siguiente trabajo disponible (o con arriendo vencido) y lo marca como en ejecución"""
+		now = _now()
+		with self._lock:
+			self._conn.execute("BEGIN IMMEDIATE")
+			try:
+				# Trabajos abandonados que ya agotaron sus intentos
+				self._conn.execute(
+					"UPDATE jobs SET status = 'failed', message = 'Arriendo vencido sin más intentos', payload = X'', updated_at = ? "
+					"WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+					(now.isoformat(), now.isoformat())
+				)
+				row = self._conn.execute(
+					"SELECT id, attempts FROM jobs "
+					"WHERE (status = 'queued' AND available_at <= ?) OR (status = 'running' AND lease_until < ?) "
+					"ORDER BY created_at LIMIT 1",
+					(now.isoformat(), now.isoformat())
+				).fetchone()
+				if row is None:
+					self._conn.execute("COMMIT")
+					return None
+				self._conn.execute(
+					"UPDATE jobs SET status = 'running', attempts = attempts + 1, worker_id = ?, lease_until = ?, updated_at = ? "
+					"WHERE id = ?",
+					(worker_id, (now + timedelta(seconds=lease_seconds)).isoformat(), now.isoformat(), row["id"])
+				)
+				job = dict(self._conn.execute(
+					"SELECT id, file_name, file_type, status, attempts, max_attempts, worker_id FROM jobs WHERE id = ?",
+					(row["id"],)
+				).fetchone())
+				self._conn.execute("COMMIT")
+				return job
+			except Exception:
+				self._conn.execute("ROLLBACK")
+				raise
+
+	def get_payload(self, job: Dict[str, Any]) -> bytes:
+		"""Retorna el contenido del archivo del trabajo"""
+		with self._lock:
+			row = self._conn.execute("SELECT payload FROM jobs WHERE id = ?", (job["id"],)).fetchone()
+		return bytes(row["payload"])
+
+	def _update_owned(self, job: Dict[str, Any], assignments: str, values: tuple) -> bool:
+		"""Aplica el UPDATE solo si el trabajo sigue en ejecución por el mismo worker e intento"""
+		with self._lock:
+			cursor = self._conn.execute(
+				f"UPDATE jobs SET {assignments} WHERE id = ? AND status = 'running' AND worker_id = ? AND attempts = ?",
+				values + (job["id"], job["worker_id"], job["attempts"])
+			)
+		return cursor.rowcount == 1
+
+	def renew(self, job: Dict[str, Any], lease_seconds: float) -> bool:
+		"""Extiende el arriendo del trabajo; retorna False si el worker ya no lo tiene"""
+		now = _now()
+		return self._update_owned(
+			job, "lease_until = ?, updated_at = ?",
+			((now + timedelta(seconds=lease_seconds)).isoformat(), now.isoformat())
+		)
+
+	def finish(self, job: Dict[str, Any], status: str, message: str = "") -> bool:
+		"""Marca el trabajo con un estado final y libera su archivo; retorna False si el worker ya no lo tiene"""
+		return self._update_owned(
+			job, "status = ?, message = ?, lease_until = NULL, payload = X'', updated_at = ?",
+			(status, message, _now().isoformat())
+		)
+
+	def retry(self, job: Dict[str, Any], message: str) -> bool:
+		"""Devuelve el trabajo a la cola con backoff, o lo marca como fallido si agotó sus intentos"""
+		if job["attempts"] >= job["max_attempts"]:
+			return self.finish(job, "failed", message)
+		now = _now()
+		return self._update_owned(
+			job, "status = 'queued', message = ?, lease_until = NULL, available_at = ?, updated_at = ?",
+			(message, (now + _retry_delay(job["attempts"])).isoformat(), now.isoformat())
+		)
+
+	def get_status(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+		"""Retorna el estado de los trabajos indicados"""
+		if not job_ids:
+			return []
+		placeholders = ", ".join("?" for _ in job_ids)
+		with self._lock:
+			rows = self._conn.execute(
+				f"SELECT id, file_name, status, attempts, message, updated_at FROM jobs WHERE id IN ({placeholders})",
+				list(job_ids)
+			).fetchall()
+		return [dict(row) for row in rows]
+
+
+class SupabaseJobQueue:
+	"""Cola de trabajos en la tabla `jobs` de Supabase; los archivos se guardan en Storage"""
+
+	def __init__(self, supabase, bucket_name: str = "cvs", prefix: str = "jobs"):
+		self.supabase = supabase
+		self.bucket_name = bucket_name
+		self.prefix = prefix
+
+	def _table(self):
+		return self.supabase.table("jobs")
+
+	def enqueue(self, file_name: str, file_type: str, data: bytes) -> str:
+		"""Sube el archivo a Storage, agrega el trabajo a la cola y retorna su id"""
+		job_id = str(uuid.uuid4())
+		storage_path = f"{self.prefix}/{job_id}.{FILE_EXTENSIONS.get(file_type, 'bin')}"
+		self.supabase.storage.from_(self.bucket_name).upload(
+			storage_path, data, {"content-type": file_type, "upsert": "true"}
+		)
+		now = _now().isoformat()
+		self._table().insert({
+			"id": job_id,
+			"file_name": file_name,
+			"file_type": file_type,
+			"storage_path": storage_path,
+			"status": "queued",
+			"attempts": 0,
+			"max_attempts": JOB_MAX_ATTEMPTS,
+			"available_at": now,
+			"created_at": now,
+			"updated_at": now
+		}).execute()
+		return job_id
+
+	def claim(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+		"""Toma el siguiente trabajo disponible con un update condicional (solo un worker gana)"""
+		now = _now()
+		candidates = (
+			self._table().select("*").eq("status", "queued").lte("available_at", now.isoformat())
+			.order("created_at").limit(5).execute().data or []
+		)
+		expired = (
+			self._table().select("*").eq("status", "running").lt("lease_until", now.isoformat())
+			.order("created_at").limit(5).execute().data or []
+		)
+		for job in expired + candidates:
+			if job["status"] == "running" and job["attempts"] >= job["max_attempts"]:
+				self.finish(job, "failed", "Arriendo vencido sin más intentos")
+				continue
+			# El update solo aplica si nadie más tomó el trabajo desde que se leyó
+			claimed = (
+				self._table().update({
+					"status": "running",
+					"attempts": job["attempts"] + 1,
+					"worker_id": worker_id,
+					"lease_until": (now + timedelta(seconds=lease_seconds)).isoformat(),
+					"updated_at": now.isoformat()
+				})
+				.eq("id", job["id"]).eq("status", job["status"]).eq("attempts", job["attempts"])
+				.execute().data
+			)
+			if claimed:
+				return claimed[0]
+		return None
+
+	def get_payload(self, job: Dict[str, Any]) -> bytes:
+		"""Descarga el archivo del trabajo desde Storage"""
+		return self.supabase.storage.from_(self.bucket_name).download(job["storage_path"])
+
+	def _update_owned(self, job: Dict[str, Any], values: Dict[str, Any]) -> bool:
+		"""Aplica el update solo si el trabajo sigue en ejecución por el mismo worker e intento"""
+		updated = (
+			self._table().update(values)
+			.eq("id", job["id"]).eq("status", "running").eq("worker_id", job["worker_id"]).eq("attempts", job["attempts"])
+			.execute().data
+		)
+		return bool(updated)
+
+	def renew(self, job: Dict[str, Any], lease_seconds: float) -> bool:
+		"""Extiende el arriendo del trabajo; retorna False si el worker ya no lo tiene"""
+		now = _now()
+		return self._update_owned(job, {
+			"lease_until": (now + timedelta(seconds=lease_seconds)).isoformat(),
+			"updated_at": now.isoformat()
+		})
+
+	def finish(self, job: Dict[str, Any], status: str, message: str = "") -> bool:
+		"""Marca el trabajo con un estado final y borra su archivo de Storage; retorna False si el worker ya no lo tiene"""
+		finished = self._update_owned(job, {
+			"status": status,
+			"message": message,
+			"lease_until": None,
+			"updated_at": _now().isoformat()
+		})
+		if finished:
+			# El bucket es público: el archivo pendiente no debe quedar expuesto después del trabajo
+			try:
+				self.supabase.storage.from_(self.bucket_name).remove([job["storage_path"]])
+			except Exception as e:
+				logger.warning("No se pudo borrar %s de Storage: %s", job["storage_path"], e)
+		return finished
+
+	def retry(self, job: Dict[str, Any], message: str) -> bool:
+		"""Devuelve el trabajo a la cola con backoff, o lo marca como fallido si agotó sus intentos"""
+		if job["attempts"] >= job["max_attempts"]:
+			return self.finish(job, "failed", message)
+		now = _now()
+		return self._update_owned(job, {
+			"status": "queued",
+			"message": message,
+			"lease_until": None,
+			"available_at": (now + _retry_delay(job["attempts"])).isoformat(),
+			"updated_at": now.isoformat()
+		})
+
+	def get_status(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+		"""Retorna el estado de los trabajos indicados"""
+		if not job_ids:
+			return []
+		response = (
+			self._table().select("id, file_name, status, attempts, message, updated_at")
+			.in_("id", list(job_ids)).execute()
+		)
+		return response.data or []
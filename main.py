@@ -1,18 +1,34 @@
 import streamlit as st
 import os
 from supabase import create_client, Client
-from openai import OpenAI
-import PyPDF2
-import docx
-from io import BytesIO
+from openai import OpenAI, APIConnectionError, APIError, APITimeoutError, InternalServerError, RateLimitError
+import httpx
 import json
+import re
+import logging
+import unicodedata
+import hashlib
+import sqlite3
+import threading
+import time
+import random
+from collections import OrderedDict
 from datetime import datetime, timedelta, date
 from typing import Optional, Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from cv_extraction import EXTRACTOR_VERSION, extract_docx_text, extract_pdf_text
+from job_queue import SQLiteJobQueue, SupabaseJobQueue
+from candidate_search import (
+	EMBEDDING_FIELDS, LEXICAL_FIELDS, BM25Index, HashingEmbedder, OpenAIEmbedder, VectorIndex,
+	candidate_embedding_text, constraint_like_pattern, describe_search_constraints, first_pass_scores, parse_search_constraints
+)
 
 # Cargar variables de entorno
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Configuración de página
 st.set_page_config(
 	page_title="TPF Ingeniería - Gestión de Personal",
@@ -179,7 +195,8 @@ def init_clients():
 			st.error("⚠️ Por favor configura OPENAI_API_KEY en las variables de entorno")
 			return False
 		
-		st.session_state.openai_client = OpenAI(api_key=openai_key)
+		# Los reintentos los maneja call_openai, coordinados con el limitador compartido
+		st.session_state.openai_client = OpenAI(api_key=openai_key, max_retries=0)
 	
 	return True
 
@@ -212,78 +229,986 @@ def normalize_rut(rut: Optional[str]) -> Optional[str]:
 	
 	return rut_normalized
 
-# Función para extraer texto de PDF
-def extract_text_from_pdf(file) -> str:
-	"""Extrae texto de un archivo PDF"""
-	try:
-		pdf_reader = PyPDF2.PdfReader(file)
-		text = ""
-		for page in pdf_reader.pages:
-			text += page.extract_text()
-		return text
-	except Exception as e:
-		st.error(f"Error al leer PDF: {str(e)}")
-		return ""
+# Función para calcular el dígito verificador de un RUT (módulo 11)
+def rut_check_digit(rut_body: str) -> str:
+	"""Calcula el dígito verificador ("0"-"9" o "K") del cuerpo numérico de un RUT"""
+	total = 0
+	factor = 2
+	for digit in reversed(rut_body):
+		total += int(digit) * factor
+		factor = 2 if factor == 7 else factor + 1
+	remainder = 11 - total % 11
+	if remainder == 11:
+		return "0"
+	if remainder == 10:
+		return "K"
+	return str(remainder)
 
-# Función para extraer texto de DOCX
-def extract_text_from_docx(file) -> str:
-	"""Extrae texto de un archivo DOCX"""
-	try:
-		doc = docx.Document(file)
-		text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-		return text
-	except Exception as e:
-		st.error(f"Error al leer DOCX: {str(e)}")
-		return ""
+# Función para validar un RUT completo con su dígito verificador
+def is_valid_rut(rut: Optional[str]) -> bool:
+	"""Valida un RUT con formato libre (con o sin puntos y guion) según su dígito verificador"""
+	if not rut:
+		return False
+	rut_clean = re.sub(r"[^0-9kK]", "", str(rut)).upper()
+	if len(rut_clean) < 8 or len(rut_clean) > 9 or not rut_clean[:-1].isdigit():
+		return False
+	return rut_check_digit(rut_clean[:-1]) == rut_clean[-1]
 
-# Función para procesar CV con OpenAI
-def process_cv_with_ai(cv_text: str) -> Dict[str, Any]:
-	"""Procesa el CV con OpenAI y extrae la información estructurada"""
-	client = st.session_state.openai_client
+# Tipos MIME soportados para CVs
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Configuración de la caché local de CVs (texto extraído y campos procesados con IA)
+CV_CACHE_PATH = os.getenv("CV_CACHE_PATH", os.path.join(".cache", "cv_cache.sqlite3"))
+CV_CACHE_MAX_BYTES = int(float(os.getenv("CV_CACHE_MAX_MB", "200")) * 1024 * 1024)
+
+# Función para calcular el hash del contenido de un archivo
+def hash_file_bytes(data) -> str:
+	"""Retorna el SHA-256 (hex) del contenido del archivo"""
+	return hashlib.sha256(data).hexdigest()
+
+class CVBuffer:
+	"""Contenido de un CV subido, compartido sin copias por el extractor, el hash y la subida a Storage
+	
+	Guarda una referencia a los mismos bytes del archivo subido (getvalue() de un
+	UploadedFile no los copia, y BytesIO y memoryview los comparten). El CV ocupa así
+	~1× su tamaño en el proceso: Streamlit mantiene ese contenido en memoria mientras
+	el archivo siga en el uploader, de modo que volcarlo a disco no liberaría nada.
+	Los procesos que extraen páginas de un PDF grande reciben su propia copia.
+	"""
+	
+	def __init__(self, data: bytes, name: str = "", file_type: str = ""):
+		self.name = name
+		self.file_type = file_type
+		self.data = data
+		self.size = len(data)
+		self._sha256 = None
+	
+	@classmethod
+	def from_file(cls, file, name: str = "", file_type: str = "") -> "CVBuffer":
+		"""Crea el buffer desde un archivo subido (UploadedFile, BytesIO u otro archivo abierto)"""
+		name = name or getattr(file, "name", "")
+		file_type = file_type or getattr(file, "type", "")
+		if hasattr(file, "getvalue"):
+			# getvalue() de un BytesIO sin modificar retorna los mismos bytes, sin copiarlos
+			data = file.getvalue()
+		else:
+			file.seek(0)
+			data = file.read()
+		if isinstance(data, str):
+			data = data.encode("utf-8")
+		return cls(data, name, file_type)
+	
+	def __len__(self) -> int:
+		return self.size
 	
-	prompt = f"""Analiza el siguiente Curriculum Vitae y extrae la información en formato JSON. 
+	def view(self) -> memoryview:
+		"""Vista de solo lectura del contenido"""
+		return memoryview(self.data)
+	
+	@property
+	def sha256(self) -> str:
+		"""SHA-256 del contenido (se calcula una vez)"""
+		if self._sha256 is None:
+			self._sha256 = hash_file_bytes(self.view())
+		return self._sha256
+
+class CVCache:
+	"""Caché persistente en SQLite con desalojo LRU por tamaño total"""
+	
+	def __init__(self, path: str, max_bytes: int):
+		directory = os.path.dirname(path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		self.max_bytes = max_bytes
+		self._lock = threading.Lock()
+		# Una conexión compartida entre hilos, protegida por el lock
+		self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute(
+			"CREATE TABLE IF NOT EXISTS cache ("
+			"key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+		)
+		self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+		self._conn.commit()
+	
+	def get(self, key: str) -> Optional[str]:
+		"""Retorna el valor guardado para la llave (o None) y lo marca como usado"""
+		with self._lock:
+			row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+			if row is None:
+				return None
+			self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (time.time(), key))
+			self._conn.commit()
+			return row[0]
+	
+	def put(self, key: str, value: str):
+		"""Guarda el valor y desaloja las entradas menos usadas si se supera el tamaño máximo"""
+		size = len(value.encode("utf-8"))
+		if size > self.max_bytes:
+			return
+		with self._lock:
+			self._conn.execute(
+				"INSERT OR REPLACE INTO cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+				(key, value, size, time.time())
+			)
+			total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+			if total > self.max_bytes:
+				# Borrar desde la entrada usada hace más tiempo hasta volver bajo el límite
+				to_delete = []
+				for old_key, old_size in self._conn.execute("SELECT key, size FROM cache ORDER BY last_access"):
+					if total <= self.max_bytes:
+						break
+					to_delete.append((old_key,))
+					total -= old_size
+				self._conn.executemany("DELETE FROM cache WHERE key = ?", to_delete)
+			self._conn.commit()
+
+# Caché compartida por todas las sesiones del proceso
+@st.cache_resource
+def get_cv_cache() -> CVCache:
+	"""Retorna la caché local de CVs del proceso"""
+	return CVCache(CV_CACHE_PATH, CV_CACHE_MAX_BYTES)
+
+# Extracción de texto de un CV con caché por contenido (lanza la excepción si falla)
+def _extract_cv_text(buffer: CVBuffer, file_type: str) -> str:
+	"""Extrae el texto del CV según su tipo MIME, reutilizando la caché si el archivo ya se procesó"""
+	cache = get_cv_cache()
+	cache_key = f"text:{buffer.sha256}:{EXTRACTOR_VERSION}"
+	cached_text = cache.get(cache_key)
+	if cached_text is not None:
+		return cached_text
+	
+	if file_type == PDF_MIME_TYPE:
+		text = extract_pdf_text(buffer.data)
+	elif file_type == DOCX_MIME_TYPE:
+		text = extract_docx_text(buffer.data)
+	else:
+		raise ValueError("Formato no soportado")
+	
+	if text:
+		cache.put(cache_key, text)
+	return text
+
+# Modelo y prompts usados para extraer la información de los CVs
+CV_EXTRACTION_MODEL = "gpt-4o-mini"
+CV_EXTRACTION_SYSTEM_PROMPT = "Eres un asistente experto en extraer información de CVs. Responde SOLO con JSON válido."
+CV_EXTRACTION_PROMPT = """Analiza el siguiente Curriculum Vitae y extrae la información en formato JSON. 
 	Responde SOLO con un JSON válido, sin texto adicional antes o después.
 
 	Campos requeridos:
-	- rut: RUT o documento de identidad (string)
-	- nombre: Nombre completo o solo nombre (string)
-	- apellido: Apellido(s) (string)
-	- telefono_personal: Teléfono de contacto (string o null)
-	- correo_personal: Correo electrónico (string o null)
-	- carrera_estudios: Carrera o estudios realizados (string o null)
-	- experiencia: Descripción de la experiencia laboral (string o null)
-	- anos_experiencia: Años de experiencia (número entero o null)
-	- certificaciones: Certificaciones, licencias, cursos, capacitaciones o acreditaciones profesionales (string o null). Lista todas las certificaciones encontradas separadas por comas o punto y coma.
-	- otros: Cualquier otra información relevante (string o null)
-	- resumen_ia: Un resumen profesional del candidato hecho por IA (string)
-
-	Si algún campo no está disponible en el CV, usa null para ese campo.
+	{fields}
+
+	Entrega los campos en el orden indicado. Si algún campo no está disponible en el CV, usa null para ese campo.
 	El resumen_ia debe ser un resumen profesional de 2-3 párrafos sobre el candidato.
 
 	CV:
-	{cv_text[:4000]}  # Limitar a 4000 caracteres para evitar tokens excesivos
+	{cv_text}
 	"""
+
+# Mostrar los campos del CV individual a medida que el modelo los genera
+CV_EXTRACTION_STREAMING = os.getenv("CV_EXTRACTION_STREAMING", "1").strip().lower() not in ("0", "false", "no")
+
+# Campos que se piden a OpenAI (los que se detectan localmente se omiten del prompt)
+CV_EXTRACTION_FIELDS = {
+	"rut": "RUT o documento de identidad (string)",
+	"nombre": "Nombre completo o solo nombre (string)",
+	"apellido": "Apellido(s) (string)",
+	"telefono_personal": "Teléfono de contacto (string o null)",
+	"correo_personal": "Correo electrónico (string o null)",
+	"carrera_estudios": "Carrera o estudios realizados (string o null)",
+	"experiencia": "Descripción de la experiencia laboral (string o null)",
+	"anos_experiencia": "Años de experiencia (número entero o null)",
+	"certificaciones": "Certificaciones, licencias, cursos, capacitaciones o acreditaciones profesionales (string o null). Lista todas las certificaciones encontradas separadas por comas o punto y coma.",
+	"otros": "Cualquier otra información relevante (string o null)",
+	"resumen_ia": "Un resumen profesional del candidato hecho por IA (string)"
+}
+
+# Presupuesto de tokens del texto del CV enviado a OpenAI
+CV_TOKEN_BUDGET = int(os.getenv("CV_TOKEN_BUDGET", "1000"))
+
+# Versión de la compactación: forma parte de la versión del prompt (y de la llave de la caché)
+CV_COMPACTION_VERSION = "2"
+
+# Encabezados de sección habituales en CVs chilenos (sin tildes, en minúsculas)
+CV_SECTION_HEADINGS = {
+	"datos_personales": ("datos personales", "informacion personal", "antecedentes personales", "perfil", "contacto", "resumen"),
+	"formacion": ("formacion", "educacion", "estudios", "antecedentes academicos", "titulo"),
+	"experiencia": ("experiencia", "antecedentes laborales", "trayectoria", "historial laboral"),
+	"certificaciones": ("certificacion", "certificado", "curso", "capacitacion", "licencia", "acreditacion", "diplomado"),
+	"otros": ("idioma", "habilidades", "competencias", "conocimientos", "software", "referencias", "otros")
+}
+
+# Parte del presupuesto que recibe cada sección; lo que una sección no usa pasa a las demás
+CV_SECTION_WEIGHTS = {
+	"datos_personales": 0.15,
+	"experiencia": 0.45,
+	"formacion": 0.15,
+	"certificaciones": 0.15,
+	"otros": 0.10
+}
+
+# Tokenizador del modelo (tiktoken); None si no está instalado o no se pudo cargar
+@st.cache_resource
+def _get_token_encoder():
+	"""Retorna el tokenizador del modelo de extracción, o None si no está disponible"""
+	try:
+		import tiktoken
+		return tiktoken.encoding_for_model(CV_EXTRACTION_MODEL)
+	except Exception:
+		return None
+
+# Función para contar tokens
+def count_tokens(text: str) -> int:
+	"""Cuenta los tokens del texto con el tokenizador del modelo (o ~4 caracteres por token si no está disponible)"""
+	if not text:
+		return 0
+	encoder = _get_token_encoder()
+	if encoder is None:
+		return max(1, len(text) // 4)
+	return len(encoder.encode(text, disallowed_special=()))
+
+def _fold_text(text: str) -> str:
+	"""Minúsculas y sin tildes, para comparar encabezados y palabras"""
+	return unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+
+def _clean_cv_lines(text: str) -> list:
+	"""Normaliza espacios y quita números de página y encabezados/pies repetidos en cada página"""
+	lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+	lines = [line for line in lines if line]
+	
+	# Líneas cortas que se repiten tal cual son encabezados o pies de página
+	counts = {}
+	for line in lines:
+		if len(line) <= 100:
+			key = _fold_text(line)
+			counts[key] = counts.get(key, 0) + 1
+	
+	cleaned = []
+	seen_repeated = set()
+	for line in lines:
+		key = _fold_text(line)
+		if re.fullmatch(r"(pagina|pag\.?|page)?\s*\d+(\s*(de|/|of)\s*\d+)?", key):
+			continue
+		if counts.get(key, 0) >= 3:
+			if key in seen_repeated:
+				continue
+			seen_repeated.add(key)
+		cleaned.append(line)
+	return cleaned
+
+def _cv_section_of(line: str) -> Optional[str]:
+	"""Retorna la sección si la línea es un encabezado de sección"""
+	if len(line) > 60:
+		return None
+	folded = _fold_text(line).strip(" :-•*·|")
+	for section, headings in CV_SECTION_HEADINGS.items():
+		if any(folded.startswith(heading) for heading in headings):
+			return section
+	return None
+
+# Función para cortar un texto a un número de tokens
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+	"""Corta el texto a lo más max_tokens tokens (o ~4 caracteres por token si no hay tokenizador)"""
+	if max_tokens <= 0 or not text:
+		return ""
+	encoder = _get_token_encoder()
+	if encoder is None:
+		return text[:max_tokens * 4]
+	tokens = encoder.encode(text, disallowed_special=())
+	if len(tokens) <= max_tokens:
+		return text
+	# Un corte en medio de un carácter de varios bytes se decodifica como "\ufffd"
+	return encoder.decode(tokens[:max_tokens]).rstrip("\ufffd")
+
+# Función para compactar el texto del CV antes de enviarlo a OpenAI
+def compact_cv_text(cv_text: str, token_budget: Optional[int] = None) -> str:
+	"""Limpia el CV y lo ajusta al presupuesto de tokens repartiéndolo entre sus secciones
+	
+	A diferencia de cortar en un número fijo de caracteres, cada sección (datos
+	personales, formación, experiencia, certificaciones) conserva sus primeras líneas,
+	así un encabezado largo no deja fuera la experiencia. La línea que no cabe entera
+	se corta al presupuesto que le queda a su sección.
+	"""
+	token_budget = token_budget or CV_TOKEN_BUDGET
+	lines = _clean_cv_lines(cv_text)
+	compacted = "\n".join(lines)
+	if count_tokens(compacted) <= token_budget:
+		return compacted
+	
+	# Dividir en secciones; lo anterior al primer encabezado son los datos personales
+	sections = []
+	current = {"key": "datos_personales", "lines": []}
+	for line in lines:
+		section = _cv_section_of(line)
+		if section:
+			sections.append(current)
+			current = {"key": section, "lines": []}
+		current["lines"].append(line)
+	sections.append(current)
+	for section in sections:
+		section["costs"] = [count_tokens(line) + 1 for line in section["lines"]]
+	
+	# Primera pasada: cada tipo de sección recibe hasta su parte del presupuesto
+	allowance = {key: int(token_budget * weight) for key, weight in CV_SECTION_WEIGHTS.items()}
+	granted = []
+	for section in sections:
+		grant = min(sum(section["costs"]), allowance[section["key"]])
+		allowance[section["key"]] -= grant
+		granted.append(grant)
+	
+	# Segunda pasada: el presupuesto que sobró se reparte según la prioridad de las secciones
+	leftover = sum(allowance.values())
+	for key in CV_SECTION_WEIGHTS:
+		for index, section in enumerate(sections):
+			if section["key"] == key and leftover > 0:
+				extra = min(sum(section["costs"]) - granted[index], leftover)
+				granted[index] += extra
+				leftover -= extra
+	
+	# Cada sección conserva sus líneas enteras mientras quepan y corta la primera que no cabe
+	kept = []
+	for section, budget in zip(sections, granted):
+		for line, cost in zip(section["lines"], section["costs"]):
+			if cost > budget:
+				partial = truncate_to_tokens(line, budget - 1)
+				if partial:
+					kept.append(partial)
+				break
+			budget -= cost
+			kept.append(line)
+	
+	# Tope final: el conteo por línea es aproximado en los saltos de línea
+	return truncate_to_tokens("\n".join(kept), token_budget)
+
+# Versión del extractor local de RUT, correo y teléfono (forma parte de la versión del prompt)
+CV_LOCAL_FIELDS_VERSION = "1"
+
+# RUT con guion antes del dígito verificador (12.345.678-5, 12345678-5) o precedido por "RUT"/"RUN"
+RUT_PATTERN = re.compile(r"(?<![\d.])(\d{1,2}\.?\d{3}\.?\d{3})\s*-\s*([\dkK])(?![\w])")
+RUT_LABELED_PATTERN = re.compile(r"\b(?:rut|run)\b\W{0,5}(\d{7,8})\s?([\dkK])\b", re.IGNORECASE)
+RUT_MENTION_PATTERN = re.compile(r"\b(?:rut|run|c[eé]dula|c\.\s?i\.)", re.IGNORECASE)
+# Etiqueta justo antes de un RUT ("RUT:", "RUN N°", "Cédula de identidad", "C.I.")
+RUT_LABEL_PATTERN = re.compile(r"\b(?:rut|run|c[eé]dula(?:\s+de\s+identidad)?|c\.\s?i)\W{0,3}(?:n[°º.]?\s*)?[:#-]?\s*$", re.IGNORECASE)
+# Los RUT desde 50.000.000 son de empresas (p. ej. el empleador que aparece en la experiencia)
+COMPANY_RUT_MIN_BODY = 50_000_000
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-zA-Z]{2,}")
+# Celulares (9 XXXX XXXX) y fijos (2 XXXX XXXX, regiones 3X-7X) de Chile, con o sin +56
+PHONE_PATTERN = re.compile(r"(?<![\d-])(?:\+?\s?56[\s-]?)?\(?((?:9|2|[3-7]\d)\)?(?:[\s-]?\d){7,8})(?![\d-])")
+
+# Función para encontrar el RUT de la persona entre los RUT que menciona el CV
+def _find_personal_rut(cv_text: str, rut_spans: list) -> Optional[str]:
+	"""Retorna el RUT normalizado de la persona, o None si no se puede saber con certeza
+	
+	Descarta los RUT con dígito verificador inválido y los de empresas. Si hay RUT junto
+	a una etiqueta (RUT, RUN, C.I.) solo se consideran esos. Si quedan dos RUT distintos
+	el resultado es ambiguo y el RUT se deja a OpenAI. Agrega a `rut_spans` la posición
+	de todo lo que tiene forma de RUT.
+	"""
+	labeled, unlabeled = set(), set()
+	for pattern in (RUT_PATTERN, RUT_LABELED_PATTERN):
+		for match in pattern.finditer(cv_text):
+			rut_spans.append(match.span())
+			body = re.sub(r"\D", "", match.group(1))
+			if not is_valid_rut(body + match.group(2)) or int(body) >= COMPANY_RUT_MIN_BODY:
+				continue
+			if pattern is RUT_LABELED_PATTERN or RUT_LABEL_PATTERN.search(cv_text[max(0, match.start() - 30):match.start()]):
+				labeled.add(body)
+			else:
+				unlabeled.add(body)
+	candidates = labeled or unlabeled
+	return normalize_rut(candidates.pop()) if len(candidates) == 1 else None
+
+# Función para detectar localmente los campos de identidad y contacto del CV
+def extract_contact_fields(cv_text: str) -> Dict[str, str]:
+	"""Busca con expresiones regulares el RUT de la persona (ver _find_personal_rut), el correo y el teléfono
+	
+	Retorna solo los campos encontrados, con el RUT ya normalizado como en normalize_rut.
+	Es una pasada local de microsegundos: lo que se encuentra aquí no se pide a OpenAI.
+	"""
+	fields = {}
+	if not cv_text:
+		return fields
 	
+	rut_spans = []
+	rut = _find_personal_rut(cv_text, rut_spans)
+	if rut:
+		fields["rut"] = rut
+	
+	email = EMAIL_PATTERN.search(cv_text)
+	if email:
+		fields["correo_personal"] = email.group(0).rstrip(".").lower()
+	
+	# Los RUT se excluyen para no confundir sus dígitos con un teléfono
+	text_without_ruts = cv_text
+	for start, stop in sorted(rut_spans, reverse=True):
+		text_without_ruts = text_without_ruts[:start] + " " + text_without_ruts[stop:]
+	for match in PHONE_PATTERN.finditer(text_without_ruts):
+		digits = re.sub(r"\D", "", match.group(1))
+		if len(digits) == 9:
+			fields["telefono_personal"] = f"+56 {digits[0]} {digits[1:5]} {digits[5:]}" if digits[0] in "92" else f"+56 {digits[:2]} {digits[2:5]} {digits[5:]}"
+			break
+	return fields
+
+# Función para saber si el CV menciona un RUT aunque no se haya podido validar localmente
+def mentions_rut(cv_text: str) -> bool:
+	"""Indica si el texto tiene algo con forma de RUT o la palabra RUT/RUN/cédula"""
+	return bool(RUT_PATTERN.search(cv_text) or RUT_MENTION_PATTERN.search(cv_text))
+
+# Versión del prompt: cambia automáticamente al modificar el modelo, los prompts o la compactación e invalida la caché
+CV_PROMPT_VERSION = hashlib.sha256(
+	f"{CV_EXTRACTION_MODEL}\n{CV_EXTRACTION_SYSTEM_PROMPT}\n{CV_EXTRACTION_PROMPT}\n"
+	f"{json.dumps(CV_EXTRACTION_FIELDS, ensure_ascii=False)}\n"
+	f"{CV_COMPACTION_VERSION}:{CV_TOKEN_BUDGET}:{CV_LOCAL_FIELDS_VERSION}".encode("utf-8")
+).hexdigest()[:16]
+
+# Límites de la cuenta de OpenAI; se corrigen con los encabezados x-ratelimit-* de cada respuesta
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+
+# Llamadas simultáneas a OpenAI en todo el proceso (el limitador la reduce ante un 429)
+OPENAI_MAX_CONCURRENCY = max(1, int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")))
+
+# Reintentos ante 429, timeouts y errores 5xx, con backoff exponencial con jitter
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+OPENAI_BACKOFF_BASE_SECONDS = 1.0
+OPENAI_BACKOFF_MAX_SECONDS = 60.0
+
+def _parse_reset_seconds(value: Optional[str]) -> Optional[float]:
+	"""Convierte "1s", "6m0s" o "250ms" (formato de x-ratelimit-reset-*) a segundos"""
+	if not value:
+		return None
+	parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+	if not parts:
+		try:
+			return float(value)
+		except ValueError:
+			return None
+	units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+	return sum(float(number) * units[unit] for number, unit in parts)
+
+class OpenAIRateLimiter:
+	"""Limitador compartido por todas las sesiones y hilos que llaman a OpenAI
+	
+	Mantiene dos baldes de fichas (peticiones y tokens por minuto) y un límite de
+	llamadas simultáneas. Las capacidades se ajustan con los encabezados de límite de
+	cada respuesta; la concurrencia crece de a uno mientras no hay errores y se reduce
+	a la mitad ante un 429 (AIMD), con una pausa global hasta que el límite se recupere.
+	"""
+	
+	def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_concurrency: int):
+		self._condition = threading.Condition()
+		self.request_capacity = float(requests_per_minute)
+		self.token_capacity = float(tokens_per_minute)
+		self.max_concurrency = max_concurrency
+		self.concurrency = max_concurrency
+		self._requests = self.request_capacity
+		self._tokens = self.token_capacity
+		self._updated = time.monotonic()
+		self._in_flight = 0
+		self._successes = 0
+		self._paused_until = 0.0
+	
+	def _refill(self, now: float):
+		elapsed = now - self._updated
+		self._updated = now
+		self._requests = min(self.request_capacity, self._requests + elapsed * self.request_capacity / 60)
+		self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_capacity / 60)
+	
+	def acquire(self, tokens: int):
+		"""Espera hasta que haya cupo de peticiones, tokens y concurrencia, y lo reserva"""
+		tokens = min(tokens, self.token_capacity)
+		with self._condition:
+			while True:
+				now = time.monotonic()
+				self._refill(now)
+				if now < self._paused_until:
+					self._condition.wait(self._paused_until - now)
+					continue
+				if self._in_flight >= self.concurrency:
+					self._condition.wait()
+					continue
+				wait = max(
+					(1 - self._requests) * 60 / self.request_capacity,
+					(tokens - self._tokens) * 60 / self.token_capacity
+				)
+				if wait <= 0:
+					self._requests -= 1
+					self._tokens -= tokens
+					self._in_flight += 1
+					return
+				self._condition.wait(wait)
+	
+	def release(self, estimated_tokens: int, used_tokens: Optional[int] = None, headers=None):
+		"""Libera el cupo tras una respuesta exitosa y ajusta los baldes con los datos reales"""
+		with self._condition:
+			self._in_flight -= 1
+			if used_tokens is not None:
+				self._tokens = min(self.token_capacity, self._tokens + estimated_tokens - used_tokens)
+			if headers is not None:
+				self._apply_headers(headers)
+			self._successes += 1
+			if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+				self.concurrency += 1
+				self._successes = 0
+			self._condition.notify_all()
+	
+	def fail(self, retry_after: Optional[float] = None, rate_limited: bool = False):
+		"""Libera el cupo tras un error; ante un 429 reduce la concurrencia y pausa las llamadas"""
+		with self._condition:
+			self._in_flight -= 1
+			if rate_limited:
+				self.concurrency = max(1, self.concurrency // 2)
+				self._successes = 0
+				self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or OPENAI_BACKOFF_BASE_SECONDS))
+			self._condition.notify_all()
+	
+	def _apply_headers(self, headers):
+		"""Corrige capacidades y saldos con x-ratelimit-limit-* y x-ratelimit-remaining-*"""
+		for kind, capacity_attr, level_attr in (("requests", "request_capacity", "_requests"), ("tokens", "token_capacity", "_tokens")):
+			try:
+				limit = headers.get(f"x-ratelimit-limit-{kind}")
+				remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+				if limit:
+					setattr(self, capacity_attr, float(limit))
+				if remaining is not None:
+					setattr(self, level_attr, min(getattr(self, level_attr), float(remaining)))
+			except (TypeError, ValueError):
+				continue
+
+# Limitador de OpenAI compartido por todas las sesiones del proceso
+@st.cache_resource
+def get_openai_limiter() -> OpenAIRateLimiter:
+	"""Retorna el limitador de llamadas a OpenAI del proceso"""
+	return OpenAIRateLimiter(OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, OPENAI_MAX_CONCURRENCY)
+
+def _openai_backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+	"""Backoff exponencial con jitter completo, nunca menor a lo que pide el servidor"""
+	delay = random.uniform(0, min(OPENAI_BACKOFF_MAX_SECONDS, OPENAI_BACKOFF_BASE_SECONDS * 2 ** attempt))
+	return max(delay, retry_after or 0.0)
+
+def _retry_after_seconds(error) -> Optional[float]:
+	"""Segundos de espera indicados por el servidor en un error (retry-after o x-ratelimit-reset-*)"""
+	response = getattr(error, "response", None)
+	if response is None:
+		return None
+	headers = response.headers
+	retry_after = _parse_reset_seconds(headers.get("retry-after"))
+	if retry_after is not None:
+		return retry_after
+	resets = [_parse_reset_seconds(headers.get(name)) for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+	resets = [reset for reset in resets if reset is not None]
+	return min(resets) if resets else None
+
+# Llamada a OpenAI pasando por el limitador, con reintentos (lanza la excepción si se agotan)
+def call_openai(client, completion_tokens: int = 500, endpoint: str = "chat", **kwargs):
+	"""Llama a client.chat.completions.create (o client.embeddings.create con endpoint="embeddings")
+	respetando los límites de la cuenta
+	
+	Los tokens de la petición se estiman con el tokenizador más `completion_tokens`
+	para la respuesta. Los 429, timeouts, errores de conexión y 5xx se reintentan con
+	backoff exponencial con jitter; un 429 por cuota agotada no se reintenta.
+	
+	Con stream=True retorna un generador de chunks: la llamada (y el cupo del limitador)
+	empieza al pedir el primer chunk y el cupo se libera al agotarse o cerrarse el
+	generador, así un stream que nunca se recorre no retiene cupo. Un stream que se
+	corta antes del primer chunk se reintenta.
+	"""
+	limiter = get_openai_limiter()
+	if endpoint == "embeddings":
+		api = client.embeddings
+		estimated_tokens = sum(count_tokens(text) for text in kwargs["input"])
+	else:
+		api = client.chat.completions
+		estimated_tokens = sum(count_tokens(message["content"]) for message in kwargs["messages"]) + completion_tokens
+		if kwargs.get("stream"):
+			# El último chunk trae el uso real, con el que se corrige el balde de tokens
+			kwargs["stream_options"] = {**kwargs.get("stream_options", {}), "include_usage": True}
+			return _stream_openai(api, limiter, estimated_tokens, kwargs)
+	
+	raw_response, response, _, _ = _create_with_retries(api, limiter, estimated_tokens, kwargs)
+	usage = getattr(response, "usage", None)
+	limiter.release(estimated_tokens, getattr(usage, "total_tokens", None), raw_response.headers)
+	return response
+
+def _create_with_retries(api, limiter: OpenAIRateLimiter, estimated_tokens: int, kwargs: Dict[str, Any]) -> tuple:
+	"""Hace la llamada con reintentos y retorna (raw_response, response, chunks, primer chunk) con el cupo tomado
+	
+	chunks y el primer chunk solo existen con stream=True. Quien llama debe liberar el
+	cupo con limiter.release o limiter.fail.
+	"""
+	for attempt in range(OPENAI_MAX_RETRIES + 1):
+		limiter.acquire(estimated_tokens)
+		try:
+			raw_response = api.with_raw_response.create(**kwargs)
+		except RateLimitError as e:
+			retry_after = _retry_after_seconds(e)
+			limiter.fail(retry_after, rate_limited=True)
+			if getattr(e, "code", None) == "insufficient_quota" or attempt == OPENAI_MAX_RETRIES:
+				raise
+			delay = _openai_backoff_delay(attempt, retry_after)
+			logger.warning("OpenAI respondió 429, reintento %s en %.1f s", attempt + 1, delay)
+			time.sleep(delay)
+			continue
+		except (APIConnectionError, APITimeoutError, InternalServerError) as e:
+			limiter.fail()
+			if attempt == OPENAI_MAX_RETRIES:
+				raise
+			delay = _openai_backoff_delay(attempt)
+			logger.warning("Error transitorio de OpenAI (%s), reintento %s en %.1f s", e, attempt + 1, delay)
+			time.sleep(delay)
+			continue
+		except Exception:
+			limiter.fail()
+			raise
+		
+		response = raw_response.parse()
+		if not kwargs.get("stream"):
+			return raw_response, response, None, None
+		chunks = iter(response)
+		try:
+			first_chunk = next(chunks, None)
+		except (APIError, httpx.TransportError) as e:
+			response.close()
+			limiter.fail()
+			if attempt == OPENAI_MAX_RETRIES:
+				raise
+			delay = _openai_backoff_delay(attempt)
+			logger.warning("Stream de OpenAI cortado antes del primer chunk (%s), reintento %s en %.1f s", e, attempt + 1, delay)
+			time.sleep(delay)
+			continue
+		except Exception:
+			response.close()
+			limiter.fail()
+			raise
+		return raw_response, response, chunks, first_chunk
+
+def _stream_openai(api, limiter: OpenAIRateLimiter, estimated_tokens: int, kwargs: Dict[str, Any]):
+	"""Hace la llamada en streaming al pedir el primer chunk y libera el cupo al terminar, con el uso real"""
+	raw_response, response, chunks, first_chunk = _create_with_retries(api, limiter, estimated_tokens, kwargs)
+	usage = None
+	completed = False
 	try:
-		response = client.chat.completions.create(
-			model="gpt-4o-mini",
-			messages=[
-				{"role": "system", "content": "Eres un asistente experto en extraer información de CVs. Responde SOLO con JSON válido."},
-				{"role": "user", "content": prompt}
-			],
-			temperature=0.3,
-			response_format={"type": "json_object"}
-		)
-		
-		result = json.loads(response.choices[0].message.content)
-		return result
+		if first_chunk is not None:
+			usage = getattr(first_chunk, "usage", None)
+			yield first_chunk
+			for chunk in chunks:
+				usage = getattr(chunk, "usage", None) or usage
+				yield chunk
+		completed = True
+	finally:
+		response.close()
+		if completed:
+			limiter.release(estimated_tokens, getattr(usage, "total_tokens", None), raw_response.headers)
+		else:
+			# Cerrado antes de tiempo o cortado a mitad: los tokens ya se consumieron, se conserva la estimación
+			limiter.fail()
+
+# Tokens esperados en la respuesta de la extracción (para reservar cupo en el limitador)
+CV_EXTRACTION_COMPLETION_TOKENS = 700
+
+# Campos que se piden a OpenAI: los que no se detectaron localmente
+def _requested_cv_fields(local_fields: Dict[str, str]) -> list:
+	"""Nombres de los campos de CV_EXTRACTION_FIELDS que no están en `local_fields`"""
+	return [name for name in CV_EXTRACTION_FIELDS if name not in local_fields]
+
+# Llave del resultado de OpenAI en la caché local
+def _cv_ai_cache_key(file_hash: Optional[str], local_fields: Dict[str, str]) -> str:
+	"""Cambia con el archivo, la versión del prompt y los campos pedidos (una respuesta sin rut no sirve si ahora se pide)"""
+	return f"ai:{file_hash}:{CV_PROMPT_VERSION}:{','.join(sorted(_requested_cv_fields(local_fields)))}"
+
+# Mensajes para OpenAI con el texto compactado y solo los campos que no se detectaron localmente
+def _build_cv_extraction_messages(cv_text: str, local_fields: Dict[str, str]) -> tuple:
+	"""Retorna los mensajes del chat y el texto compactado que se envía"""
+	compacted_text = compact_cv_text(cv_text)
+	fields = "\n\t".join(f"- {name}: {CV_EXTRACTION_FIELDS[name]}" for name in _requested_cv_fields(local_fields))
+	prompt = CV_EXTRACTION_PROMPT.format(fields=fields, cv_text=compacted_text)
+	messages = [
+		{"role": "system", "content": CV_EXTRACTION_SYSTEM_PROMPT},
+		{"role": "user", "content": prompt}
+	]
+	return messages, compacted_text
+
+def _cached_prompt_tokens(usage) -> int:
+	"""Tokens del prompt que OpenAI sirvió desde su caché de prompts (0 si no lo informa)"""
+	details = getattr(usage, "prompt_tokens_details", None)
+	return getattr(details, "cached_tokens", None) or 0
+
+class PromptCacheStats:
+	"""Tokens de prompt enviados y servidos desde la caché de OpenAI, acumulados en el proceso"""
+	
+	def __init__(self):
+		self._lock = threading.Lock()
+		self.prompt_tokens = 0
+		self.cached_tokens = 0
+	
+	def record(self, usage) -> tuple:
+		"""Suma el uso de una respuesta y retorna (tokens de prompt, tokens en caché)"""
+		prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+		cached_tokens = _cached_prompt_tokens(usage)
+		with self._lock:
+			self.prompt_tokens += prompt_tokens
+			self.cached_tokens += cached_tokens
+		return prompt_tokens, cached_tokens
+	
+	def hit_rate(self) -> float:
+		"""Fracción de los tokens de prompt servidos desde la caché"""
+		with self._lock:
+			return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+@st.cache_resource
+def get_prompt_cache_stats() -> PromptCacheStats:
+	"""Retorna las estadísticas de caché de prompts del proceso"""
+	return PromptCacheStats()
+
+def _log_cv_extraction(started: float, cv_text: str, compacted_text: str, usage):
+	"""Registra la latencia y los tokens de una extracción"""
+	logger.info(
+		"CV procesado con IA en %.2f s: %s tokens del CV compactados a %s (prompt total: %s, %s desde la caché de OpenAI)",
+		time.perf_counter() - started,
+		count_tokens(cv_text),
+		count_tokens(compacted_text),
+		getattr(usage, "prompt_tokens", "?"),
+		_cached_prompt_tokens(usage)
+	)
+
+# Llamada a OpenAI para extraer los campos del CV (lanza la excepción si falla)
+def _request_cv_extraction(client, cv_text: str, file_hash: Optional[str] = None, local_fields: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+	"""Envía el texto del CV a OpenAI y retorna el JSON con la información estructurada
+	
+	El RUT, el correo y el teléfono detectados localmente (extract_contact_fields) no
+	se piden al modelo y se agregan al resultado. Si se entrega el hash del archivo, el
+	resultado se guarda en la caché local y un archivo ya procesado con la misma
+	versión del prompt no vuelve a llamar a OpenAI.
+	"""
+	if local_fields is None:
+		local_fields = extract_contact_fields(cv_text)
+	
+	cache = get_cv_cache()
+	cache_key = _cv_ai_cache_key(file_hash, local_fields)
+	if file_hash:
+		cached_result = cache.get(cache_key)
+		if cached_result is not None:
+			return {**json.loads(cached_result), **local_fields}
+	
+	messages, compacted_text = _build_cv_extraction_messages(cv_text, local_fields)
+	started = time.perf_counter()
+	response = call_openai(
+		client,
+		CV_EXTRACTION_COMPLETION_TOKENS,
+		model=CV_EXTRACTION_MODEL,
+		messages=messages,
+		temperature=0.3,
+		response_format={"type": "json_object"}
+	)
+	_log_cv_extraction(started, cv_text, compacted_text, getattr(response, "usage", None))
+	
+	result = json.loads(response.choices[0].message.content)
+	if file_hash and result:
+		cache.put(cache_key, json.dumps(result, ensure_ascii=False))
+	return {**result, **local_fields} if result else result
+
+# Función para leer un objeto JSON incompleto (respuesta en streaming)
+def parse_partial_json(text: str) -> Dict[str, Any]:
+	"""Interpreta el prefijo de un objeto JSON cerrando el string y las llaves abiertas
+	
+	Un valor de texto a medio llegar se retorna truncado; una llave incompleta se
+	descarta. Retorna {} si todavía no hay nada interpretable.
+	"""
+	closers = []
+	in_string = False
+	escape = False
+	last_comma = None
+	for index, char in enumerate(text):
+		if in_string:
+			if escape:
+				escape = False
+			elif char == "\\":
+				escape = True
+			elif char == '"':
+				in_string = False
+			continue
+		if char == '"':
+			in_string = True
+		elif char in "{[":
+			closers.append("}" if char == "{" else "]")
+		elif char in "}]":
+			if closers:
+				closers.pop()
+		elif char == "," and len(closers) == 1:
+			last_comma = index
+	
+	closing = "".join(reversed(closers))
+	if in_string:
+		candidates = [(text[:-1] if escape else text) + '"' + closing]
+	else:
+		candidates = [text.rstrip().rstrip(",:") + closing]
+	# Si lo último es una llave a medias, quedarse con los campos completos
+	if last_comma is not None:
+		candidates.append(text[:last_comma] + "}")
+	
+	for candidate in candidates:
+		try:
+			parsed = json.loads(candidate)
+		except ValueError:
+			continue
+		if isinstance(parsed, dict):
+			return parsed
+	return {}
+
+# Llamada a OpenAI en streaming (lanza la excepción si falla)
+def _stream_cv_extraction(client, cv_text: str, file_hash: Optional[str] = None, local_fields: Optional[Dict[str, str]] = None):
+	"""Como _request_cv_extraction, pero entrega los campos a medida que el modelo los genera
+	
+	Genera diccionarios parciales cada vez más completos; el último es el resultado
+	final (el único si ya estaba en la caché).
+	"""
+	if local_fields is None:
+		local_fields = extract_contact_fields(cv_text)
+	
+	cache = get_cv_cache()
+	cache_key = _cv_ai_cache_key(file_hash, local_fields)
+	if file_hash:
+		cached_result = cache.get(cache_key)
+		if cached_result is not None:
+			yield {**json.loads(cached_result), **local_fields}
+			return
+	
+	# Los campos detectados localmente se muestran antes de la primera respuesta del modelo
+	if local_fields:
+		yield dict(local_fields)
+	
+	messages, compacted_text = _build_cv_extraction_messages(cv_text, local_fields)
+	started = time.perf_counter()
+	stream = call_openai(
+		client,
+		CV_EXTRACTION_COMPLETION_TOKENS,
+		model=CV_EXTRACTION_MODEL,
+		messages=messages,
+		temperature=0.3,
+		response_format={"type": "json_object"},
+		stream=True,
+		stream_options={"include_usage": True}
+	)
+	
+	content = []
+	usage = None
+	first_token = None
+	try:
+		for chunk in stream:
+			usage = getattr(chunk, "usage", None) or usage
+			if not chunk.choices:
+				continue
+			delta = chunk.choices[0].delta.content
+			if not delta:
+				continue
+			if first_token is None:
+				first_token = time.perf_counter() - started
+			content.append(delta)
+			partial = parse_partial_json("".join(content))
+			if partial:
+				yield {**partial, **local_fields}
+	finally:
+		# Si quien consume este generador lo abandona, el cupo del limitador se libera aquí
+		stream.close()
+	
+	_log_cv_extraction(started, cv_text, compacted_text, usage)
+	logger.info("Primer token del CV en %.2f s", first_token or 0.0)
+	
+	result = json.loads("".join(content))
+	if file_hash and result:
+		cache.put(cache_key, json.dumps(result, ensure_ascii=False))
+	yield {**result, **local_fields} if result else result
+
+# Función para procesar CV con OpenAI
+def process_cv_with_ai(cv_text: str, client=None, file_hash: Optional[str] = None) -> Dict[str, Any]:
+	"""Procesa el CV con OpenAI y extrae la información estructurada"""
+	client = client or st.session_state.openai_client
+	
+	try:
+		return _request_cv_extraction(client, cv_text, file_hash)
 	except Exception as e:
 		st.error(f"Error al procesar CV con IA: {str(e)}")
 		return {}
 
+# Función para procesar CV con OpenAI mostrando los campos a medida que llegan
+def process_cv_with_ai_streaming(cv_text: str, placeholder, client=None, file_hash: Optional[str] = None) -> Dict[str, Any]:
+	"""Procesa el CV en streaming, dibujando en `placeholder` los campos ya recibidos
+	
+	Los datos de identidad aparecen en cuanto el modelo los emite y el resumen al
+	final; retorna el resultado completo, igual que process_cv_with_ai.
+	"""
+	client = client or st.session_state.openai_client
+	
+	processed_data = {}
+	try:
+		for processed_data in _stream_cv_extraction(client, cv_text, file_hash):
+			_render_cv_preview(placeholder, processed_data)
+	except Exception as e:
+		placeholder.empty()
+		st.error(f"Error al procesar CV con IA: {str(e)}")
+		return {}
+	placeholder.empty()
+	return processed_data
+
+# Campos que se muestran mientras llega la respuesta, en el orden en que el modelo los genera
+CV_PREVIEW_FIELDS = [
+	("rut", "RUT"),
+	("nombre", "Nombre"),
+	("apellido", "Apellido"),
+	("telefono_personal", "Teléfono"),
+	("correo_personal", "Correo"),
+	("carrera_estudios", "Carrera/Estudios"),
+	("anos_experiencia", "Años de Experiencia"),
+	("experiencia", "Experiencia"),
+	("certificaciones", "Certificaciones"),
+	("otros", "Otros"),
+	("resumen_ia", "Resumen IA")
+]
+
+def _render_cv_preview(placeholder, data: Dict[str, Any]):
+	"""Dibuja los campos recibidos hasta ahora (sin widgets, para poder redibujar muchas veces)"""
+	lines = ["### Información Extraída:"]
+	for key, label in CV_PREVIEW_FIELDS:
+		value = data.get(key)
+		if value not in (None, ""):
+			lines.append(f"**{label}:** {value}")
+	placeholder.markdown("\n\n".join(lines))
+
+# Buckets ya verificados en este proceso (compartidos por todas las sesiones)
+@st.cache_resource
+def _get_verified_buckets() -> tuple:
+	"""Retorna el conjunto de buckets verificados y el lock que lo protege"""
+	return set(), threading.Lock()
+
+# Función para olvidar la verificación de un bucket
+def invalidate_bucket_cache(bucket_name: str = "cvs"):
+	"""Fuerza a verificar de nuevo el bucket en la próxima subida"""
+	verified, lock = _get_verified_buckets()
+	with lock:
+		verified.discard(bucket_name)
+
 # Función para asegurar que el bucket existe
 def ensure_bucket_exists(supabase, bucket_name: str = "cvs"):
-	"""Asegura que el bucket existe, si no, intenta crearlo"""
+	"""Asegura que el bucket existe, si no, intenta crearlo
+	
+	La verificación se hace una sola vez por proceso y bucket; se repite solo si una
+	subida falla porque el bucket no existe (ver invalidate_bucket_cache).
+	"""
+	verified, lock = _get_verified_buckets()
+	if bucket_name in verified:
+		return True
+	
+	with lock:
+		# Otro hilo pudo verificarlo mientras se esperaba el lock
+		if bucket_name not in verified:
+			_verify_bucket(supabase, bucket_name)
+			verified.add(bucket_name)
+	return True
+
+# Función para verificar (o crear) el bucket en Supabase Storage
+def _verify_bucket(supabase, bucket_name: str):
+	"""Verifica que el bucket existe, si no, intenta crearlo"""
 	try:
 		# Intentar listar buckets para verificar si existe
 		buckets = supabase.storage.list_buckets()
@@ -328,403 +1253,1033 @@ def ensure_bucket_exists(supabase, bucket_name: str = "cvs"):
 		# Re-lanzar el error con más contexto
 		raise e
 
+# Función para construir el nombre del CV en Storage (RUT normalizado y timestamp)
+def _cv_storage_file_name(rut: Optional[str], file_extension: str) -> str:
+	"""Retorna un nombre de archivo ASCII seguro para Supabase Storage"""
+	timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+	clean_rut = normalize_rut(rut) or "cv"
+	file_name = re.sub(r'[^a-zA-Z0-9._-]', '_', f"{clean_rut}_{timestamp}.{file_extension}").lstrip('.-_')
+	return file_name or f"cv_{timestamp}.{file_extension}"
+
+# Subida de bytes a Supabase Storage (lanza la excepción si falla)
+def _upload_cv_bytes(supabase, file_content: bytes, file_name: str, content_type: str, bucket_name: str = "cvs") -> str:
+	"""Sube el contenido al bucket y retorna la URL pública
+	
+	Es seguro llamarla desde varios hilos: todos comparten el cliente HTTP de
+	supabase.storage (keep-alive y HTTP/2), así que no se abre una conexión por archivo.
+	"""
+	ensure_bucket_exists(supabase, bucket_name)
+	try:
+		supabase.storage.from_(bucket_name).upload(
+			file_name,
+			file_content,
+			{"content-type": content_type, "upsert": "true"}
+		)
+	except Exception as e:
+		if "bucket not found" in str(e).lower():
+			invalidate_bucket_cache(bucket_name)
+		raise
+	return supabase.storage.from_(bucket_name).get_public_url(file_name)
+
 # Función para subir CV a Supabase Storage
 def upload_cv_to_storage(file, rut: str, file_extension: str) -> Optional[str]:
-	"""Sube un archivo CV a Supabase Storage y retorna la URL pública"""
+	"""Sube un archivo CV (o un CVBuffer) a Supabase Storage y retorna la URL pública"""
 	try:
 		supabase = st.session_state.supabase
 		
-		# Asegurar que el bucket existe
-		ensure_bucket_exists(supabase, "cvs")
-		
-		# Leer el contenido del archivo como bytes
-		# Intentar resetear el puntero si es posible
-		import io
-		try:
-			file.seek(0)
-		except (AttributeError, io.UnsupportedOperation):
-			# Si no se puede hacer seek, el archivo puede estar en una posición incorrecta
-			pass
-		
-		file_content = file.read()
-		
-		# Si el contenido está vacío, intentar leer de nuevo desde el inicio
-		if not file_content or len(file_content) == 0:
-			try:
-				file.seek(0)
-				file_content = file.read()
-			except (AttributeError, io.UnsupportedOperation):
-				pass
-		
-		# Asegurar que el contenido es bytes
-		if isinstance(file_content, str):
-			file_content = file_content.encode('utf-8')
-		elif not isinstance(file_content, bytes):
-			# Si no es bytes ni string, intentar convertirlo
-			try:
-				file_content = bytes(file_content)
-			except TypeError:
-				# Si no se puede convertir, intentar leer el archivo de otra manera
-				if hasattr(file, 'getvalue'):
-					file_content = file.getvalue()
-				else:
-					raise Exception("No se pudo leer el contenido del archivo")
+		# Un CVBuffer se sube sin copiar su contenido; otros archivos se leen una sola vez
+		buffer = file if isinstance(file, CVBuffer) else CVBuffer.from_file(file)
 		
 		# Crear nombre único para el archivo usando RUT normalizado y timestamp
-		timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-		
-		# Normalizar RUT (solo primeros 8 dígitos)
-		clean_rut = normalize_rut(rut)
-		
-		# Si el RUT normalizado está vacío, usar un valor por defecto
-		if not clean_rut:
-			clean_rut = "cv"
-		
-		# Crear el nombre del archivo - formato simple y seguro
-		file_name = f"{clean_rut}_{timestamp}.{file_extension}"
-		
-		# Validación final: asegurar que es un string ASCII válido y no está vacío
-		file_name = str(file_name).strip()
-		
-		# Validar que no esté vacío
-		if not file_name or len(file_name) == 0:
-			file_name = f"cv_{timestamp}.{file_extension}"
-		
-		# Validar que sea ASCII
-		try:
-			file_name.encode('ascii')
-		except UnicodeEncodeError:
-			# Si tiene caracteres no ASCII, usar solo timestamp
-			file_name = f"cv_{timestamp}.{file_extension}"
-		
-		# Validación adicional: asegurar que el nombre no tenga caracteres problemáticos
-		# Reemplazar cualquier carácter que no sea alfanumérico, punto, guión bajo o guión
-		import re
-		file_name = re.sub(r'[^a-zA-Z0-9._-]', '_', file_name)
-		
-		# Asegurar que el nombre no empiece con punto o guión
-		file_name = file_name.lstrip('.-_')
-		
-		# Si después de todo esto está vacío, usar un nombre por defecto
-		if not file_name or len(file_name) == 0:
-			file_name = f"cv_{timestamp}.{file_extension}"
+		file_name = _cv_storage_file_name(rut, file_extension)
 		
 		# Determinar content-type
-		content_type = "application/pdf" if file_extension == "pdf" else "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-		if hasattr(file, 'type') and file.type:
-			content_type = file.type
-		
-		# Convertir el contenido a BytesIO para asegurar compatibilidad
-		from io import BytesIO
-		file_bytes = BytesIO(file_content)
-		
-		# Resetear el puntero del archivo original para poder leerlo de nuevo si es necesario
-		file.seek(0)
-		
-		# Asegurar que file_name es exactamente un string simple (no bytes, no None, no objeto)
-		file_name = str(file_name).strip()
+		content_type = buffer.file_type or ("application/pdf" if file_extension == "pdf" else DOCX_MIME_TYPE)
 		
-		# Validación final: asegurar que es un string válido y no está vacío
-		if not file_name or not isinstance(file_name, str):
-			file_name = f"cv_{timestamp}.{file_extension}"
+		return _upload_cv_bytes(supabase, buffer.data, file_name, content_type)
 		
-		# Limpiar el nombre del archivo de caracteres problemáticos
-		file_name_str = re.sub(r'[^a-zA-Z0-9._-]', '_', file_name)
-		file_name_str = file_name_str.lstrip('.-_')
+	except Exception as e:
+		error_msg = str(e)
+		st.error(f"Error al subir CV a Storage: {error_msg}")
 		
-		# Si después de limpiar está vacío, usar un nombre por defecto
-		if not file_name_str or len(file_name_str) == 0:
-			file_name_str = f"cv_{timestamp}.{file_extension}"
+		# Mostrar detalles del error para debugging
+		if hasattr(e, 'message'):
+			st.error(f"Detalles del error: {e.message}")
 		
-		# Asegurar que file_name_str es un string válido y no está vacío
-		file_name_str = str(file_name_str).strip()
-		if not file_name_str:
-			file_name_str = f"cv_{timestamp}.{file_extension}"
+		# Si el error es que el bucket no existe, mostrar instrucciones
+		if "bucket not found" in error_msg.lower() or "404" in error_msg.lower():
+			# El bucket pudo ser eliminado después de verificarlo: volver a verificar en la próxima subida
+			invalidate_bucket_cache("cvs")
+			st.warning("""
+			**El bucket 'cvs' no existe en Supabase Storage.**
+			
+			Por favor, créalo manualmente:
+			1. Ve a tu proyecto en Supabase: https://supabase.com/dashboard
+			2. Selecciona tu proyecto
+			3. Ve a la sección **Storage** en el menú lateral
+			4. Haz clic en **"New bucket"** o **"Crear bucket"**
+			5. Nombre del bucket: **cvs**
+			6. Marca la opción **"Public bucket"** (bucket público)
+			7. Haz clic en **"Create bucket"**
+			
+			Una vez creado, intenta subir el CV nuevamente.
+			""")
+		elif "must be string" in error_msg.lower():
+			st.warning("""
+			**Error en el formato del nombre del archivo.**
+			
+			Esto puede deberse a caracteres especiales en el RUT o nombre del archivo.
+			Por favor, verifica que el RUT solo contenga números y letras.
+			""")
 		
-		# Validar que sea ASCII y no tenga caracteres problemáticos
+		return None
+
+# Campos del perfil de ranking que salen del CV (el ID y la puntuación se agregan al rankear)
+RANKING_SNIPPET_FIELDS = (
+	("carrera_estudios", "Carrera/Estudios"),
+	("anos_experiencia", "Años de experiencia"),
+	("experiencia", "Experiencia"),
+	("certificaciones", "Certificaciones"),
+	("resumen_ia", "Resumen IA")
+)
+
+# Función para armar el perfil compacto de un candidato para el prompt de ranking
+def build_ranking_snippet(record: Dict[str, Any]) -> str:
+	"""Perfil del candidato para el ranking: solo los campos con datos, sin espacios de sobra"""
+	lines = []
+	for field, label in RANKING_SNIPPET_FIELDS:
+		value = record.get(field)
+		if value is not None and str(value).strip():
+			lines.append(f"{label}: {' '.join(str(value).split())}")
+	return "\n".join(lines)
+
+def ranking_snippet_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+	"""Columnas ranking_snippet y ranking_snippet_tokens calculadas para el registro"""
+	snippet = build_ranking_snippet(record)
+	return {"ranking_snippet": snippet, "ranking_snippet_tokens": count_tokens(snippet)}
+
+# Función para preparar un registro de personal antes de guardarlo
+def build_personal_record(data: Dict[str, Any], cv_url: Optional[str] = None) -> Dict[str, Any]:
+	"""Normaliza los datos del CV al formato de la tabla personal"""
+	# Normalizar RUT antes de guardar (solo primeros 8 dígitos)
+	rut_normalized = normalize_rut(data.get("rut"))
+	
+	# Preparar datos para insertar
+	personal_data = {
+		"rut": rut_normalized,  # RUT normalizado (solo primeros 8 dígitos)
+		"nombre": data.get("nombre", ""),
+		"apellido": data.get("apellido", ""),
+		"telefono_personal": data.get("telefono_personal"),
+		"correo_personal": data.get("correo_personal"),
+		"carrera_estudios": data.get("carrera_estudios"),
+		"experiencia": data.get("experiencia"),
+		"anos_experiencia": data.get("anos_experiencia"),
+		"certificaciones": data.get("certificaciones"),
+		"otros": data.get("otros"),
+		"resumen_ia": data.get("resumen_ia"),
+		"activo": True,
+		"contratado": False,
+		"updated_at": datetime.now().isoformat()
+	}
+	
+	# Perfil de ranking precalculado: la búsqueda lo lee tal cual, sin armarlo ni contar sus tokens
+	personal_data.update(ranking_snippet_fields(personal_data))
+	
+	# Agregar URL del CV si está disponible
+	if cv_url:
+		personal_data["cv_url"] = cv_url
+	
+	# Hash del archivo del CV, para reconocer un CV ya cargado en la carga masiva
+	if data.get("cv_hash"):
+		personal_data["cv_hash"] = data["cv_hash"]
+	
+	# Embedding del candidato para la búsqueda (ver attach_embeddings)
+	if data.get("embedding"):
+		personal_data["embedding"] = data["embedding"]
+		personal_data["embedding_model"] = data["embedding_model"]
+	
+	return personal_data
+
+# Escritura de un registro de personal (lanza la excepción si falla)
+def _write_personal(supabase, data: Dict[str, Any], cv_url: Optional[str] = None):
+	"""Inserta o actualiza un registro de personal según su RUT normalizado"""
+	personal_data = build_personal_record(data, cv_url)
+	
+	# Verificar si ya existe un registro con el mismo RUT normalizado
+	if personal_data["rut"]:
+		existing = supabase.table("personal").select("id").eq("rut", personal_data["rut"]).execute()
+		if existing.data:
+			# Actualizar registro existente
+			response = supabase.table("personal").update(personal_data).eq("rut", personal_data["rut"]).execute()
+			index_personal_rows(response.data)
+			return
+	
+	# Insertar nuevo registro
+	response = supabase.table("personal").insert(personal_data).execute()
+	index_personal_rows(response.data)
+
+# Índice léxico (BM25) de los candidatos disponibles, compartido por todas las sesiones
+@st.cache_resource
+def get_lexical_index() -> BM25Index:
+	"""Retorna el índice BM25 de candidatos del proceso"""
+	return BM25Index()
+
+# Función para actualizar el índice léxico con filas recién escritas en la tabla personal
+def index_personal_rows(rows: Optional[list]):
+	"""Indexa las filas disponibles (activas y no contratadas) y quita las demás del índice BM25"""
+	index = get_lexical_index()
+	for row in rows or []:
+		if row.get("id") is None:
+			continue
+		if row.get("activo", True) and not row.get("contratado"):
+			index.upsert(row["id"], row, _row_signature(row))
+		else:
+			index.remove(row["id"])
+
+# Función para guardar personal en Supabase
+def save_personal_to_db(data: Dict[str, Any], cv_url: Optional[str] = None, supabase=None) -> bool:
+	"""Guarda la información del personal en Supabase"""
+	try:
+		data = attach_embeddings([data])[0]
+		_write_personal(supabase or st.session_state.supabase, data, cv_url)
+		return True
+	except Exception as e:
+		st.error(f"Error al guardar en base de datos: {str(e)}")
+		return False
+
+# Número de registros por cada upsert masivo
+PERSONAL_UPSERT_CHUNK_SIZE = 100
+
+# Upsert de un grupo de registros con las mismas columnas (lanza la excepción si falla)
+def _upsert_personal_chunk(supabase, chunk: list) -> set:
+	"""Escribe el grupo con un solo upsert y retorna los RUT que ya existían (actualizados)"""
+	ruts = [record["rut"] for record in chunk]
+	existing = supabase.table("personal").select("rut").in_("rut", ruts).execute()
+	existing_ruts = {row["rut"] for row in (existing.data or [])}
+	response = supabase.table("personal").upsert(chunk, on_conflict="rut").execute()
+	index_personal_rows(response.data)
+	return existing_ruts
+
+# Función para guardar muchos registros de personal en Supabase
+def save_personal_batch_to_db(records: list, supabase=None, chunk_size: int = PERSONAL_UPSERT_CHUNK_SIZE, embedder=None) -> Dict[str, list]:
+	"""Guarda muchos registros con un upsert por grupo y reporta insertados, actualizados, fallidos y duplicados
+	
+	Cada registro es un diccionario como el que recibe save_personal_to_db (puede incluir
+	"cv_url"). Si el upsert de un grupo falla, sus registros se reintentan uno a uno para
+	que un registro inválido no haga fallar al resto. Si varios registros tienen el mismo
+	RUT se guarda el último y los anteriores quedan en "duplicates", así la suma de las
+	cuatro listas es el número de registros recibidos.
+	"""
+	supabase = supabase or st.session_state.supabase
+	result = {"inserted": [], "updated": [], "failed": [], "duplicates": []}
+	records = attach_embeddings(records, embedder)
+	
+	# Normalizar y quedarse con el último registro de cada RUT (un upsert no puede tocar dos veces la misma fila)
+	by_rut = {}
+	for data in records:
+		record = build_personal_record(data, data.get("cv_url"))
+		if not record["rut"]:
+			result["failed"].append((data.get("rut"), "RUT faltante"))
+			continue
+		if by_rut.pop(record["rut"], None) is not None:
+			result["duplicates"].append((record["rut"], "RUT duplicado en el lote"))
+		by_rut[record["rut"]] = record
+	
+	# PostgREST exige las mismas columnas en todas las filas de un upsert, así que se agrupa por columnas
+	groups = {}
+	for record in by_rut.values():
+		groups.setdefault(tuple(sorted(record)), []).append(record)
+	
+	for group in groups.values():
+		for start in range(0, len(group), chunk_size):
+			chunk = group[start:start + chunk_size]
+			try:
+				existing_ruts = _upsert_personal_chunk(supabase, chunk)
+			except Exception:
+				# Aislar el error: reintentar cada registro por separado
+				existing_ruts = set()
+				ok_chunk = []
+				for record in chunk:
+					try:
+						existing_ruts |= _upsert_personal_chunk(supabase, [record])
+						ok_chunk.append(record)
+					except Exception as e:
+						result["failed"].append((record["rut"], str(e)))
+				chunk = ok_chunk
+			for record in chunk:
+				if record["rut"] in existing_ruts:
+					result["updated"].append(record["rut"])
+				else:
+					result["inserted"].append(record["rut"])
+	
+	return result
+
+# Proveedor de embeddings de candidatos: "openai" o "hashing" (local y determinista, para pruebas)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").strip().lower()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "512"))
+
+# Candidatos con mejor primer puntaje que pasan al ranking con el LLM (fija el costo en tokens de cada búsqueda)
+SEARCH_TOP_K = int(os.getenv("SEARCH_TOP_K", "30"))
+
+# Pesos del primer puntaje, además de la similitud de embeddings (ver first_pass_scores)
+SEARCH_LEXICAL_WEIGHT = float(os.getenv("SEARCH_LEXICAL_WEIGHT", "0.1"))
+SEARCH_QUALITY_WEIGHT = float(os.getenv("SEARCH_QUALITY_WEIGHT", "0.05"))
+SEARCH_EXPERIENCE_WEIGHT = float(os.getenv("SEARCH_EXPERIENCE_WEIGHT", "0.05"))
+
+# Función para obtener el embedder configurado
+def get_embedder(client=None):
+	"""Retorna el embedder de candidatos, o None si se requiere OpenAI y no hay cliente"""
+	if EMBEDDING_PROVIDER == "hashing":
+		return HashingEmbedder(EMBEDDING_DIMENSIONS)
+	client = client or st.session_state.get("openai_client")
+	if client is None:
+		return None
+	
+	def create(texts):
+		response = call_openai(client, endpoint="embeddings", model=EMBEDDING_MODEL, input=texts, dimensions=EMBEDDING_DIMENSIONS)
+		return [item.embedding for item in response.data]
+	return OpenAIEmbedder(create, f"{EMBEDDING_MODEL}-{EMBEDDING_DIMENSIONS}")
+
+def _vector_to_json(vector) -> list:
+	"""Vector como lista de floats redondeados (columna jsonb)"""
+	return [round(float(value), 6) for value in vector]
+
+# Función para agregar los embeddings a registros de personal antes de guardarlos
+def attach_embeddings(records: list, embedder=None) -> list:
+	"""Retorna los registros con "embedding" y "embedding_model"
+	
+	Si no hay embedder o la llamada falla, los registros se retornan sin cambios y se
+	guardan sin embedding: la búsqueda lo calcula la próxima vez que los necesite.
+	"""
+	embedder = embedder or get_embedder()
+	if embedder is None or not records:
+		return records
+	try:
+		vectors = embedder.embed([candidate_embedding_text(record) for record in records])
+	except Exception as e:
+		logger.warning("No se pudieron calcular los embeddings de %s registros: %s", len(records), e)
+		return records
+	return [
+		{**record, "embedding": _vector_to_json(vector), "embedding_model": embedder.name}
+		for record, vector in zip(records, vectors)
+	]
+
+# Función para completar los embeddings que faltan (registros antiguos o de otro modelo)
+def _ensure_candidate_embeddings(supabase, candidates: list, embedder):
+	"""Calcula los embeddings faltantes, los guarda en la tabla personal y los agrega a los candidatos"""
+	missing = [
+		candidate for candidate in candidates
+		if not candidate.get("embedding") or candidate.get("embedding_model") != embedder.name
+	]
+	if not missing:
+		return
+	
+	logger.info("Calculando embeddings de %s candidatos", len(missing))
+	vectors = embedder.embed([candidate_embedding_text(candidate) for candidate in missing])
+	for candidate, vector in zip(missing, vectors):
+		candidate["embedding"] = _vector_to_json(vector)
+		candidate["embedding_model"] = embedder.name
 		try:
-			file_name_str.encode('ascii')
-		except UnicodeEncodeError:
-			# Si tiene caracteres no ASCII, usar solo timestamp
-			file_name_str = f"cv_{timestamp}.{file_extension}"
-		
-		# Asegurar que el contenido del archivo es bytes
-		if not isinstance(file_content, bytes):
-			raise Exception("El contenido del archivo debe ser bytes")
-		
-		# Asegurar que file_name_str es exactamente un string (no bytes, no None)
-		file_name_str = str(file_name_str).strip()
-		
-		# Validación final del nombre del archivo - debe ser ASCII válido
-		if not file_name_str or not isinstance(file_name_str, str):
-			file_name_str = f"cv_{timestamp}.{file_extension}"
-		
-		# Asegurar que es ASCII válido
+			supabase.table("personal").update({
+				"embedding": candidate["embedding"],
+				"embedding_model": embedder.name
+			}).eq("id", candidate["id"]).execute()
+		except Exception as e:
+			# El índice en memoria igual usa el vector; se reintentará guardar en la próxima búsqueda
+			logger.warning("No se pudo guardar el embedding del candidato %s: %s", candidate["id"], e)
+
+# Índice de vectores de candidatos compartido por todas las sesiones
+@st.cache_resource
+def get_candidate_index() -> VectorIndex:
+	"""Retorna el índice de embeddings de candidatos del proceso"""
+	return VectorIndex()
+
+# Función para saber qué filas debe leer el índice de vectores
+def _stale_vector_ids(candidates: list, embedder) -> set:
+	"""Ids de los candidatos nuevos o modificados desde la última búsqueda y de los sin embedding del modelo actual"""
+	signatures = {candidate["id"]: (candidate.get("embedding_model"), _row_signature(candidate)) for candidate in candidates}
+	stale = set(get_candidate_index().stale_ids(signatures))
+	stale.update(candidate["id"] for candidate in candidates if candidate.get("embedding_model") != embedder.name)
+	return stale
+
+# Función para sincronizar el índice de vectores con los candidatos disponibles
+def _sync_candidate_vectors(supabase, candidates: list, embedder, stale: set, rows: Dict[Any, Dict[str, Any]], filtered: bool = False) -> VectorIndex:
+	"""Deja en el índice de vectores a los candidatos y lo retorna
+	
+	Los candidatos llegan sin vector (ver CANDIDATE_SYNC_COLUMNS): `rows` trae las filas
+	de los ids `stale` (ver _stale_vector_ids) con VECTOR_INDEX_COLUMNS, y a las que no
+	tienen embedding del modelo actual se les calcula. `filtered` indica que `candidates`
+	es solo una parte del personal disponible.
+	"""
+	index = get_candidate_index()
+	stale_rows = {candidate_id: rows[candidate_id] for candidate_id in stale if candidate_id in rows}
+	_ensure_candidate_embeddings(supabase, list(stale_rows.values()), embedder)
+	
+	items = {}
+	for candidate in candidates:
+		row = stale_rows.get(candidate["id"])
+		if row is not None:
+			items[candidate["id"]] = ((row["embedding_model"], _row_signature(row)), row["embedding"])
+		elif candidate["id"] not in stale:
+			items[candidate["id"]] = ((candidate.get("embedding_model"), _row_signature(candidate)), None)
+	index.sync(items, remove_missing=not filtered)
+	return index
+
+# Primera etapa del ranking en cascada
+def first_pass_rank(description: str, candidates: list, embedder=None, vectors: Optional[VectorIndex] = None) -> list:
+	"""Ordena todos los candidatos por un puntaje barato, sin LLM
+	
+	Combina la similitud de embeddings con la descripción (en `vectors`, ya sincronizado
+	por _fetch_available_candidates), el puntaje BM25, la puntuación de calidad y los años
+	de experiencia (ver first_pass_scores). Sin embeddings (sin embedder o índice de
+	vectores, o si la llamada falla) se ordena solo por las demás señales.
+	"""
+	started = time.perf_counter()
+	ids = [candidate["id"] for candidate in candidates]
+	similarities = None
+	if embedder is not None and vectors is not None:
 		try:
-			file_name_str.encode('ascii')
-		except UnicodeEncodeError:
-			file_name_str = f"cv_{timestamp}.{file_extension}"
-		
-		# Asegurar que el contenido del archivo es bytes
-		if not isinstance(file_content, bytes):
-			raise Exception("El contenido del archivo debe ser bytes")
-		
-		# Validar que el nombre del archivo no esté vacío
-		if not file_name_str or len(file_name_str) == 0:
-			file_name_str = f"cv_{timestamp}.{file_extension}"
-		
-		# Método Único y Robusto: Usar argumentos de palabra clave (kwargs)
-		# Esto elimina cualquier ambigüedad sobre el orden de los parámetros
+			similarities = vectors.similarities(embedder.embed([description])[0], ids)
+		except Exception as e:
+			logger.warning("Similitud por embeddings no disponible, el primer puntaje usa las demás señales: %s", e)
+	
+	lexical = dict(get_lexical_index().search(description, allowed_ids=set(ids)))
+	scores = first_pass_scores(
+		similarities,
+		[lexical.get(candidate_id, 0.0) for candidate_id in ids],
+		[candidate.get("puntuacion_calidad") for candidate in candidates],
+		[candidate.get("anos_experiencia") for candidate in candidates],
+		SEARCH_LEXICAL_WEIGHT, SEARCH_QUALITY_WEIGHT, SEARCH_EXPERIENCE_WEIGHT
+	)
+	# Orden estable: los empates mantienen el orden en que llegaron los candidatos
+	order = sorted(range(len(candidates)), key=lambda position: -scores[position])
+	logger.info("Primer puntaje de %s candidatos en %.1f ms", len(candidates), (time.perf_counter() - started) * 1000)
+	return [candidates[position] for position in order]
+
+# Función para agregar a una consulta de personal los requisitos reconocidos en la descripción
+def _apply_search_constraints(query, constraints: Dict[str, Any]):
+	"""Agrega los filtros de parse_search_constraints a la consulta de Supabase"""
+	if constraints.get("min_anos_experiencia"):
+		query = query.gte("anos_experiencia", constraints["min_anos_experiencia"])
+	if constraints.get("min_puntuacion_calidad"):
+		query = query.gte("puntuacion_calidad", constraints["min_puntuacion_calidad"])
+	careers = constraints.get("carreras") or []
+	if len(careers) == 1:
+		query = query.ilike("carrera_estudios", constraint_like_pattern(careers[0]))
+	elif careers:
+		# Carreras alternativas ("ingeniero o constructor civil"): basta cumplir una
+		query = query.or_(",".join(f"carrera_estudios.ilike.{constraint_like_pattern(career)}" for career in careers))
+	for certification in constraints.get("certificaciones") or []:
+		query = query.ilike("certificaciones", constraint_like_pattern(certification))
+	return query
+
+# Columnas que se leen de todo el personal disponible en cada búsqueda: bastan para saber
+# qué filas cambiaron desde la última (el resto se lee solo de esas filas) y para el primer puntaje
+CANDIDATE_SYNC_COLUMNS = "id, updated_at, embedding_model, puntuacion_calidad, anos_experiencia"
+
+# Columnas de los resultados que se muestran (sin el embedding ni el perfil de ranking)
+CANDIDATE_DISPLAY_COLUMNS = (
+	"id, rut, nombre, apellido, telefono_personal, correo_personal, carrera_estudios, anos_experiencia, "
+	"experiencia, certificaciones, otros, resumen_ia, activo, contratado, proyecto_id, puntuacion_calidad, updated_at"
+)
+
+# Columnas que necesita el prompt de ranking
+CANDIDATE_RANKING_COLUMNS = "id, ranking_snippet, ranking_snippet_tokens, puntuacion_calidad"
+
+# Columnas que necesita cada índice en memoria de las filas nuevas o modificadas
+LEXICAL_INDEX_COLUMNS = ("id", "updated_at", *LEXICAL_FIELDS)
+VECTOR_INDEX_COLUMNS = ("id", "updated_at", "embedding", "embedding_model", *EMBEDDING_FIELDS)
+
+# Máximo de ids por consulta in_ (acota el largo de la URL)
+PERSONAL_FETCH_CHUNK_SIZE = 200
+
+def _row_signature(row: Dict[str, Any]) -> str:
+	"""Versión de una fila de personal para los índices en memoria (cambia con cada escritura)"""
+	return row.get("updated_at") or ""
+
+# Función para leer filas de personal por id
+def _fetch_personal_by_ids(supabase, ids: list, columns: str = "*") -> Dict[Any, Dict[str, Any]]:
+	"""Retorna {id: fila} de los ids pedidos que existen, en consultas de PERSONAL_FETCH_CHUNK_SIZE ids"""
+	rows = {}
+	for start in range(0, len(ids), PERSONAL_FETCH_CHUNK_SIZE):
+		chunk = ids[start:start + PERSONAL_FETCH_CHUNK_SIZE]
+		response = supabase.table("personal").select(columns).in_("id", chunk).execute()
+		for row in response.data or []:
+			rows[row["id"]] = row
+	return rows
+
+# Función para leer las filas modificadas que necesitan los índices en memoria
+def _fetch_stale_rows(supabase, lexical_ids: set, vector_ids: set) -> Dict[Any, Dict[str, Any]]:
+	"""Retorna {id: fila} leyendo cada fila una sola vez, con solo las columnas de los índices que la necesitan
+	
+	El embedding (la columna más pesada) se lee solo para el índice de vectores y los
+	textos de BM25 solo para el índice léxico.
+	"""
+	groups = (
+		(lexical_ids - vector_ids, LEXICAL_INDEX_COLUMNS),
+		(vector_ids - lexical_ids, VECTOR_INDEX_COLUMNS),
+		(lexical_ids & vector_ids, tuple(dict.fromkeys(LEXICAL_INDEX_COLUMNS + VECTOR_INDEX_COLUMNS)))
+	)
+	rows = {}
+	for ids, columns in groups:
+		rows.update(_fetch_personal_by_ids(supabase, list(ids), ", ".join(columns)))
+	return rows
+
+def _fetch_available_candidates(supabase, constraints: Optional[Dict[str, Any]] = None, embedder=None) -> tuple:
+	"""Retorna (candidatos, índice de vectores) y sincroniza los índices en memoria
+	
+	Los candidatos son el personal activo y no contratado, solo con CANDIDATE_SYNC_COLUMNS.
+	Con `constraints` los requisitos estrictos se filtran en la base de datos y solo
+	llegan las filas que los cumplen. Con `embedder` también se sincroniza el índice de
+	vectores; sin embedder, o si no se pudo sincronizar, se retorna None en su lugar.
+	"""
+	query = supabase.table("personal").select(CANDIDATE_SYNC_COLUMNS).eq("activo", True).eq("contratado", False)
+	if constraints:
+		query = _apply_search_constraints(query, constraints)
+	candidates = query.execute().data or []
+	
+	# Solo se leen (una vez para ambos índices) y se reindexan las filas cuyo updated_at cambió
+	# desde la última sincronización; con filtros llega solo una parte del personal y no se quita nada
+	index = get_lexical_index()
+	signatures = {candidate["id"]: _row_signature(candidate) for candidate in candidates}
+	stale = set(index.stale_ids(signatures))
+	vector_stale = _stale_vector_ids(candidates, embedder) if embedder is not None else set()
+	rows = _fetch_stale_rows(supabase, stale, vector_stale)
+	changes = index.sync(
+		{
+			candidate_id: (signature, rows.get(candidate_id) if candidate_id in stale else None)
+			for candidate_id, signature in signatures.items()
+			if candidate_id not in stale or candidate_id in rows
+		},
+		remove_missing=not constraints
+	)
+	if changes:
+		logger.info("Índice BM25: %s candidatos actualizados", changes)
+	
+	vectors = None
+	if embedder is not None:
 		try:
-			# Debug: Verificar tipos antes de subir
-			if not isinstance(file_name_str, str):
-				raise Exception(f"El nombre del archivo no es un string: {type(file_name_str)}")
-			
-			# Usar la API de Supabase Storage
-			# Intentar primero con parámetros posicionales, luego con keywords
+			vectors = _sync_candidate_vectors(supabase, candidates, embedder, vector_stale, rows, filtered=bool(constraints))
+		except Exception as e:
+			logger.warning("Índice de vectores no disponible, el primer puntaje usa las demás señales: %s", e)
+	return candidates, vectors
+
+# Tiempo que se reutiliza el resultado de una búsqueda y número máximo de búsquedas guardadas
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "900"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "128"))
+
+class SearchResultCache:
+	"""Caché en memoria de resultados de búsqueda, con expiración (TTL) y desalojo LRU"""
+	
+	def __init__(self, max_entries: int, ttl_seconds: float):
+		self.max_entries = max_entries
+		self.ttl_seconds = ttl_seconds
+		self._lock = threading.Lock()
+		self._entries = OrderedDict()  # llave -> (momento en que se guardó, resultado)
+	
+	def get(self, key) -> Optional[list]:
+		"""Retorna el resultado guardado para la llave (o None si no está o expiró) y lo marca como usado"""
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return None
+			stored_at, result = entry
+			if time.monotonic() - stored_at > self.ttl_seconds:
+				del self._entries[key]
+				return None
+			self._entries.move_to_end(key)
+			return [dict(candidate) for candidate in result]
+	
+	def put(self, key, result: list):
+		"""Guarda el resultado y desaloja las búsquedas usadas hace más tiempo"""
+		if self.max_entries <= 0 or self.ttl_seconds <= 0:
+			return
+		# Los embeddings no se muestran y son la mayor parte del tamaño de cada fila
+		stored = [{field: value for field, value in candidate.items() if field != "embedding"} for candidate in result]
+		with self._lock:
+			self._entries[key] = (time.monotonic(), stored)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+# Caché de búsquedas compartida por todas las sesiones del proceso
+@st.cache_resource
+def get_search_cache() -> SearchResultCache:
+	"""Retorna la caché de resultados de búsqueda del proceso"""
+	return SearchResultCache(SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS)
+
+def _normalize_search_description(description: str) -> str:
+	"""Descripción sin mayúsculas, tildes ni espacios repetidos, para reconocer búsquedas iguales"""
+	return " ".join(_fold_text(description).split())
+
+# Función para obtener la versión del conjunto de candidatos disponibles
+def _candidate_set_fingerprint(supabase) -> tuple:
+	"""Retorna (cantidad, último updated_at) del personal activo y no contratado
+	
+	Son dos consultas livianas (sin traer las filas): cualquier alta, baja, contratación
+	o edición cambia alguno de los dos valores, y con eso la llave de la caché.
+	"""
+	available = supabase.table("personal").select("id", count="exact").eq("activo", True).eq("contratado", False).limit(1).execute()
+	latest = (
+		supabase.table("personal").select("updated_at").eq("activo", True).eq("contratado", False)
+		.not_.is_("updated_at", "null").order("updated_at", desc=True).limit(1).execute()
+	)
+	return available.count, latest.data[0]["updated_at"] if latest.data else None
+
+def _search_cache_key(mode: str, description: str, supabase, constraints: Optional[Dict[str, Any]] = None) -> Optional[tuple]:
+	"""Llave de la búsqueda en la caché de resultados (None si no se pudo obtener la versión de los candidatos)"""
+	try:
+		return (
+			mode,
+			_normalize_search_description(description),
+			json.dumps(constraints or {}, sort_keys=True),
+			_candidate_set_fingerprint(supabase)
+		)
+	except Exception as e:
+		logger.warning("No se pudo obtener la versión de los candidatos, se busca sin caché: %s", e)
+		return None
+
+# Función para reutilizar el resultado de una búsqueda mientras no cambien los candidatos
+def _cached_search(mode: str, description: str, supabase, search, constraints: Optional[Dict[str, Any]] = None) -> list:
+	"""Retorna el resultado guardado para la búsqueda o lo calcula con `search()` y lo guarda"""
+	key = _search_cache_key(mode, description, supabase, constraints)
+	if key is None:
+		return search()
+	
+	cache = get_search_cache()
+	result = cache.get(key)
+	if result is not None:
+		logger.info("Búsqueda %s servida desde la caché", mode)
+		return result
+	result = search()
+	cache.put(key, result)
+	return result
+
+# Función para buscar candidatos solo por palabras clave (sin OpenAI)
+def search_candidates_by_keywords(description: str, constraints: Optional[Dict[str, Any]] = None) -> list:
+	"""Ordena los candidatos disponibles (que cumplen `constraints`) por puntaje BM25, sin llamar a OpenAI"""
+	supabase = st.session_state.supabase
+	
+	def search():
+		available, _ = _fetch_available_candidates(supabase, constraints)
+		candidates = {candidate["id"]: candidate for candidate in available}
+		matches = get_lexical_index().search(description, allowed_ids=set(candidates))
+		# Los datos que se muestran se leen al dibujar cada página de resultados
+		return [candidates[candidate_id] for candidate_id, _ in matches]
+	
+	try:
+		return _cached_search("keywords", description, supabase, search, constraints)
+	except Exception as e:
+		st.error(f"Error al buscar candidatos: {str(e)}")
+		return []
+
+# Modelo y prompts del ranking de candidatos
+RANKING_MODEL = "gpt-4o-mini"
+
+# El prompt se arma de lo más estable a lo más variable para aprovechar la caché de prompts
+# de OpenAI (por prefijo): instrucciones fijas, luego los candidatos en orden de ID (el mismo
+# grupo de candidatos produce el mismo texto) y al final los requerimientos de la búsqueda
+RANKING_SYSTEM_PROMPT = """Eres un asistente experto en selección de personal. Responde SOLO con JSON válido.
+
+Recibirás la lista de candidatos disponibles y, al final, la descripción de requerimientos de un puesto.
+Selecciona y ordena TODOS los candidatos de la lista por relevancia para esos requerimientos.
+
+IMPORTANTE:
+- DEBES incluir TODOS los candidatos de la lista en tu respuesta.
+- La puntuación de calidad (1-5 estrellas) es el SEGUNDO criterio más importante después de la relevancia técnica.
+- Prioriza candidatos con puntuaciones más altas cuando tengan relevancia técnica similar.
+
+Responde SOLO con un JSON con un array "candidatos" de pares [id, relevancia], donde relevancia es un score
+del 1-10 (considera tanto la relevancia técnica como la puntuación de calidad). No incluyas explicaciones.
+Ejemplo: {"candidatos": [[12, 9], [4, 7], [31, 3]]}
+
+CRÍTICO: Ordena los candidatos por relevancia descendente. No omitas ningún candidato, incluso si su relevancia es baja."""
+RANKING_CANDIDATES_PROMPT = """Candidatos disponibles:
+{context}"""
+RANKING_REQUEST_PROMPT = """Hay {total_candidates} candidatos en la lista; incluye los {total_candidates} en tu respuesta.
+
+Requerimientos:
+{description}"""
+
+# Tokens de respuesta por candidato: solo el par [id, relevancia] (las explicaciones se piden aparte)
+RANKING_TOKENS_PER_CANDIDATE = 8
+
+# Versión del prompt de ranking: identifica el prefijo fijo en la caché de prompts de OpenAI
+RANKING_PROMPT_VERSION = hashlib.sha256(
+	f"{RANKING_MODEL}\n{RANKING_SYSTEM_PROMPT}\n{RANKING_CANDIDATES_PROMPT}\n{RANKING_REQUEST_PROMPT}".encode("utf-8")
+).hexdigest()[:16]
+
+# Tokens máximos de perfiles por llamada de ranking; sobre eso los candidatos se reparten en grupos
+RANKING_SHARD_TOKENS = int(os.getenv("RANKING_SHARD_TOKENS", "12000"))
+
+# Candidatos máximos por grupo (acota también el largo de la respuesta); nunca menos que la
+# preselección, para que una búsqueda normal sea una sola llamada
+RANKING_SHARD_MAX_CANDIDATES = max(SEARCH_TOP_K, int(os.getenv("RANKING_SHARD_MAX_CANDIDATES", "30")))
+
+# Grupos que se rankean en paralelo
+RANKING_PARALLEL_SHARDS = max(1, int(os.getenv("RANKING_PARALLEL_SHARDS", "4")))
+
+# Candidatos de referencia incluidos en todos los grupos para calibrar sus puntajes
+RANKING_ANCHORS = int(os.getenv("RANKING_ANCHORS", "2"))
+
+# Mejores candidatos que se vuelven a rankear juntos al final (0 para desactivar)
+RANKING_FINAL_RERANK = int(os.getenv("RANKING_FINAL_RERANK", "10"))
+
+# Tokens de las líneas de ID y puntuación que se agregan al perfil guardado
+RANKING_CONTEXT_EXTRA_TOKENS = 16
+
+def _candidate_context(candidate: Dict[str, Any]) -> str:
+	"""Perfil del candidato para el prompt de ranking: el perfil guardado más su ID y puntuación"""
+	puntuacion = candidate.get('puntuacion_calidad')
+	puntuacion_texto = f"{puntuacion}/5 ⭐" if puntuacion else "Sin puntuación"
+	snippet = candidate.get("ranking_snippet")
+	if snippet is None:
+		snippet = build_ranking_snippet(candidate)
+	return f"ID: {candidate['id']}\n{snippet}\nPuntuación de Calidad: {puntuacion_texto}"
+
+def _candidate_context_tokens(candidate: Dict[str, Any]) -> int:
+	"""Tokens del perfil de ranking, con el conteo guardado si está disponible"""
+	if candidate.get("ranking_snippet_tokens") is not None:
+		return candidate["ranking_snippet_tokens"] + RANKING_CONTEXT_EXTRA_TOKENS
+	return count_tokens(_candidate_context(candidate))
+
+# Llamada de ranking para un grupo de candidatos (lanza la excepción si falla)
+def _rank_shard(client, description: str, shard: list) -> Dict[str, float]:
+	"""Rankea un grupo con el LLM y retorna {id: relevancia}; los omitidos por el modelo quedan en 0"""
+	# Orden por ID, no por relevancia previa: el bloque de candidatos es idéntico entre búsquedas
+	context = "\n---\n".join(_candidate_context(candidate) for candidate in sorted(shard, key=lambda candidate: candidate["id"]))
+	prompt = (
+		RANKING_CANDIDATES_PROMPT.format(context=context) + "\n\n"
+		+ RANKING_REQUEST_PROMPT.format(total_candidates=len(shard), description=description)
+	)
+	
+	ai_response = call_openai(
+		client,
+		RANKING_TOKENS_PER_CANDIDATE * len(shard),
+		model=RANKING_MODEL,
+		messages=[
+			{"role": "system", "content": RANKING_SYSTEM_PROMPT},
+			{"role": "user", "content": prompt}
+		],
+		temperature=0.3,
+		response_format={"type": "json_object"},
+		# Agrupa las llamadas con el mismo prefijo en el mismo servidor de caché
+		extra_body={"prompt_cache_key": f"ranking-{RANKING_PROMPT_VERSION}"}
+	)
+	prompt_tokens, cached_tokens = get_prompt_cache_stats().record(getattr(ai_response, "usage", None))
+	logger.info(
+		"Ranking de %s candidatos: %s tokens de prompt, %s desde la caché de OpenAI (acumulado del proceso: %.0f%%)",
+		len(shard), prompt_tokens, cached_tokens, get_prompt_cache_stats().hit_rate() * 100
+	)
+	
+	result = json.loads(ai_response.choices[0].message.content)
+	scores = {str(candidate["id"]): 0.0 for candidate in shard}
+	for entry in result.get("candidatos", []):
+		# Pares [id, relevancia]; se aceptan también objetos {"id", "relevancia"}
+		if isinstance(entry, dict):
+			entry = [entry.get("id"), entry.get("relevancia")]
+		if not isinstance(entry, list) or len(entry) < 2:
+			continue
+		candidate_id = str(entry[0])
+		if candidate_id in scores:
 			try:
-				# Método 1: Parámetros posicionales
-				response = supabase.storage.from_("cvs").upload(
-					file_name_str,  # path (posición 1)
-					file_content,   # file (posición 2)
-					{"content-type": content_type, "upsert": True}  # file_options (posición 3)
-				)
-			except TypeError:
-				# Método 2: Parámetros con keywords
-				response = supabase.storage.from_("cvs").upload(
-					path=file_name_str,  # Nombre del archivo (string)
-					file=file_content,   # Contenido binario (bytes)
-					file_options={
-						"content-type": content_type,
-						"upsert": True
-					}
-				)
-			
-			# Verificar que la subida fue exitosa
-			if response and 'error' not in str(response):
-				# Obtener URL pública
-				url_response = supabase.storage.from_("cvs").get_public_url(file_name_str)
-				return url_response
+				scores[candidate_id] = float(entry[1] or 0)
+			except (TypeError, ValueError):
+				pass
+	return scores
+
+def _fallback_shard_scores(shard: list, position: Dict[str, int]) -> Dict[str, float]:
+	"""Puntajes de 10 a 1 según el orden de la primera pasada, para un grupo cuyo ranking falló"""
+	total = max(1, len(position))
+	return {str(candidate["id"]): 10 - 9 * position[str(candidate["id"])] / total for candidate in shard}
+
+def _shard_candidates(candidates: list, anchors: list) -> list:
+	"""Reparte los candidatos en grupos que caben en RANKING_SHARD_TOKENS (sin recortar ningún perfil)
+	
+	Cada grupo incluye además a los candidatos de referencia (`anchors`).
+	"""
+	anchor_ids = {candidate["id"] for candidate in anchors}
+	anchor_tokens = sum(_candidate_context_tokens(candidate) for candidate in anchors)
+	shards = []
+	current = []
+	current_tokens = anchor_tokens
+	for candidate in candidates:
+		if candidate["id"] in anchor_ids:
+			continue
+		tokens = _candidate_context_tokens(candidate)
+		# Un perfil más largo que el presupuesto va solo en su grupo, completo
+		if current and (current_tokens + tokens > RANKING_SHARD_TOKENS or len(current) + len(anchors) >= RANKING_SHARD_MAX_CANDIDATES):
+			shards.append(anchors + current)
+			current = []
+			current_tokens = anchor_tokens
+		current.append(candidate)
+		current_tokens += tokens
+	if current or not shards:
+		shards.append(anchors + current)
+	return shards
+
+# Función para ordenar candidatos con el LLM (map-reduce sobre grupos), con resultados parciales
+def iter_rank_candidates(client, description: str, candidates: list):
+	"""Ordena los candidatos por relevancia para la descripción, entregando órdenes parciales
+	
+	Genera pares (orden, terminado). Si todos los perfiles caben en una llamada, se
+	rankean juntos. Si no, se reparten en grupos que se rankean en paralelo (map) y, a
+	medida que termina cada grupo, sus candidatos se reordenan entre las posiciones que
+	ya ocupaban (orden parcial). Luego se combinan (reduce) con un puntaje calibrado:
+	cada grupo incluye los mismos candidatos de referencia (los primeros de la
+	preselección) y sus puntajes se desplazan para que la referencia puntúe igual en
+	todos los grupos. Al final, los mejores se vuelven a rankear juntos.
+	
+	Si falla el ranking de un grupo, sus candidatos conservan el orden de la primera
+	pasada (con puntajes descendentes) y el grupo no participa en la calibración; solo
+	se lanza la excepción si fallan todos.
+	"""
+	if not candidates:
+		yield [], True
+		return
+	
+	total_tokens = sum(_candidate_context_tokens(candidate) for candidate in candidates)
+	if total_tokens <= RANKING_SHARD_TOKENS and len(candidates) <= RANKING_SHARD_MAX_CANDIDATES:
+		shards = [candidates]
+		anchors = []
+	else:
+		anchors = candidates[:RANKING_ANCHORS]
+		shards = _shard_candidates(candidates, anchors)
+	
+	started = time.perf_counter()
+	anchor_ids = [str(candidate["id"]) for candidate in anchors]
+	position = {str(candidate["id"]): index for index, candidate in enumerate(candidates)}
+	partial = list(candidates)
+	shard_scores = [None] * len(shards)
+	failed = set()
+	errors = []
+	with ThreadPoolExecutor(max_workers=min(RANKING_PARALLEL_SHARDS, len(shards)), thread_name_prefix="ranking") as executor:
+		futures = {executor.submit(_rank_shard, client, description, shard): index for index, shard in enumerate(shards)}
+		for completed, future in enumerate(as_completed(futures), 1):
+			index = futures[future]
+			try:
+				scores = shard_scores[index] = future.result()
+			except Exception as e:
+				logger.warning("Falló el ranking de un grupo de %s candidatos, se usa el orden de la primera pasada: %s", len(shards[index]), e)
+				failed.add(index)
+				errors.append(e)
+				scores = shard_scores[index] = _fallback_shard_scores(shards[index], position)
+			if completed == len(shards):
+				break
+			# Orden parcial: los candidatos del grupo se reordenan en sus mismas posiciones
+			# (los de referencia se quedan arriba hasta el orden final)
+			block_ids = {candidate_id for candidate_id in scores if candidate_id not in anchor_ids}
+			slots = [slot for slot, candidate in enumerate(partial) if str(candidate["id"]) in block_ids]
+			block = sorted((partial[slot] for slot in slots), key=lambda candidate: (-scores[str(candidate["id"])], position[str(candidate["id"])]))
+			for slot, candidate in zip(slots, block):
+				partial[slot] = candidate
+			yield list(partial), False
+	
+	if len(failed) == len(shards):
+		raise errors[0]
+	
+	# Calibración: desplazar cada grupo según cómo puntuó a los candidatos de referencia
+	# (los grupos que fallaron no se desplazan ni aportan a la referencia)
+	ranked_shards = [index for index in range(len(shards)) if index not in failed]
+	offsets = [0.0] * len(shards)
+	if anchor_ids and len(ranked_shards) > 1:
+		anchor_means = {index: sum(shard_scores[index][anchor_id] for anchor_id in anchor_ids) / len(anchor_ids) for index in ranked_shards}
+		global_mean = sum(anchor_means.values()) / len(anchor_means)
+		for index, mean in anchor_means.items():
+			offsets[index] = global_mean - mean
+	
+	calibrated = {}
+	for index, (scores, offset) in enumerate(zip(shard_scores, offsets)):
+		for candidate_id, score in scores.items():
+			if candidate_id in anchor_ids:
+				if index not in failed:
+					calibrated[candidate_id] = calibrated.get(candidate_id, 0.0) + (score + offset) / len(ranked_shards)
 			else:
-				# Si hay una respuesta pero con error
-				error_msg = response.get('error', 'Error desconocido en la respuesta de Supabase') if isinstance(response, dict) else str(response)
-				raise Exception(f"Error en la respuesta de Supabase: {error_msg}")
+				calibrated[candidate_id] = score + offset
+	
+	# Empates: se respeta el orden de la preselección
+	ranked = sorted(candidates, key=lambda candidate: (-calibrated.get(str(candidate["id"]), 0.0), position[str(candidate["id"])]))
+	
+	if len(shards) > 1 and RANKING_FINAL_RERANK > 1:
+		yield list(ranked), False
+		top = ranked[:RANKING_FINAL_RERANK]
+		try:
+			final_scores = _rank_shard(client, description, top)
+			top.sort(key=lambda candidate: (-final_scores[str(candidate["id"])], position[str(candidate["id"])]))
+			ranked = top + ranked[RANKING_FINAL_RERANK:]
 		except Exception as e:
-			# Agregar información de debugging
-			error_details = {
-				"file_name_type": str(type(file_name_str)),
-				"file_name_value": file_name_str[:50] if len(file_name_str) > 50 else file_name_str,
-				"file_content_type": str(type(file_content)),
-				"file_content_length": len(file_content) if file_content else 0,
-				"original_error": str(e)
-			}
-			st.error(f"Detalles del error de subida: {error_details}")
-			# Re-lanzar el error para que sea manejado por el bloque try-except externo
-			raise e
-			
-	except Exception as e:
-		error_msg = str(e)
-		st.error(f"Error al subir CV a Storage: {error_msg}")
-		
-		# Mostrar detalles del error para debugging
-		if hasattr(e, 'message'):
-			st.error(f"Detalles del error: {e.message}")
-		
-		# Si el error es que el bucket no existe, mostrar instrucciones
-		if "bucket not found" in error_msg.lower() or "404" in error_msg.lower():
-			st.warning("""
-			**El bucket 'cvs' no existe en Supabase Storage.**
-			
-			Por favor, créalo manualmente:
-			1. Ve a tu proyecto en Supabase: https://supabase.com/dashboard
-			2. Selecciona tu proyecto
-			3. Ve a la sección **Storage** en el menú lateral
-			4. Haz clic en **"New bucket"** o **"Crear bucket"**
-			5. Nombre del bucket: **cvs**
-			6. Marca la opción **"Public bucket"** (bucket público)
-			7. Haz clic en **"Create bucket"**
-			
-			Una vez creado, intenta subir el CV nuevamente.
-			""")
-		elif "must be string" in error_msg.lower():
-			st.warning("""
-			**Error en el formato del nombre del archivo.**
-			
-			Esto puede deberse a caracteres especiales en el RUT o nombre del archivo.
-			Por favor, verifica que el RUT solo contenga números y letras.
-			""")
-		
-		return None
+			logger.warning("No se pudo hacer el ranking final, se usa el puntaje calibrado: %s", e)
+	
+	logger.info("Ranking de %s candidatos en %s grupos: %.2f s", len(candidates), len(shards), time.perf_counter() - started)
+	yield ranked, True
 
-# Función para guardar personal en Supabase
-def save_personal_to_db(data: Dict[str, Any], cv_url: Optional[str] = None) -> bool:
-	"""Guarda la información del personal en Supabase"""
+# Función para ordenar candidatos con el LLM
+def rank_candidates(client, description: str, candidates: list) -> list:
+	"""Ordena los candidatos por relevancia para la descripción (orden final de iter_rank_candidates)"""
+	ranked = candidates
+	for ranked, _ in iter_rank_candidates(client, description, candidates):
+		pass
+	return ranked
+
+# Prompts de la explicación de un resultado, que se pide solo cuando el reclutador la abre
+EXPLANATION_SYSTEM_PROMPT = "Eres un asistente experto en selección de personal. Responde en español, en forma breve."
+EXPLANATION_PROMPT = """Requerimientos del puesto:
+{description}
+
+Candidato:
+{context}
+
+Explica en 2 o 3 frases por qué este candidato es (o no es) adecuado para los requerimientos. Menciona su puntuación de calidad si está disponible."""
+EXPLANATION_VERSION = hashlib.sha256(
+	f"{RANKING_MODEL}\n{EXPLANATION_SYSTEM_PROMPT}\n{EXPLANATION_PROMPT}".encode("utf-8")
+).hexdigest()[:16]
+
+def _explanation_cache_key(description: str, candidate: Dict[str, Any]) -> str:
+	"""Llave de la explicación en la caché local: cambia con la descripción, el candidato o el prompt"""
+	description_hash = hashlib.sha256(_normalize_search_description(description).encode("utf-8")).hexdigest()[:16]
+	return f"explain:{EXPLANATION_VERSION}:{candidate['id']}:{_row_signature(candidate)}:{description_hash}"
+
+# Función para leer una explicación ya generada
+def get_cached_explanation(description: str, candidate: Dict[str, Any]) -> Optional[str]:
+	"""Retorna la explicación guardada del candidato para esta descripción, o None"""
+	return get_cv_cache().get(_explanation_cache_key(description, candidate))
+
+# Generación de la explicación sin manejo de errores
+def _request_explanation(client, description: str, candidate: Dict[str, Any]) -> str:
+	"""Pide al LLM la explicación de por qué el candidato calza con la descripción y la guarda en la caché"""
+	response = call_openai(
+		client,
+		150,
+		model=RANKING_MODEL,
+		messages=[
+			{"role": "system", "content": EXPLANATION_SYSTEM_PROMPT},
+			{"role": "user", "content": EXPLANATION_PROMPT.format(description=description, context=_candidate_context(candidate))}
+		],
+		temperature=0.3,
+		max_tokens=150
+	)
+	explanation = response.choices[0].message.content.strip()
+	get_cv_cache().put(_explanation_cache_key(description, candidate), explanation)
+	return explanation
+
+# Función para explicar un resultado de la búsqueda
+def explain_candidate_match(description: str, candidate: Dict[str, Any]) -> str:
+	"""Retorna la explicación del resultado (de la caché o generada con OpenAI)"""
 	try:
-		supabase = st.session_state.supabase
-		
-		# Normalizar RUT antes de guardar (solo primeros 8 dígitos)
-		rut_normalized = normalize_rut(data.get("rut"))
-		
-		# Preparar datos para insertar
-		personal_data = {
-			"rut": rut_normalized,  # RUT normalizado (solo primeros 8 dígitos)
-			"nombre": data.get("nombre", ""),
-			"apellido": data.get("apellido", ""),
-			"telefono_personal": data.get("telefono_personal"),
-			"correo_personal": data.get("correo_personal"),
-			"carrera_estudios": data.get("carrera_estudios"),
-			"experiencia": data.get("experiencia"),
-			"anos_experiencia": data.get("anos_experiencia"),
-			"certificaciones": data.get("certificaciones"),
-			"otros": data.get("otros"),
-			"resumen_ia": data.get("resumen_ia"),
-			"activo": True,
-			"contratado": False
-		}
-		
-		# Agregar URL del CV si está disponible
-		if cv_url:
-			personal_data["cv_url"] = cv_url
-		
-		# Verificar si ya existe un registro con el mismo RUT normalizado
-		if personal_data["rut"]:
-			existing = supabase.table("personal").select("id").eq("rut", personal_data["rut"]).execute()
-			if existing.data:
-				# Actualizar registro existente
-				supabase.table("personal").update(personal_data).eq("rut", personal_data["rut"]).execute()
-				return True
-		
-		# Insertar nuevo registro
-		supabase.table("personal").insert(personal_data).execute()
-		return True
+		return get_cached_explanation(description, candidate) or _request_explanation(st.session_state.openai_client, description, candidate)
 	except Exception as e:
-		st.error(f"Error al guardar en base de datos: {str(e)}")
-		return False
+		st.error(f"Error al generar la explicación: {str(e)}")
+		return ""
 
-# Función para buscar candidatos con OpenAI
-def search_candidates_with_ai(description: str) -> list:
-	"""Busca los mejores candidatos según la descripción usando OpenAI"""
-	supabase = st.session_state.supabase
-	client = st.session_state.openai_client
+# Función para completar los perfiles de ranking que faltan (registros anteriores a la columna)
+def _ensure_ranking_snippets(supabase, candidates: list):
+	"""Calcula los perfiles de ranking faltantes, los guarda en la tabla personal y los agrega a los candidatos"""
+	missing = [candidate for candidate in candidates if candidate.get("ranking_snippet") is None]
+	if not missing:
+		return
+	
+	logger.info("Calculando perfiles de ranking de %s candidatos", len(missing))
+	rows = _fetch_personal_by_ids(supabase, [candidate["id"] for candidate in missing])
+	for candidate in missing:
+		if candidate["id"] not in rows:
+			continue
+		fields = ranking_snippet_fields(rows[candidate["id"]])
+		candidate.update(fields)
+		try:
+			supabase.table("personal").update(fields).eq("id", candidate["id"]).execute()
+		except Exception as e:
+			# El ranking igual usa el perfil calculado; se reintentará guardar en la próxima búsqueda
+			logger.warning("No se pudo guardar el perfil de ranking del candidato %s: %s", candidate["id"], e)
+
+# Búsqueda con OpenAI sin manejo de errores, por etapas
+def _iter_search_with_ai(supabase, client, description: str, constraints: Optional[Dict[str, Any]] = None):
+	"""Genera pares (candidatos, terminado) a medida que avanza el ranking en cascada
+	
+	Todos los candidatos se ordenan con un primer puntaje barato (first_pass_rank) y ese
+	orden se entrega de inmediato. Solo los SEARCH_TOP_K mejores pasan al LLM, que los
+	reordena por grupos: cada grupo terminado entrega un orden parcial, y el resto de los
+	candidatos va siempre después, en el orden del primer puntaje. El costo en tokens no
+	depende del número de candidatos.
+	
+	Los candidatos traen solo CANDIDATE_SYNC_COLUMNS; los datos que se muestran se leen
+	después, solo de los que se dibujan (ver fetch_candidate_details).
+	"""
+	key = _search_cache_key("ai", description, supabase, constraints)
+	cache = get_search_cache()
+	cached = cache.get(key) if key is not None else None
+	if cached is not None:
+		logger.info("Búsqueda ai servida desde la caché")
+		yield cached, True
+		return
+	
+	# Obtener los candidatos activos Y NO contratados (disponibles para asignar) que cumplen los requisitos
+	embedder = get_embedder(client)
+	candidates, vectors = _fetch_available_candidates(supabase, constraints, embedder)
+	if not candidates:
+		yield [], True
+		return
+	
+	ordered = first_pass_rank(description, candidates, embedder, vectors)
+	by_id = {candidate["id"]: candidate for candidate in ordered}
+	shortlist, rest = ordered[:SEARCH_TOP_K], ordered[SEARCH_TOP_K:]
+	yield list(ordered), False
+	
+	# El LLM solo lee los perfiles precalculados de la lista corta
+	ranking_rows = _fetch_personal_by_ids(supabase, [candidate["id"] for candidate in shortlist], CANDIDATE_RANKING_COLUMNS)
+	# Las filas que ya no están (borradas entre ambas consultas) siguen tras las ordenadas, en el orden del primer puntaje
+	unranked = [candidate for candidate in shortlist if candidate["id"] not in ranking_rows]
+	shortlist = [ranking_rows[candidate["id"]] for candidate in shortlist if candidate["id"] in ranking_rows]
+	_ensure_ranking_snippets(supabase, shortlist)
+	for ranked, done in iter_rank_candidates(client, description, shortlist):
+		result = [by_id[candidate["id"]] for candidate in ranked] + unranked + rest
+		if done and key is not None:
+			cache.put(key, result)
+		yield result, done
+
+# Función para buscar candidatos con OpenAI, entregando resultados parciales
+def iter_search_candidates_with_ai(description: str, constraints: Optional[Dict[str, Any]] = None):
+	"""Genera pares (candidatos, terminado): el orden preliminar apenas está y luego el refinado por la IA
 	
+	Con `constraints` (ver parse_search_constraints) solo se consideran los candidatos
+	que cumplen los requisitos estrictos, filtrados en la base de datos. Si el ranking
+	con IA falla después del orden preliminar, ese orden queda como resultado.
+	"""
+	latest = None
 	try:
-		# Obtener todos los candidatos activos Y NO contratados (disponibles para asignar)
-		response = supabase.table("personal").select("*").eq("activo", True).eq("contratado", False).execute()
-		candidates = response.data
-		
-		if not candidates:
-			return []
-		
-		# Crear contexto con información de candidatos
-		candidates_context = []
-		for candidate in candidates:
-			puntuacion = candidate.get('puntuacion_calidad')
-			puntuacion_texto = f"{puntuacion}/5 ⭐" if puntuacion else "Sin puntuación"
-			candidate_info = f"""
-			ID: {candidate['id']}
-			Nombre: {candidate.get('nombre', '')} {candidate.get('apellido', '')}
-			RUT: {candidate.get('rut', '')}
-			Carrera/Estudios: {candidate.get('carrera_estudios', 'N/A')}
-			Años de experiencia: {candidate.get('anos_experiencia', 'N/A')}
-			Experiencia: {candidate.get('experiencia', 'N/A')}
-			Certificaciones: {candidate.get('certificaciones', 'N/A')}
-			Resumen IA: {candidate.get('resumen_ia', 'N/A')}
-			Puntuación de Calidad: {puntuacion_texto}
-			"""
-			candidates_context.append(candidate_info)
-		
-		context = "\n---\n".join(candidates_context)
-		
-		# Para bases de datos grandes, necesitamos optimizar el contexto
-		# Si hay muchos candidatos, limitar la información por candidato pero incluir todos
-		# Calcular el límite dinámico basado en el número de candidatos
-		# OpenAI tiene límites de tokens, pero podemos usar hasta ~100k tokens (aproximadamente 400k caracteres)
-		# Para seguridad, usaremos un límite más conservador pero generoso
-		max_context_length = 100000  # ~100k caracteres debería ser suficiente para muchos candidatos
-		
-		if len(context) > max_context_length:
-			# Si el contexto es muy largo, optimizar la información por candidato
-			# Reducir campos largos pero mantener la información esencial
-			optimized_context = []
-			for candidate_info in candidates_context:
-				# Limitar la longitud de cada candidato a ~500 caracteres
-				if len(candidate_info) > 500:
-					# Mantener las primeras líneas importantes y truncar campos largos
-					lines = candidate_info.split('\n')
-					essential_lines = []
-					for line in lines:
-						if any(keyword in line for keyword in ['ID:', 'Nombre:', 'RUT:', 'Carrera/Estudios:', 'Años de experiencia:', 'Certificaciones:', 'Puntuación de Calidad:']):
-							essential_lines.append(line[:200])  # Limitar cada línea a 200 caracteres
-					candidate_info = '\n'.join(essential_lines[:15])  # Máximo 15 líneas por candidato
-				optimized_context.append(candidate_info)
-			context = "\n---\n".join(optimized_context)
-		
-		# Usar todo el contexto disponible (sin truncar arbitrariamente)
-		context_truncated = context
-		
-		# Contar cuántos candidatos hay
-		total_candidates = len(candidates)
-		
-		prompt = f"""Basándote en la siguiente descripción de requerimientos y la lista de candidatos disponibles, 
-		selecciona y ordena TODOS los candidatos disponibles por relevancia.
-
-		IMPORTANTE: 
-		- Hay {total_candidates} candidatos disponibles en total. DEBES incluir TODOS en tu respuesta.
-		- La puntuación de calidad (1-5 estrellas) es el SEGUNDO criterio más importante después de la relevancia técnica. 
-		- Prioriza candidatos con puntuaciones más altas cuando tengan relevancia técnica similar.
-
-		Requerimientos:
-		{description}
-
-		Candidatos disponibles:
-		{context_truncated}
-
-		Responde SOLO con un JSON que contenga un array "candidatos" con objetos que tengan:
-		- id: El ID del candidato
-		- relevancia: Un score del 1-10 (considera tanto la relevancia técnica como la puntuación de calidad)
-		- razon: Breve explicación de por qué es adecuado (menciona la puntuación de calidad si está disponible)
-
-		CRÍTICO: Debes incluir TODOS los {total_candidates} candidatos en tu respuesta, ordenados por relevancia descendente.
-		No omitas ningún candidato, incluso si su relevancia es baja.
-		"""
-		
-		ai_response = client.chat.completions.create(
-			model="gpt-4o-mini",
-			messages=[
-				{"role": "system", "content": "Eres un asistente experto en selección de personal. Responde SOLO con JSON válido."},
-				{"role": "user", "content": prompt}
-			],
-			temperature=0.3,
-			response_format={"type": "json_object"}
-		)
-		
-		result = json.loads(ai_response.choices[0].message.content)
-		recommended_ids = [c["id"] for c in result.get("candidatos", [])]
-		
-		# Obtener información completa de los candidatos recomendados
-		recommended_candidates = []
-		for candidate in candidates:
-			if candidate["id"] in recommended_ids:
-				recommended_candidates.append(candidate)
-		
-		# Verificar si faltan candidatos (ChatGPT podría no haber incluido todos)
-		all_candidate_ids = {c["id"] for c in candidates}
-		missing_ids = all_candidate_ids - set(recommended_ids)
-		
-		# Agregar los candidatos faltantes al final con relevancia 0
-		if missing_ids:
-			for candidate in candidates:
-				if candidate["id"] in missing_ids:
-					recommended_candidates.append(candidate)
-		
-		# Ordenar según el orden de recomendación (los recomendados primero, luego los faltantes)
-		if recommended_ids:
-			recommended_candidates.sort(key=lambda x: recommended_ids.index(x["id"]) if x["id"] in recommended_ids else len(recommended_ids))
-		
-		return recommended_candidates
+		for latest, done in _iter_search_with_ai(st.session_state.supabase, st.session_state.openai_client, description, constraints):
+			yield latest, done
 	except Exception as e:
-		st.error(f"Error al buscar candidatos: {str(e)}")
-		return []
+		if latest:
+			logger.warning("Ranking con IA interrumpido, se usa el orden preliminar: %s", e)
+			st.warning(f"No se pudo completar el ranking con IA, se muestra el orden preliminar: {str(e)}")
+			yield latest, True
+		else:
+			st.error(f"Error al buscar candidatos: {str(e)}")
+			yield [], True
+
+# Función para buscar candidatos con OpenAI
+def search_candidates_with_ai(description: str, constraints: Optional[Dict[str, Any]] = None) -> list:
+	"""Busca los mejores candidatos según la descripción usando OpenAI (resultado final de iter_search_candidates_with_ai)"""
+	candidates = []
+	for candidates, _ in iter_search_candidates_with_ai(description, constraints):
+		pass
+	return candidates
+
+# Función para leer los datos que se muestran de una página de resultados
+def fetch_candidate_details(candidates: list, details: Optional[Dict[Any, Dict[str, Any]]] = None) -> list:
+	"""Retorna las filas con CANDIDATE_DISPLAY_COLUMNS de los candidatos, en el mismo orden
+	
+	`details` guarda las filas ya leídas ({id: fila}); solo se consultan las que faltan.
+	"""
+	details = {} if details is None else details
+	missing = [candidate["id"] for candidate in candidates if candidate["id"] not in details]
+	if missing:
+		try:
+			details.update(_fetch_personal_by_ids(st.session_state.supabase, missing, CANDIDATE_DISPLAY_COLUMNS))
+		except Exception as e:
+			st.error(f"Error al leer los datos de los candidatos: {str(e)}")
+	return [details[candidate["id"]] for candidate in candidates if candidate["id"] in details]
 
 # Página de Inicio
 def page_inicio():
@@ -946,150 +2501,582 @@ def page_cargar_cv():
 			accept_multiple_files=True
 		)
 	
+	# Con una cola configurada, la carga masiva la procesan los workers (worker.py)
+	job_queue = get_job_queue() if modo_carga == "Carga Masiva" else None
+	
 	# Procesar archivos según el modo seleccionado
 	if uploaded_files_list and len(uploaded_files_list) > 0:
 		if modo_carga == "Carga Masiva" and len(uploaded_files_list) > 1:
-			# Carga masiva: procesar todos los archivos automáticamente
-			process_multiple_cvs(uploaded_files_list)
+			if job_queue is not None:
+				# Carga masiva con workers: solo encolar los archivos
+				enqueue_multiple_cvs(uploaded_files_list, job_queue)
+			else:
+				# Carga masiva: procesar todos los archivos automáticamente
+				process_multiple_cvs(uploaded_files_list)
 		else:
 			# Carga individual: mostrar formulario de edición
 			process_single_cv(uploaded_files_list[0])
+	
+	if job_queue is not None and st.session_state.get("cv_job_ids"):
+		show_cv_job_status(job_queue)
+
+# Límite de concurrencia de la carga masiva (llamadas simultáneas a OpenAI)
+BULK_MAX_CONCURRENCY = max(1, int(os.getenv("BULK_MAX_CONCURRENCY", "4")))
+
+# Función para ejecutar trabajos a través de etapas con pools acotados
+def run_pipeline(jobs: list, stages: list):
+	"""Pasa cada trabajo por las etapas (nombre, función, hilos) y entrega los resultados en el orden original
+	
+	Cada etapa tiene su propio pool de hilos, por lo que un archivo puede estar en la
+	llamada a OpenAI mientras el siguiente se extrae y el anterior se guarda. Una etapa
+	puede terminar el trabajo antes de tiempo asignándole un "status".
+	"""
+	executors = [
+		ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"cv-{name}")
+		for name, _, workers in stages
+	]
+	
+	def submit(job, stage_index, done: Future):
+		try:
+			future = executors[stage_index].submit(stages[stage_index][1], job)
+		except RuntimeError as e:
+			# El pipeline se cerró mientras el trabajo seguía en curso
+			done.set_exception(e)
+			return
+		future.add_done_callback(lambda f: advance(job, stage_index, f, done))
+	
+	def advance(job, stage_index, future: Future, done: Future):
+		error = future.exception()
+		if error is not None:
+			job["status"] = "error"
+			job["message"] = str(error)
+		if job.get("status") or stage_index + 1 == len(stages):
+			done.set_result(job)
+		else:
+			submit(job, stage_index + 1, done)
+	
+	try:
+		pending = []
+		for job in jobs:
+			done = Future()
+			# Un trabajo que ya llega con estado (p. ej. un duplicado) se entrega sin pasar por las etapas
+			if job.get("status"):
+				done.set_result(job)
+			else:
+				submit(job, 0, done)
+			pending.append(done)
+		for done in pending:
+			yield done.result()
+	finally:
+		for executor in executors:
+			executor.shutdown(wait=False, cancel_futures=True)
+
+# Etapas de la carga masiva: extracción de texto y procesamiento con IA
+def _bulk_extract_stage(job: Dict[str, Any], deduper: Optional["CVBatchDeduper"] = None) -> Dict[str, Any]:
+	"""Extrae el texto del CV del trabajo y, si se entrega `deduper`, descarta las versiones repetidas de una persona"""
+	if job["type"] not in (PDF_MIME_TYPE, DOCX_MIME_TYPE):
+		job["status"] = "error"
+		job["message"] = "Formato no soportado"
+		return job
+	
+	job["hash"] = job["buffer"].sha256
+	job["text"] = _extract_cv_text(job["buffer"], job["type"])
+	if not job["text"]:
+		job["status"] = "error"
+		job["message"] = "No se pudo extraer texto"
+		return job
+	
+	# Huella local (RUT, correo, teléfono): sirve para detectar duplicados y se reutiliza en la etapa de IA
+	job["local_fields"] = extract_contact_fields(job["text"])
+	if deduper is not None:
+		deduper.check_person(job)
+	return job
+
+def _bulk_ai_stage(job: Dict[str, Any], client, deduper: Optional["CVBatchDeduper"] = None) -> Dict[str, Any]:
+	"""Procesa el texto con IA y valida los datos mínimos"""
+	# Una versión más nueva de la misma persona pudo llegar mientras el trabajo esperaba turno
+	if deduper is not None and not deduper.claim(job):
+		return job
+	
+	# Sin RUT en el texto el CV se omitiría de todas formas: no se gasta una llamada a OpenAI
+	local_fields = job.get("local_fields")
+	if local_fields is None:
+		local_fields = extract_contact_fields(job["text"])
+	if "rut" not in local_fields and not mentions_rut(job["text"]):
+		job["status"] = "skipped"
+		job["message"] = "RUT no encontrado en el CV"
+		return job
+	
+	try:
+		processed_data = _request_cv_extraction(client, job["text"], job["hash"], local_fields)
+	except Exception as e:
+		job["status"] = "error"
+		job["message"] = f"Error al procesar con IA: {str(e)}"
+		return job
+	
+	if not processed_data:
+		job["status"] = "error"
+		job["message"] = "Error al procesar con IA"
+		return job
+	
+	# Validar datos mínimos
+	rut_normalized = normalize_rut(processed_data.get("rut"))
+	nombre = (processed_data.get("nombre") or "").strip()
+	apellido = (processed_data.get("apellido") or "").strip()
+	
+	if not rut_normalized or not nombre or not apellido:
+		job["status"] = "skipped"
+		job["message"] = "Datos incompletos (RUT, Nombre o Apellido faltantes)"
+		return job
+	
+	# Preparar datos para guardar
+	job["data"] = {
+		"rut": rut_normalized,
+		"nombre": nombre,
+		"apellido": apellido,
+		"telefono_personal": processed_data.get("telefono_personal"),
+		"correo_personal": processed_data.get("correo_personal"),
+		"carrera_estudios": processed_data.get("carrera_estudios"),
+		"experiencia": processed_data.get("experiencia"),
+		"anos_experiencia": processed_data.get("anos_experiencia"),
+		"certificaciones": processed_data.get("certificaciones"),
+		"otros": processed_data.get("otros"),
+		"resumen_ia": processed_data.get("resumen_ia"),
+		"cv_hash": job["hash"]
+	}
+	return job
+
+# Año más reciente mencionado en un CV (para elegir la versión más nueva de una misma persona)
+def _cv_latest_year(cv_text: str) -> int:
+	"""Retorna el año más reciente del texto; "actualidad"/"presente" cuentan como el año en curso"""
+	current_year = datetime.now().year
+	years = [int(year) for year in re.findall(r"\b(19[5-9]\d|20\d\d)\b", cv_text) if int(year) <= current_year]
+	if re.search(r"\b(actualidad|presente|a la fecha|actual)\b", _fold_text(cv_text)):
+		years.append(current_year)
+	return max(years, default=0)
+
+# Detección de CVs duplicados de una carga masiva antes de procesarlos con IA
+class CVBatchDeduper:
+	"""Índice en memoria del lote, compartido por los hilos de extracción y de IA
+	
+	- Archivos idénticos (mismo hash) dentro del lote: se procesa solo el primero.
+	- Archivos idénticos a un CV ya guardado (personal.cv_hash). Un CV distinto de una
+	  persona que ya está en la tabla sí se procesa: el upsert actualiza su registro.
+	- Varios CVs de la misma persona (mismo RUT o, sin RUT, mismo correo): se procesa
+	  solo la versión más nueva según el año más reciente que menciona; ante un empate,
+	  la que se subió después. Si la versión anterior ya estaba en la etapa de IA cuando
+	  llegó la nueva, se marca como reemplazada ("superseded_by") y no se guarda.
+	"""
+	
+	def __init__(self, existing_hashes: set):
+		self.existing_hashes = existing_hashes
+		self._lock = threading.Lock()
+		self._newest = {}
+	
+	@staticmethod
+	def _mark(job: Dict[str, Any], message: str):
+		job["status"] = "duplicate"
+		job["message"] = message
+	
+	def check_files(self, jobs: list):
+		"""Marca los archivos idénticos a otro anterior del lote o a un CV ya guardado (antes de extraer el texto)"""
+		first_by_hash = {}
+		for job in jobs:
+			if job.get("status"):
+				continue
+			if job["hash"] in first_by_hash:
+				self._mark(job, f"Archivo idéntico a {first_by_hash[job['hash']]['name']}")
+				continue
+			first_by_hash[job["hash"]] = job
+			if job["hash"] in self.existing_hashes:
+				self._mark(job, "CV ya cargado anteriormente")
+	
+	def check_person(self, job: Dict[str, Any]):
+		"""Marca el trabajo (o la versión anterior de la misma persona) según el RUT y el correo detectados localmente"""
+		local_fields = job.get("local_fields") or {}
+		if local_fields.get("rut"):
+			identity = f"rut:{local_fields['rut']}"
+		elif local_fields.get("correo_personal"):
+			identity = f"correo:{local_fields['correo_personal']}"
+		else:
+			return
+		
+		job["version"] = (_cv_latest_year(job["text"]), job["position"])
+		with self._lock:
+			kept = self._newest.setdefault(identity, job)
+			if kept is job:
+				return
+			older, newer = (job, kept) if job["version"] < kept["version"] else (kept, job)
+			self._newest[identity] = newer
+			if older.get("claimed"):
+				older["superseded_by"] = newer["name"]
+			else:
+				self._mark(older, f"Versión anterior del CV de {newer['name']}")
+	
+	def claim(self, job: Dict[str, Any]) -> bool:
+		"""Reserva el trabajo para la etapa de IA; retorna False si ya se marcó como duplicado"""
+		with self._lock:
+			if job.get("status"):
+				return False
+			job["claimed"] = True
+			return True
+
+# Hashes de CVs ya guardados en la tabla personal
+def _fetch_existing_cv_hashes(supabase, hashes: list) -> set:
+	"""Retorna cuáles de los hashes ya están en personal.cv_hash (vacío si la consulta falla)"""
+	existing = set()
+	for start in range(0, len(hashes), PERSONAL_UPSERT_CHUNK_SIZE):
+		chunk = hashes[start:start + PERSONAL_UPSERT_CHUNK_SIZE]
+		try:
+			response = supabase.table("personal").select("cv_hash").in_("cv_hash", chunk).execute()
+		except Exception as e:
+			logger.warning("No se pudieron consultar los CVs ya cargados: %s", e)
+			return existing
+		existing.update(row["cv_hash"] for row in (response.data or []))
+	return existing
+
+# Subidas simultáneas a Supabase Storage durante la carga masiva
+BULK_UPLOAD_CONCURRENCY = max(1, int(os.getenv("BULK_UPLOAD_CONCURRENCY", "8")))
+
+def _bulk_upload_stage(job: Dict[str, Any], supabase) -> Dict[str, Any]:
+	"""Sube el CV al bucket "cvs" y agrega la URL pública al registro
+	
+	Si la subida falla el registro se guarda igual, sin cv_url.
+	"""
+	file_extension = "pdf" if job["type"] == PDF_MIME_TYPE else "docx"
+	file_name = _cv_storage_file_name(job["data"]["rut"], file_extension)
+	job["upload_started"] = time.perf_counter()
+	try:
+		job["data"]["cv_url"] = _upload_cv_bytes(supabase, job["buffer"].data, file_name, job["type"])
+		job["uploaded_bytes"] = len(job["buffer"])
+	except Exception as e:
+		job["upload_error"] = str(e)
+	job["upload_finished"] = time.perf_counter()
+	return job
 
 # Función para procesar múltiples CVs (carga masiva)
 def process_multiple_cvs(uploaded_files_list):
-	"""Procesa múltiples CVs de forma automática y los guarda en la base de datos"""
-	st.markdown(f"### Procesando {len(uploaded_files_list)} CVs...")
+	"""Procesa múltiples CVs de forma concurrente y los guarda en la base de datos"""
+	total = len(uploaded_files_list)
+	st.markdown(f"### Procesando {total} CVs...")
+	
+	# Los hilos del pipeline no tienen acceso a st.session_state, así que se les pasan los clientes
+	supabase = st.session_state.supabase
+	client = st.session_state.openai_client
+	
+	jobs = []
+	for position, uploaded_file in enumerate(uploaded_files_list):
+		buffer = CVBuffer.from_file(uploaded_file)
+		jobs.append({
+			"name": uploaded_file.name,
+			"type": uploaded_file.type,
+			"buffer": buffer,
+			"hash": buffer.sha256,
+			"position": position,
+			"status": None,
+			"message": ""
+		})
+	
+	# Los archivos idénticos se descartan antes de empezar; las versiones repetidas de una
+	# persona, en la etapa de extracción, sin esperar a que se lea todo el lote
+	deduper = CVBatchDeduper(_fetch_existing_cv_hashes(supabase, list({job["hash"] for job in jobs})))
+	deduper.check_files(jobs)
+	stages = [
+		("extract", lambda job: _bulk_extract_stage(job, deduper), min(BULK_MAX_CONCURRENCY, os.cpu_count() or 1)),
+		("ai", lambda job: _bulk_ai_stage(job, client, deduper), BULK_MAX_CONCURRENCY),
+		("upload", lambda job: _bulk_upload_stage(job, supabase), BULK_UPLOAD_CONCURRENCY)
+	]
 	
 	# Crear contenedor para mostrar progreso
+	progress_bar = st.progress(0.0, text=f"0/{total} CVs procesados")
 	progress_container = st.container()
 	
 	# Contadores para estadísticas
 	success_count = 0
 	error_count = 0
 	skipped_count = 0
+	duplicate_count = 0
+	
+	# Registros listos para guardar: se escriben con un upsert por grupo
+	pending_records = []
+	
+	# Estadísticas de subida a Storage (las subidas se solapan, se mide el tiempo de pared)
+	uploaded_files = 0
+	uploaded_bytes = 0
+	first_upload_start = None
+	last_upload_end = None
 	
-	# Procesar cada archivo
-	for idx, uploaded_file in enumerate(uploaded_files_list, 1):
+	def flush_pending():
+		nonlocal success_count, error_count, duplicate_count
+		if not pending_records:
+			return
+		saved = save_personal_batch_to_db(pending_records, supabase)
+		pending_records.clear()
+		with progress_container:
+			st.markdown("---")
+			st.success(f"💾 Guardados {len(saved['inserted']) + len(saved['updated'])} registros ({len(saved['inserted'])} nuevos, {len(saved['updated'])} actualizados)")
+			for rut, error in saved["failed"]:
+				st.error(f"❌ Error al guardar RUT {rut}: {error}")
+			for rut, reason in saved["duplicates"]:
+				st.info(f"🔁 No se guardó una versión anterior del RUT {rut}: {reason}")
+		success_count += len(saved["inserted"]) + len(saved["updated"])
+		error_count += len(saved["failed"])
+		duplicate_count += len(saved["duplicates"])
+	
+	# Los resultados llegan en el orden en que se subieron los archivos
+	for idx, job in enumerate(run_pipeline(jobs, stages), 1):
 		with progress_container:
 			st.markdown(f"---")
-			st.markdown(f"**CV {idx}/{len(uploaded_files_list)}: {uploaded_file.name}**")
+			st.markdown(f"**CV {idx}/{total}: {job['name']}**")
 			
-			with st.spinner(f"Procesando {uploaded_file.name}..."):
-				try:
-					# Extraer texto según el tipo de archivo
-					if uploaded_file.type == "application/pdf":
-						cv_text = extract_text_from_pdf(uploaded_file)
-					elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-						cv_text = extract_text_from_docx(uploaded_file)
-					else:
-						st.error(f"❌ Formato no soportado: {uploaded_file.name}")
-						error_count += 1
-						continue
-					
-					if not cv_text:
-						st.error(f"❌ No se pudo extraer texto de: {uploaded_file.name}")
-						error_count += 1
-						continue
-					
-					# Procesar con IA
-					processed_data = process_cv_with_ai(cv_text)
-					
-					if not processed_data:
-						st.error(f"❌ Error al procesar con IA: {uploaded_file.name}")
-						error_count += 1
-						continue
-					
-					# Validar datos mínimos
-					rut_normalized = normalize_rut(processed_data.get("rut"))
-					nombre = processed_data.get("nombre", "").strip()
-					apellido = processed_data.get("apellido", "").strip()
-					
-					if not rut_normalized or not nombre or not apellido:
-						st.warning(f"⚠️ Datos incompletos (RUT, Nombre o Apellido faltantes): {uploaded_file.name}")
-						skipped_count += 1
-						continue
-					
-					# Preparar datos para guardar
-					personal_data = {
-						"rut": rut_normalized,
-						"nombre": nombre,
-						"apellido": apellido,
-						"telefono_personal": processed_data.get("telefono_personal"),
-						"correo_personal": processed_data.get("correo_personal"),
-						"carrera_estudios": processed_data.get("carrera_estudios"),
-						"experiencia": processed_data.get("experiencia"),
-						"anos_experiencia": processed_data.get("anos_experiencia"),
-						"certificaciones": processed_data.get("certificaciones"),
-						"otros": processed_data.get("otros"),
-						"resumen_ia": processed_data.get("resumen_ia")
-					}
-					
-					# Guardar en base de datos (sin subir CV a Storage)
-					if save_personal_to_db(personal_data, None):
-						st.success(f"✅ {nombre} {apellido} (RUT: {rut_normalized}) - Guardado exitosamente")
-						success_count += 1
-					else:
-						st.error(f"❌ Error al guardar: {uploaded_file.name}")
-						error_count += 1
-					
-				except Exception as e:
-					st.error(f"❌ Error procesando {uploaded_file.name}: {str(e)}")
-					error_count += 1
+			if job["status"] is None and job.get("superseded_by"):
+				st.info(f"🔁 Duplicado, no se guardó: versión anterior del CV de {job['superseded_by']}")
+				duplicate_count += 1
+			elif job["status"] is None:
+				data = job["data"]
+				st.success(f"✅ {data['nombre']} {data['apellido']} (RUT: {data['rut']}) - Procesado")
+				if job.get("upload_error"):
+					st.warning(f"⚠️ No se pudo subir el CV a Storage, se guardará sin CV: {job['upload_error']}")
+				else:
+					uploaded_files += 1
+					uploaded_bytes += job["uploaded_bytes"]
+				first_upload_start = min(first_upload_start or job["upload_started"], job["upload_started"])
+				last_upload_end = max(last_upload_end or job["upload_finished"], job["upload_finished"])
+				pending_records.append(data)
+			elif job["status"] == "skipped":
+				st.warning(f"⚠️ {job['message']}: {job['name']}")
+				skipped_count += 1
+			elif job["status"] == "duplicate":
+				st.info(f"🔁 Duplicado, no se procesó: {job['message']}")
+				duplicate_count += 1
+			else:
+				st.error(f"❌ {job['message']}: {job['name']}")
+				error_count += 1
+		
+		if len(pending_records) >= PERSONAL_UPSERT_CHUNK_SIZE:
+			flush_pending()
+		progress_bar.progress(idx / total, text=f"{idx}/{total} CVs procesados")
+	
+	flush_pending()
 	
 	# Mostrar resumen final
 	st.markdown("---")
 	st.markdown("### 📊 Resumen del Procesamiento")
-	col1, col2, col3 = st.columns(3)
+	col1, col2, col3, col4 = st.columns(4)
 	with col1:
 		st.metric("✅ Exitosos", success_count)
 	with col2:
 		st.metric("❌ Errores", error_count)
 	with col3:
 		st.metric("⚠️ Omitidos", skipped_count)
+	with col4:
+		st.metric("🔁 Duplicados", duplicate_count)
+	
+	if uploaded_files > 0:
+		upload_seconds = max(last_upload_end - first_upload_start, 1e-6)
+		st.caption(
+			f"📤 {uploaded_files} CV(s) subidos a Storage ({uploaded_bytes / 1024 / 1024:.1f} MB) en {upload_seconds:.1f} s: "
+			f"{uploaded_files / upload_seconds:.1f} archivos/s, {uploaded_bytes / 1024 / 1024 / upload_seconds:.2f} MB/s"
+		)
 	
 	if success_count > 0:
 		st.success(f"🎉 Se procesaron y guardaron exitosamente {success_count} CV(s)")
 
+# Función para procesar un CV completo fuera del pipeline (usada por worker.py)
+def process_cv_job(name: str, file_type: str, data: bytes, client, supabase) -> Dict[str, Any]:
+	"""Extrae, procesa con IA y sube a Storage un CV, retornando el trabajo con su estado y la etapa donde terminó"""
+	job = {"name": name, "type": file_type, "buffer": CVBuffer(data, name, file_type), "status": None, "message": ""}
+	job = _bulk_extract_stage(job)
+	if job["status"]:
+		job["stage"] = "extract"
+		return job
+	job = _bulk_ai_stage(job, client)
+	job["stage"] = "ai"
+	if job["status"] is None:
+		job = _bulk_upload_stage(job, supabase)
+	return job
+
+# Cola de trabajos de la carga masiva: "sqlite", "supabase" o vacío para procesar dentro de la app
+CV_JOB_QUEUE = os.getenv("CV_JOB_QUEUE", "").strip().lower()
+CV_JOB_DB_PATH = os.getenv("CV_JOB_DB_PATH", os.path.join(".cache", "jobs.sqlite3"))
+
+# Cola SQLite compartida por todas las sesiones del proceso
+@st.cache_resource
+def _get_sqlite_job_queue(path: str) -> SQLiteJobQueue:
+	"""Retorna la cola SQLite local"""
+	return SQLiteJobQueue(path)
+
+# Función para obtener la cola de trabajos configurada
+def get_job_queue():
+	"""Retorna la cola de trabajos configurada, o None si la carga masiva se procesa dentro de la app"""
+	if CV_JOB_QUEUE == "sqlite":
+		return _get_sqlite_job_queue(CV_JOB_DB_PATH)
+	if CV_JOB_QUEUE == "supabase":
+		return SupabaseJobQueue(st.session_state.supabase)
+	return None
+
+# Función para encolar múltiples CVs (carga masiva con workers)
+def enqueue_multiple_cvs(uploaded_files_list, job_queue):
+	"""Encola los CVs para que los procese un worker y guarda los ids en la sesión"""
+	if 'cv_job_ids' not in st.session_state:
+		st.session_state.cv_job_ids = []
+	if 'cv_enqueued_files' not in st.session_state:
+		st.session_state.cv_enqueued_files = set()
+	
+	# Evitar encolar de nuevo los mismos archivos en cada rerun
+	new_files = [f for f in uploaded_files_list if f.file_id not in st.session_state.cv_enqueued_files]
+	if not new_files:
+		st.info("Todos los archivos seleccionados ya fueron encolados")
+		return
+	
+	if st.button(f"📥 Encolar {len(new_files)} CVs para procesamiento", type="primary"):
+		with st.spinner("Encolando CVs..."):
+			for uploaded_file in new_files:
+				try:
+					job_id = job_queue.enqueue(uploaded_file.name, uploaded_file.type, uploaded_file.getvalue())
+					st.session_state.cv_job_ids.append(job_id)
+					st.session_state.cv_enqueued_files.add(uploaded_file.file_id)
+				except Exception as e:
+					st.error(f"❌ Error al encolar {uploaded_file.name}: {str(e)}")
+		st.session_state.cv_jobs_pending = True
+		st.success("✅ CVs encolados. Un worker los procesará aunque cierres esta página.")
+
+# Segundos entre actualizaciones automáticas del estado mientras hay CVs en cola o en proceso
+CV_JOB_REFRESH_SECONDS = float(os.getenv("CV_JOB_REFRESH_SECONDS", "3"))
+
+# Función para mostrar el estado de los trabajos encolados
+def show_cv_job_status(job_queue):
+	"""Muestra el estado de los trabajos encolados en esta sesión
+	
+	Mientras queden trabajos pendientes, el bloque se vuelve a dibujar solo cada
+	CV_JOB_REFRESH_SECONDS (un fragmento: el resto de la página no se re-ejecuta).
+	"""
+	st.markdown("---")
+	st.markdown("### 📋 Estado de los CVs encolados")
+	refresh = CV_JOB_REFRESH_SECONDS if st.session_state.get("cv_jobs_pending", True) and CV_JOB_REFRESH_SECONDS > 0 else None
+	st.fragment(run_every=refresh)(_render_cv_job_status)(job_queue)
+
+def _render_cv_job_status(job_queue):
+	"""Métricas y tabla del estado de los trabajos de la sesión"""
+	st.button("🔄 Actualizar estado")
+	
+	try:
+		jobs = job_queue.get_status(st.session_state.cv_job_ids)
+	except Exception as e:
+		st.error(f"Error al consultar la cola: {str(e)}")
+		return
+	
+	status_labels = {
+		"queued": "⏳ En cola",
+		"running": "⚙️ Procesando",
+		"done": "✅ Exitoso",
+		"skipped": "⚠️ Omitido",
+		"failed": "❌ Error"
+	}
+	counts = {status: 0 for status in status_labels}
+	for job in jobs:
+		counts[job["status"]] = counts.get(job["status"], 0) + 1
+	
+	cols = st.columns(len(status_labels))
+	for col, (status, label) in zip(cols, status_labels.items()):
+		with col:
+			st.metric(label, counts[status])
+	
+	st.dataframe(
+		[
+			{
+				"Archivo": job["file_name"],
+				"Estado": status_labels.get(job["status"], job["status"]),
+				"Intentos": job["attempts"],
+				"Detalle": job.get("message") or ""
+			}
+			for job in jobs
+		],
+		use_container_width=True,
+		hide_index=True
+	)
+	
+	# Al cambiar entre pendiente y terminado se re-ejecuta la página para activar o detener la actualización automática
+	pending = bool(counts["queued"] or counts["running"])
+	if st.session_state.get("cv_jobs_pending", True) != pending:
+		st.session_state.cv_jobs_pending = pending
+		st.rerun()
+	
+	if pending:
+		st.caption("Los CVs se procesan en segundo plano; este estado se actualiza solo.")
+	elif st.button("🧹 Limpiar lista"):
+		st.session_state.cv_job_ids = []
+		st.session_state.pop("cv_jobs_pending", None)
+		st.rerun()
+
 # Función para procesar un solo CV (modo individual con edición)
 def process_single_cv(uploaded_file):
-	"""Procesa un solo CV y permite edición antes de guardar"""
+	"""Procesa un solo CV y permite edición antes de guardar
+	
+	Streamlit re-ejecuta el script en cada interacción (p. ej. al editar un campo); el
+	resultado se memoriza en session_state por archivo subido y hash del contenido, así
+	cada subida se extrae y se procesa con IA una sola vez.
+	"""
 	with st.spinner("Procesando CV..."):
-		# Guardar el contenido del archivo en memoria para poder usarlo después
-		uploaded_file.seek(0)
-		file_content_bytes = uploaded_file.read()
-		
-		# Crear un objeto BytesIO para poder leerlo múltiples veces
-		from io import BytesIO
-		file_for_processing = BytesIO(file_content_bytes)
-		
-		# Extraer texto según el tipo de archivo
-		if uploaded_file.type == "application/pdf":
-			cv_text = extract_text_from_pdf(file_for_processing)
-		elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-			cv_text = extract_text_from_docx(file_for_processing)
-		else:
-			st.error("Formato de archivo no soportado")
-			return
+		file_id = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+		memo = st.session_state.get("cv_single_memo")
 		
-		if not cv_text:
-			st.error("No se pudo extraer texto del archivo")
-			return
-		
-		# Guardar el contenido del archivo en session_state para usarlo al guardar
-		if 'cv_file_content' not in st.session_state:
-			st.session_state.cv_file_content = {}
-		st.session_state.cv_file_content['bytes'] = file_content_bytes
-		st.session_state.cv_file_content['type'] = uploaded_file.type
-		st.session_state.cv_file_content['name'] = uploaded_file.name
+		if memo and memo["file_id"] == file_id:
+			cv_text = memo["text"]
+			processed_data = memo["data"]
+		else:
+			# Un único buffer del archivo, compartido sin copias por el extractor, el hash y la subida
+			cv_buffer = CVBuffer.from_file(uploaded_file)
+			
+			# Hash del contenido para reutilizar la caché si el archivo ya se procesó antes
+			file_hash = cv_buffer.sha256
+			
+			# Extraer texto según el tipo de archivo
+			if uploaded_file.type not in (PDF_MIME_TYPE, DOCX_MIME_TYPE):
+				st.error("Formato de archivo no soportado")
+				return
+			
+			try:
+				cv_text = _extract_cv_text(cv_buffer, uploaded_file.type)
+			except Exception as e:
+				st.error(f"Error al leer {'PDF' if uploaded_file.type == PDF_MIME_TYPE else 'DOCX'}: {str(e)}")
+				cv_text = ""
+			
+			if not cv_text:
+				st.error("No se pudo extraer texto del archivo")
+				return
+			
+			# Guardar el contenido del archivo en session_state para usarlo al guardar
+			if 'cv_file_content' not in st.session_state:
+				st.session_state.cv_file_content = {}
+			st.session_state.cv_file_content['buffer'] = cv_buffer
+			st.session_state.cv_file_content['type'] = uploaded_file.type
+			st.session_state.cv_file_content['name'] = uploaded_file.name
+			
+			if memo and memo["hash"] == file_hash:
+				# El mismo archivo subido de nuevo: se reutiliza el resultado anterior
+				processed_data = memo["data"]
+			else:
+				# Procesar con IA
+				st.info("🤖 Procesando con IA...")
+				if CV_EXTRACTION_STREAMING:
+					processed_data = process_cv_with_ai_streaming(cv_text, st.empty(), file_hash=file_hash)
+				else:
+					processed_data = process_cv_with_ai(cv_text, file_hash=file_hash)
+			
+			# Solo se memorizan los resultados válidos, para poder reintentar si la IA falló
+			if processed_data:
+				st.session_state.cv_single_memo = {
+					"file_id": file_id,
+					"hash": file_hash,
+					"text": cv_text,
+					"data": processed_data
+				}
 		
 		# Mostrar texto extraído (opcional, en un expander)
 		with st.expander("Ver texto extraído del CV"):
 			st.text(cv_text[:2000])  # Mostrar primeros 2000 caracteres
 		
-		# Procesar con IA
-		st.info("🤖 Procesando con IA...")
-		processed_data = process_cv_with_ai(cv_text)
-		
 		if processed_data:
 			st.success("✅ CV procesado exitosamente")
 			
@@ -1153,6 +3140,84 @@ def process_single_cv(uploaded_file):
 				else:
 					st.warning("⚠️ Por favor completa los campos obligatorios (RUT, Nombre, Apellido)")
 
+# Resultados que se dibujan por página: la primera es la lista corta que ordenó la IA
+SEARCH_RESULTS_PAGE_SIZE = max(1, SEARCH_TOP_K)
+
+# Función para mostrar los resultados de la búsqueda de candidatos
+def _render_search_results(results: Dict[str, Any], preliminary: bool = False):
+	"""Muestra los candidatos encontrados; `preliminary` es un orden parcial que todavía puede cambiar
+	
+	Se dibujan de a SEARCH_RESULTS_PAGE_SIZE y solo de esos se leen los datos completos.
+	"""
+	candidates = results["candidates"]
+	if candidates:
+		if preliminary:
+			# Sin widgets: este bloque se redibuja varias veces en la misma ejecución
+			st.info(f"⏳ {len(candidates)} candidatos en orden preliminar; la IA está refinando el ranking...")
+			shown_count = SEARCH_RESULTS_PAGE_SIZE
+		else:
+			st.success(f"✅ Se encontraron {len(candidates)} candidatos")
+			shown_count = results.get("shown", SEARCH_RESULTS_PAGE_SIZE)
+		shown = fetch_candidate_details(candidates[:shown_count], results.setdefault("details", {}))
+		
+		for idx, candidate in enumerate(shown, 1):
+			with st.expander(f"#{idx} - {candidate.get('nombre', '')} {candidate.get('apellido', '')} - RUT: {candidate.get('rut', '')}"):
+				col1, col2 = st.columns(2)
+				
+				with col1:
+					st.markdown(f"**RUT:** {candidate.get('rut', 'N/A')}")
+					st.markdown(f"**Nombre:** {candidate.get('nombre', '')} {candidate.get('apellido', '')}")
+					st.markdown(f"**Teléfono:** {candidate.get('telefono_personal', 'N/A')}")
+					st.markdown(f"**Correo:** {candidate.get('correo_personal', 'N/A')}")
+					st.markdown(f"**Años de Experiencia:** {candidate.get('anos_experiencia', 'N/A')}")
+				
+				with col2:
+					st.markdown(f"**Carrera/Estudios:** {candidate.get('carrera_estudios', 'N/A')}")
+					st.markdown(f"**Activo:** {'Sí' if candidate.get('activo') else 'No'}")
+					st.markdown(f"**Contratado:** {'Sí' if candidate.get('contratado') else 'No'}")
+					puntuacion = candidate.get('puntuacion_calidad')
+					if puntuacion:
+						estrellas = "⭐" * puntuacion
+						st.markdown(f"**Puntuación de Calidad:** {estrellas} ({puntuacion}/5)")
+					else:
+						st.markdown(f"**Puntuación de Calidad:** Sin puntuación")
+					if candidate.get('proyecto_id'):
+						st.markdown(f"**Proyecto Asignado:** {candidate.get('proyecto_id')}")
+				
+				if candidate.get('experiencia'):
+					st.markdown(f"**Experiencia:**\n{candidate.get('experiencia')}")
+				
+				if candidate.get('certificaciones'):
+					st.markdown(f"**Certificaciones:**\n{candidate.get('certificaciones')}")
+				
+				if candidate.get('resumen_ia'):
+					st.markdown(f"**Resumen IA:**\n{candidate.get('resumen_ia')}")
+				
+				if candidate.get('otros'):
+					st.markdown(f"**Otros:**\n{candidate.get('otros')}")
+				
+				# El ranking solo retorna el orden; la explicación se pide por candidato y queda en caché
+				if results["mode"] == "Con IA" and not preliminary:
+					explanation = get_cached_explanation(results["description"], candidate)
+					if explanation is None and st.button("💬 ¿Por qué este candidato?", key=f"explain_{candidate['id']}"):
+						with st.spinner("Generando explicación..."):
+							explanation = explain_candidate_match(results["description"], candidate)
+					if explanation:
+						st.info(f"**Por qué este candidato:** {explanation}")
+		remaining = len(candidates) - min(shown_count, len(candidates))
+		if remaining > 0:
+			if preliminary:
+				st.caption(f"... y {remaining} candidatos más")
+			elif st.button(f"Mostrar {min(SEARCH_RESULTS_PAGE_SIZE, remaining)} candidatos más (quedan {remaining})", key="search_show_more"):
+				results["shown"] = shown_count + SEARCH_RESULTS_PAGE_SIZE
+				st.rerun()
+	elif preliminary:
+		return
+	elif results["filtered"]:
+		st.warning("No se encontraron candidatos que cumplan los requisitos detectados. Prueba desmarcando el filtro.")
+	else:
+		st.warning("No se encontraron candidatos que coincidan con los criterios")
+
 # Página de Búsqueda de Candidatos
 def page_buscar_candidatos():
 	st.title("Buscar Candidatos")
@@ -1168,53 +3233,53 @@ def page_buscar_candidatos():
 		placeholder="Ejemplo: Necesito un ingeniero civil con experiencia en inspecciones técnicas de obras, mínimo 5 años de experiencia, conocimientos en normativas de construcción..."
 	)
 	
-	if st.button("🔍 Buscar Candidatos", type="primary"):
+	search_mode = st.radio(
+		"Modo de búsqueda",
+		["Con IA", "Palabras clave (sin IA)"],
+		horizontal=True,
+		help="La búsqueda por palabras clave es instantánea y no usa OpenAI: ordena por coincidencias en estudios, certificaciones y experiencia."
+	)
+	
+	# Requisitos estrictos de la descripción, que se filtran en la base de datos antes de rankear
+	constraints = parse_search_constraints(description)
+	apply_constraints = False
+	if constraints:
+		apply_constraints = st.checkbox(
+			"Filtrar por requisitos detectados: " + " · ".join(describe_search_constraints(constraints)),
+			value=True,
+			help="Solo se consideran los candidatos que cumplen estos requisitos. Desmárcalo si la descripción los menciona solo como referencia."
+		)
+	search_constraints = constraints if apply_constraints else None
+	
+	search_clicked = st.button("🔍 Buscar Candidatos", type="primary")
+	# Los resultados se dibujan aquí y se reemplazan a medida que avanza el ranking
+	results_area = st.empty()
+	if search_clicked:
 		if description:
-			with st.spinner("Buscando candidatos con IA..."):
-				candidates = search_candidates_with_ai(description)
-				
-				if candidates:
-					st.success(f"✅ Se encontraron {len(candidates)} candidatos")
-					
-					for idx, candidate in enumerate(candidates, 1):
-						with st.expander(f"#{idx} - {candidate.get('nombre', '')} {candidate.get('apellido', '')} - RUT: {candidate.get('rut', '')}"):
-							col1, col2 = st.columns(2)
-							
-							with col1:
-								st.markdown(f"**RUT:** {candidate.get('rut', 'N/A')}")
-								st.markdown(f"**Nombre:** {candidate.get('nombre', '')} {candidate.get('apellido', '')}")
-								st.markdown(f"**Teléfono:** {candidate.get('telefono_personal', 'N/A')}")
-								st.markdown(f"**Correo:** {candidate.get('correo_personal', 'N/A')}")
-								st.markdown(f"**Años de Experiencia:** {candidate.get('anos_experiencia', 'N/A')}")
-							
-							with col2:
-								st.markdown(f"**Carrera/Estudios:** {candidate.get('carrera_estudios', 'N/A')}")
-								st.markdown(f"**Activo:** {'Sí' if candidate.get('activo') else 'No'}")
-								st.markdown(f"**Contratado:** {'Sí' if candidate.get('contratado') else 'No'}")
-								puntuacion = candidate.get('puntuacion_calidad')
-								if puntuacion:
-									estrellas = "⭐" * puntuacion
-									st.markdown(f"**Puntuación de Calidad:** {estrellas} ({puntuacion}/5)")
-								else:
-									st.markdown(f"**Puntuación de Calidad:** Sin puntuación")
-								if candidate.get('proyecto_id'):
-									st.markdown(f"**Proyecto Asignado:** {candidate.get('proyecto_id')}")
-							
-							if candidate.get('experiencia'):
-								st.markdown(f"**Experiencia:**\n{candidate.get('experiencia')}")
-							
-							if candidate.get('certificaciones'):
-								st.markdown(f"**Certificaciones:**\n{candidate.get('certificaciones')}")
-							
-							if candidate.get('resumen_ia'):
-								st.markdown(f"**Resumen IA:**\n{candidate.get('resumen_ia')}")
-							
-							if candidate.get('otros'):
-								st.markdown(f"**Otros:**\n{candidate.get('otros')}")
+			results = {
+				"description": description,
+				"mode": search_mode,
+				"filtered": bool(search_constraints),
+				"candidates": []
+			}
+			with st.spinner("Buscando candidatos con IA..." if search_mode == "Con IA" else "Buscando candidatos..."):
+				if search_mode == "Con IA":
+					for candidates, done in iter_search_candidates_with_ai(description, search_constraints):
+						results["candidates"] = candidates
+						if not done:
+							with results_area.container():
+								_render_search_results(results, preliminary=True)
 				else:
-					st.warning("No se encontraron candidatos que coincidan con los criterios")
+					results["candidates"] = search_candidates_by_keywords(description, search_constraints)
+			# Los resultados se guardan en la sesión para seguir visibles al pedir una explicación
+			st.session_state.search_results = results
 		else:
 			st.warning("Por favor ingresa una descripción del puesto")
+	
+	results = st.session_state.get("search_results")
+	if results:
+		with results_area.container():
+			_render_search_results(results)
 
 # Página de Gestión de Personal
 def page_gestionar_personal():
@@ -1469,8 +3534,13 @@ def page_gestionar_personal():
 							"updated_at": datetime.now().isoformat()
 						}
 						
+						# Recalcular el perfil de ranking y el embedding con los textos editados
+						update_data.update(ranking_snippet_fields(update_data))
+						update_data = attach_embeddings([update_data])[0]
+						
 						try:
 							supabase.table("personal").update(update_data).eq("id", person_id).execute()
+							index_personal_rows([{**update_data, "id": person_id}])
 							st.success("✅ Personal actualizado exitosamente")
 							st.rerun()
 						except Exception as e:
@@ -0,0 +1,17 @@
+"""Configuración común de las pruebas: el repositorio no es un paquete instalable."""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Las cachés y la cola locales de main.py se crean en un directorio temporal, no en .cache/
+_cache_directory = tempfile.mkdtemp(prefix="tpf-tests-")
+os.environ.setdefault("CV_CACHE_PATH", os.path.join(_cache_directory, "cv_cache.sqlite3"))
+os.environ.setdefault("CV_JOB_DB_PATH", os.path.join(_cache_directory, "jobs.sqlite3"))
+
+# main.py es un script de Streamlit: importarlo fuera de `streamlit run` funciona en modo
+# "bare", pero registra advertencias en cada llamada a st.*
+import streamlit.logger  # noqa: E402
+
+streamlit.logger.set_log_level("error")
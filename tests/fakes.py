@@ -0,0 +1,189 @@
+"""Dobles en memoria del cliente de Supabase para las pruebas.
+
+Implementan solo la parte de la API de postgrest-py que usa la aplicación. Cada
+consulta ejecutada queda en `FakeSupabase.log` como (tabla, operación, columnas, filtros).
+"""
+import re
+
+
+class FakeResponse:
+	def __init__(self, data, count=None):
+		self.data = data
+		self.count = count
+
+
+def _like(pattern: str):
+	return re.compile("^" + re.escape(pattern).replace("%", ".*").replace("_", ".") + "$", re.IGNORECASE | re.DOTALL)
+
+
+class FakeQuery:
+	def __init__(self, supabase, table: str):
+		self.supabase = supabase
+		self.table = table
+		self.operation = "select"
+		self.columns = None
+		self.payload = None
+		self.on_conflict = None
+		self.filters = []
+		self.described = []
+		self.negate = False
+		self.ordering = None
+		self.row_limit = None
+		self.count = None
+
+	def _filter(self, description, predicate):
+		negate, self.negate = self.negate, False
+		self.described.append(("not " if negate else "") + description)
+		self.filters.append((lambda row: not predicate(row)) if negate else predicate)
+		return self
+
+	def select(self, columns="*", count=None):
+		self.columns = None if columns.strip() == "*" else [column.strip() for column in columns.split(",")]
+		self.count = count
+		return self
+
+	def insert(self, rows):
+		self.operation, self.payload = "insert", rows
+		return self
+
+	def upsert(self, rows, on_conflict=None):
+		self.operation, self.payload, self.on_conflict = "upsert", rows, on_conflict
+		return self
+
+	def update(self, values):
+		self.operation, self.payload = "update", values
+		return self
+
+	def delete(self):
+		self.operation = "delete"
+		return self
+
+	@property
+	def not_(self):
+		self.negate = True
+		return self
+
+	def eq(self, column, value):
+		return self._filter(f"{column}={value}", lambda row: row.get(column) == value)
+
+	def neq(self, column, value):
+		return self._filter(f"{column}!={value}", lambda row: row.get(column) != value)
+
+	def in_(self, column, values):
+		values = list(values)
+		return self._filter(f"{column} in {values}", lambda row: row.get(column) in values)
+
+	def is_(self, column, value):
+		return self._filter(f"{column} is {value}", lambda row: row.get(column) is None)
+
+	def gte(self, column, value):
+		return self._filter(f"{column}>={value}", lambda row: row.get(column) is not None and row[column] >= value)
+
+	def lte(self, column, value):
+		return self._filter(f"{column}<={value}", lambda row: row.get(column) is not None and row[column] <= value)
+
+	def lt(self, column, value):
+		return self._filter(f"{column}<{value}", lambda row: row.get(column) is not None and row[column] < value)
+
+	def ilike(self, column, pattern):
+		regex = _like(pattern)
+		return self._filter(f"{column} ilike {pattern}", lambda row: bool(regex.match(str(row.get(column) or ""))))
+
+	def or_(self, expression):
+		parts = [(column, _like(pattern)) for column, _, pattern in (part.split(".", 2) for part in expression.split(","))]
+		return self._filter(f"or({expression})", lambda row: any(regex.match(str(row.get(column) or "")) for column, regex in parts))
+
+	def order(self, column, desc=False):
+		self.ordering = (column, desc)
+		return self
+
+	def limit(self, count):
+		self.row_limit = count
+		return self
+
+	def _project(self, row):
+		return dict(row) if self.columns is None else {column: row.get(column) for column in self.columns}
+
+	def execute(self):
+		supabase = self.supabase
+		supabase.log.append((self.table, self.operation, self.columns, self.described))
+		if supabase.fail is not None:
+			supabase.fail(self)
+		rows = supabase.tables.setdefault(self.table, [])
+		if self.operation in ("insert", "upsert"):
+			written = []
+			for values in (self.payload if isinstance(self.payload, list) else [self.payload]):
+				existing = None
+				if self.on_conflict:
+					existing = next((row for row in rows if row.get(self.on_conflict) == values.get(self.on_conflict)), None)
+				if existing is None:
+					existing = {"id": supabase.next_id()}
+					rows.append(existing)
+				existing.update(values)
+				written.append(dict(existing))
+			return FakeResponse(written)
+		matched = [row for row in rows if all(predicate(row) for predicate in self.filters)]
+		if self.operation == "update":
+			for row in matched:
+				row.update(self.payload)
+			return FakeResponse([dict(row) for row in matched])
+		if self.operation == "delete":
+			supabase.tables[self.table] = [row for row in rows if row not in matched]
+			return FakeResponse([dict(row) for row in matched])
+		total = len(matched)
+		if self.ordering:
+			column, desc = self.ordering
+			matched = sorted(matched, key=lambda row: row.get(column), reverse=desc)
+		if self.row_limit is not None:
+			matched = matched[:self.row_limit]
+		return FakeResponse([self._project(row) for row in matched], total if self.count else None)
+
+
+class FakeBucket:
+	def __init__(self, files: dict):
+		self.files = files
+
+	def upload(self, path, data, options=None):
+		self.files[path] = bytes(data)
+
+	def download(self, path):
+		return self.files[path]
+
+	def remove(self, paths):
+		for path in paths:
+			self.files.pop(path, None)
+
+	def get_public_url(self, path):
+		return f"https://storage.test/{path}"
+
+
+class FakeStorage:
+	"""Buckets de Storage en memoria: `files[bucket][ruta] = bytes`"""
+
+	def __init__(self):
+		self.files = {}
+
+	def from_(self, bucket):
+		return FakeBucket(self.files.setdefault(bucket, {}))
+
+
+class FakeSupabase:
+	"""Cliente de Supabase en memoria; `fail(query)` puede lanzar una excepción para simular errores"""
+
+	def __init__(self, tables=None):
+		self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+		self.log = []
+		self.fail = None
+		self.storage = FakeStorage()
+		self._last_id = max((row.get("id", 0) for rows in self.tables.values() for row in rows if isinstance(row.get("id"), int)), default=0)
+
+	def next_id(self):
+		self._last_id += 1
+		return self._last_id
+
+	def table(self, name):
+		return FakeQuery(self, name)
+
+	def queries(self, table=None, operation=None):
+		"""Consultas registradas, filtradas por tabla y operación"""
+		return [entry for entry in self.log if (table is None or entry[0] == table) and (operation is None or entry[1] == operation)]
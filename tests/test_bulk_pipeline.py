@@ -0,0 +1,80 @@
+"""Pruebas del pipeline por etapas de la carga masiva (run_pipeline)."""
+import threading
+import time
+
+import main
+
+
+def make_jobs(count):
+	return [{"name": f"cv{index}.pdf", "index": index, "status": None, "message": ""} for index in range(count)]
+
+
+def test_results_keep_the_upload_order():
+	def extract(job):
+		# Los primeros archivos terminan al final
+		time.sleep(0.02 * (5 - job["index"]))
+		job["stages"] = ["extract"]
+		return job
+
+	def ai(job):
+		job["stages"].append("ai")
+		return job
+
+	results = list(main.run_pipeline(make_jobs(5), [("extract", extract, 5), ("ai", ai, 2)]))
+	assert [job["index"] for job in results] == [0, 1, 2, 3, 4]
+	assert all(job["stages"] == ["extract", "ai"] and job["status"] is None for job in results)
+
+
+def test_an_error_only_stops_its_own_job():
+	reached_ai = []
+
+	def extract(job):
+		if job["index"] == 1:
+			raise ValueError("PDF dañado")
+		return job
+
+	def ai(job):
+		reached_ai.append(job["index"])
+		return job
+
+	results = list(main.run_pipeline(make_jobs(3), [("extract", extract, 2), ("ai", ai, 2)]))
+	assert [(job["status"], job["message"]) for job in results] == [(None, ""), ("error", "PDF dañado"), (None, "")]
+	assert sorted(reached_ai) == [0, 2]
+
+
+def test_a_status_ends_the_job_early_and_marked_jobs_skip_all_stages():
+	calls = []
+
+	def extract(job):
+		calls.append(("extract", job["index"]))
+		if job["index"] == 0:
+			job["status"] = "skipped"
+		return job
+
+	def ai(job):
+		calls.append(("ai", job["index"]))
+		return job
+
+	jobs = make_jobs(3)
+	jobs[2]["status"] = "duplicate"
+	results = list(main.run_pipeline(jobs, [("extract", extract, 1), ("ai", ai, 1)]))
+	assert [job["status"] for job in results] == ["skipped", None, "duplicate"]
+	assert sorted(calls) == [("ai", 1), ("extract", 0), ("extract", 1)]
+
+
+def test_stages_overlap_across_jobs():
+	first_in_ai = threading.Event()
+
+	def extract(job):
+		# El segundo archivo solo se extrae si el primero ya llegó a la etapa de IA
+		if job["index"] == 1 and not first_in_ai.wait(2):
+			raise TimeoutError("las etapas no se solapan")
+		return job
+
+	def ai(job):
+		if job["index"] == 0:
+			first_in_ai.set()
+		return job
+
+	results = list(main.run_pipeline(make_jobs(2), [("extract", extract, 1), ("ai", ai, 1)]))
+	assert [job["status"] for job in results] == [None, None]
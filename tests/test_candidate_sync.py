@@ -0,0 +1,100 @@
+"""Pruebas de la sincronización de los índices en memoria con la tabla personal (main._fetch_available_candidates)."""
+import pytest
+
+import main
+from candidate_search import BM25Index, HashingEmbedder, VectorIndex
+from fakes import FakeSupabase
+
+
+@pytest.fixture
+def indexes(monkeypatch):
+	lexical, vectors = BM25Index(), VectorIndex()
+	monkeypatch.setattr(main, "get_lexical_index", lambda: lexical)
+	monkeypatch.setattr(main, "get_candidate_index", lambda: vectors)
+	return lexical, vectors
+
+
+@pytest.fixture
+def supabase():
+	embedder = HashingEmbedder(16)
+	rows = [
+		{"id": 1, "carrera_estudios": "Ingeniero Civil", "experiencia": "Inspección de obras", "otros": "Inglés"},
+		{"id": 2, "carrera_estudios": "Constructor Civil", "experiencia": "Montaje eléctrico", "otros": ""},
+		{"id": 3, "carrera_estudios": "Contador Auditor", "experiencia": "Auditoría", "otros": ""},
+	]
+	for row in rows:
+		row.update({"activo": True, "contratado": False, "updated_at": "2026-01-01"})
+		row.update({"embedding": main._vector_to_json(embedder.embed([main.candidate_embedding_text(row)])[0]), "embedding_model": embedder.name})
+	# Un registro antiguo, guardado sin embedding
+	rows[2].update({"embedding": None, "embedding_model": None})
+	return FakeSupabase({"personal": rows})
+
+
+def stale_fetches(supabase):
+	"""Columnas de cada lectura de filas por id"""
+	return [
+		entry[2] for entry in supabase.queries("personal", "select")
+		if any(described.startswith("id in") for described in entry[3])
+	]
+
+
+def test_stale_rows_are_read_once_for_both_indexes(supabase, indexes):
+	lexical, vectors = indexes
+	embedder = HashingEmbedder(16)
+	candidates, index = main._fetch_available_candidates(supabase, None, embedder)
+	assert index is vectors
+	assert sorted(candidate["id"] for candidate in candidates) == [1, 2, 3]
+	assert "embedding" not in candidates[0]
+	
+	fetches = stale_fetches(supabase)
+	assert len(fetches) == 1
+	assert set(fetches[0]) == set(main.LEXICAL_INDEX_COLUMNS) | set(main.VECTOR_INDEX_COLUMNS)
+	assert len(lexical) == len(vectors) == 3
+	assert [candidate_id for candidate_id, _ in lexical.search("montaje")] == [2]
+	# El embedding faltante se calcula y se guarda
+	assert [entry[3] for entry in supabase.queries("personal", "update")] == [["id=3"]]
+	
+	# Sin cambios no se vuelve a leer ninguna fila
+	main._fetch_available_candidates(supabase, None, embedder)
+	assert len(stale_fetches(supabase)) == 1
+
+
+def test_only_modified_rows_are_read_again(supabase, indexes):
+	lexical, _ = indexes
+	embedder = HashingEmbedder(16)
+	main._fetch_available_candidates(supabase, None, embedder)
+	row = supabase.tables["personal"][1]
+	row.update({"experiencia": "Prevención de riesgos", "updated_at": "2026-02-01"})
+	
+	main._fetch_available_candidates(supabase, None, embedder)
+	fetches = [entry for entry in supabase.queries("personal", "select") if any(described.startswith("id in") for described in entry[3])]
+	assert len(fetches) == 2
+	assert fetches[-1][3] == ["id in [2]"]
+	assert [candidate_id for candidate_id, _ in lexical.search("riesgos")] == [2]
+	assert lexical.search("montaje") == []
+
+
+def test_each_index_reads_only_its_columns(supabase, indexes):
+	# Sin embedder (búsqueda por palabras clave) no se lee el embedding
+	candidates, index = main._fetch_available_candidates(supabase)
+	assert index is None
+	assert [set(columns) for columns in stale_fetches(supabase)] == [set(main.LEXICAL_INDEX_COLUMNS)]
+	
+	# Con otro modelo de embeddings solo el índice de vectores necesita releer las filas
+	main._fetch_available_candidates(supabase, None, HashingEmbedder(8))
+	fetches = stale_fetches(supabase)
+	assert len(fetches) == 2
+	assert set(fetches[-1]) == set(main.VECTOR_INDEX_COLUMNS)
+	assert "otros" not in fetches[-1]
+
+
+def test_a_failing_vector_sync_keeps_the_lexical_index(supabase, indexes, monkeypatch):
+	lexical, _ = indexes
+	
+	def fail(*args, **kwargs):
+		raise RuntimeError("sin conexión con OpenAI")
+	monkeypatch.setattr(main, "_ensure_candidate_embeddings", fail)
+	candidates, index = main._fetch_available_candidates(supabase, None, HashingEmbedder(16))
+	assert index is None
+	assert len(candidates) == len(lexical) == 3
+	assert [candidate["id"] for candidate in main.first_pass_rank("inspección de obras", candidates, HashingEmbedder(16), index)][0] == 1
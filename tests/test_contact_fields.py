@@ -0,0 +1,67 @@
+"""Pruebas de la detección local de RUT, correo y teléfono (extract_contact_fields)."""
+import pytest
+
+import main
+
+COMPANY_RUT = f"76.086.428-{main.rut_check_digit('76086428')}"
+
+
+@pytest.mark.parametrize("rut, expected", [
+	("12.345.678-5", "12345678"),
+	("12345678-5", "12345678"),
+	(" 9.876.543-k ", "9876543"),
+	(None, None),
+])
+def test_normalize_rut(rut, expected):
+	assert main.normalize_rut(rut) == expected
+
+
+def test_is_valid_rut_checks_the_verifier_digit():
+	assert main.rut_check_digit("12345678") == "5"
+	assert main.is_valid_rut("12.345.678-5")
+	assert not main.is_valid_rut("12.345.678-4")
+	assert not main.is_valid_rut(None)
+
+
+def test_extract_contact_fields_finds_rut_email_and_phone():
+	fields = main.extract_contact_fields("Juan Pérez\nRUT: 12.345.678-5\njuan.perez@Correo.cl.\nFono +56 9 8765 4321")
+	assert fields == {
+		"rut": "12345678",
+		"correo_personal": "juan.perez@correo.cl",
+		"telefono_personal": "+56 9 8765 4321"
+	}
+
+
+def test_invalid_rut_is_left_to_the_model_and_kept_out_of_the_phone():
+	fields = main.extract_contact_fields("RUT 12.345.678-4, teléfono 22 345 6789")
+	assert "rut" not in fields
+	assert fields["telefono_personal"] == "+56 2 2345 6789"
+	assert main.mentions_rut("RUT 12.345.678-4")
+
+
+def test_company_ruts_are_ignored():
+	experience = f"EXPERIENCIA\nInspector en Constructora ABC SpA (RUT {COMPANY_RUT})"
+	assert main.extract_contact_fields(f"Juan Pérez\n{experience}") == {}
+	assert main.extract_contact_fields(f"Juan Pérez\n12.345.678-5\n{experience}")["rut"] == "12345678"
+
+
+@pytest.mark.parametrize("label", ["RUT:", "RUN N°", "C.I.", "Cédula de identidad:"])
+def test_a_labeled_rut_wins_over_unlabeled_ones(label):
+	cv = f"Juan Pérez\n{label} 12.345.678-5\nREFERENCIAS\nPedro Soto 11.111.111-1"
+	assert main.extract_contact_fields(cv)["rut"] == "12345678"
+
+
+@pytest.mark.parametrize("cv", [
+	"RUT: 12.345.678-5\nREFERENCIAS\nPedro Soto, RUT 11.111.111-1",
+	"Juan Pérez 12.345.678-5\nPedro Soto 11.111.111-1",
+])
+def test_two_different_ruts_are_left_to_the_model(cv):
+	assert "rut" not in main.extract_contact_fields(cv)
+
+
+def test_the_same_rut_repeated_is_not_ambiguous():
+	assert main.extract_contact_fields("RUT: 12.345.678-5\nFirma: 12345678-5\nRUT 123456785")["rut"] == "12345678"
+
+
+def test_extract_contact_fields_empty_text():
+	assert main.extract_contact_fields("") == {}
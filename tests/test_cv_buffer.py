@@ -0,0 +1,29 @@
+"""Pruebas del buffer único de cada CV subido (CVBuffer)."""
+import hashlib
+from io import BytesIO
+
+import main
+
+
+def test_from_file_shares_the_uploaded_bytes():
+	data = b"%PDF-1.4 " * 1000
+	buffer = main.CVBuffer.from_file(BytesIO(data), name="cv.pdf", file_type=main.PDF_MIME_TYPE)
+	assert buffer.data is data
+	assert (buffer.name, buffer.file_type, len(buffer)) == ("cv.pdf", main.PDF_MIME_TYPE, len(data))
+
+
+def test_from_file_reads_plain_files(tmp_path):
+	path = tmp_path / "cv.docx"
+	path.write_bytes(b"PK docx")
+	with open(path, "rb") as file:
+		file.read(2)
+		buffer = main.CVBuffer.from_file(file)
+	assert buffer.data == b"PK docx"
+	assert buffer.name == str(path)
+
+
+def test_sha256_is_computed_once(monkeypatch):
+	buffer = main.CVBuffer(b"contenido")
+	assert buffer.sha256 == hashlib.sha256(b"contenido").hexdigest()
+	monkeypatch.setattr(main, "hash_file_bytes", lambda data: "no debería recalcularse")
+	assert buffer.sha256 == hashlib.sha256(b"contenido").hexdigest()
@@ -0,0 +1,50 @@
+"""Pruebas de la caché persistente de CVs (CVCache) y su desalojo LRU por tamaño."""
+import itertools
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+	# Reloj estrictamente creciente para que el orden de uso no dependa de la resolución de time.time()
+	clock = itertools.count(1)
+	monkeypatch.setattr(main.time, "time", lambda: float(next(clock)))
+	return main.CVCache(str(tmp_path / "cache" / "cv_cache.sqlite3"), max_bytes=10)
+
+
+def test_get_and_put(cache):
+	assert cache.get("text:a") is None
+	cache.put("text:a", "hola")
+	assert cache.get("text:a") == "hola"
+	cache.put("text:a", "chao")
+	assert cache.get("text:a") == "chao"
+
+
+def test_evicts_least_recently_used_entries_over_the_size_limit(cache):
+	cache.put("a", "1234")
+	cache.put("b", "1234")
+	assert cache.get("a") == "1234"
+	cache.put("c", "1234")
+	assert cache.get("b") is None
+	assert cache.get("a") == "1234"
+	assert cache.get("c") == "1234"
+
+
+def test_size_counts_utf8_bytes_and_oversized_values_are_not_stored(cache):
+	cache.put("a", "ñññ")
+	cache.put("b", "ññ")
+	# 6 + 4 bytes caben justo; uno más desaloja la entrada más antigua
+	assert cache.get("a") == "ñññ"
+	cache.put("c", "x")
+	assert cache.get("b") is None
+	cache.put("grande", "x" * 11)
+	assert cache.get("grande") is None
+	assert cache.get("a") == "ñññ"
+
+
+def test_entries_survive_reopening(tmp_path):
+	path = str(tmp_path / "cv_cache.sqlite3")
+	main.CVCache(path, max_bytes=100).put("ai:hash", "{}")
+	assert main.CVCache(path, max_bytes=100).get("ai:hash") == "{}"
@@ -0,0 +1,42 @@
+"""Pruebas de la compactación del CV por secciones antes de la llamada a OpenAI."""
+import main
+
+LONG_PARAGRAPH = " ".join(f"Inspector de obras en proyecto {number} con supervisión técnica." for number in range(800))
+
+
+def test_truncate_to_tokens():
+	text = "palabra " * 100
+	truncated = main.truncate_to_tokens(text, 10)
+	assert 0 < main.count_tokens(truncated) <= 10
+	assert text.startswith(truncated)
+	assert main.truncate_to_tokens("corto", 10) == "corto"
+	assert main.truncate_to_tokens("algo", 0) == ""
+
+
+def test_compact_cv_text_keeps_short_cvs_and_drops_page_furniture():
+	cv = "\n".join(["Juan Pérez - CV", "EXPERIENCIA", "Inspector", "Página 1", "Juan Pérez - CV", "FORMACIÓN", "Ingeniero", "Página 2", "Juan Pérez - CV"])
+	assert main.compact_cv_text(cv, 1000) == "Juan Pérez - CV\nEXPERIENCIA\nInspector\nFORMACIÓN\nIngeniero"
+
+
+def test_compact_cv_text_cuts_a_long_line_instead_of_dropping_the_section():
+	cv = f"Juan Perez\nRUT 12.345.678-5\nEXPERIENCIA\n{LONG_PARAGRAPH}\nFORMACIÓN\nIngeniero Civil, Universidad Adolfo Ibáñez"
+	compacted = main.compact_cv_text(cv, 1000)
+	assert main.count_tokens(compacted) <= 1000
+	assert "EXPERIENCIA\nInspector de obras en proyecto 0" in compacted
+	assert compacted.endswith("FORMACIÓN\nIngeniero Civil, Universidad Adolfo Ibáñez")
+
+
+def test_compact_cv_text_single_line_cv_is_not_empty():
+	compacted = main.compact_cv_text(LONG_PARAGRAPH, 500)
+	assert compacted
+	assert 450 <= main.count_tokens(compacted) <= 500
+	assert LONG_PARAGRAPH.startswith(compacted)
+
+
+def test_compact_cv_text_gives_unused_allowance_to_other_sections():
+	cv = f"Juan Perez\nCERTIFICACIONES\nLicencia SEC clase A\nEXPERIENCIA\n{LONG_PARAGRAPH}"
+	compacted = main.compact_cv_text(cv, 1000)
+	# Experiencia recibe más que su 45 % porque las demás secciones usan poco
+	experience = compacted.split("EXPERIENCIA\n", 1)[1]
+	assert main.count_tokens(experience) > 900
+	assert "Licencia SEC clase A" in compacted
@@ -0,0 +1,101 @@
+"""Pruebas de la detección de CVs duplicados de la carga masiva (CVBatchDeduper)."""
+import pytest
+
+import main
+from fakes import FakeSupabase
+
+
+def make_job(position, text="", file_hash=None, name=None):
+	name = name or f"cv{position}.pdf"
+	return {
+		"name": name,
+		"type": main.PDF_MIME_TYPE,
+		"buffer": main.CVBuffer(text.encode("utf-8"), name, main.PDF_MIME_TYPE),
+		"hash": file_hash or f"hash-{position}",
+		"position": position,
+		"text": text,
+		"local_fields": main.extract_contact_fields(text),
+		"status": None,
+		"message": ""
+	}
+
+
+def test_check_files_marks_identical_files_and_cvs_already_saved():
+	jobs = [make_job(0, file_hash="a"), make_job(1, file_hash="a"), make_job(2, file_hash="guardado"), make_job(3, file_hash="b")]
+	main.CVBatchDeduper({"guardado"}).check_files(jobs)
+	assert [(job["status"], job["message"]) for job in jobs] == [
+		(None, ""),
+		("duplicate", "Archivo idéntico a cv0.pdf"),
+		("duplicate", "CV ya cargado anteriormente"),
+		(None, "")
+	]
+
+
+def test_the_newest_version_of_a_person_is_kept():
+	deduper = main.CVBatchDeduper(set())
+	newer = make_job(0, "RUT: 12.345.678-5\nInspector 2019 - actualidad")
+	older = make_job(1, "RUT: 12.345.678-5\nInspector 2015 - 2019")
+	other = make_job(2, "RUT: 11.111.111-1\nSoldador 2010")
+	for job in (newer, older, other):
+		deduper.check_person(job)
+	assert newer["status"] is None
+	assert (older["status"], older["message"]) == ("duplicate", "Versión anterior del CV de cv0.pdf")
+	assert other["status"] is None
+
+
+def test_on_a_tie_the_later_upload_wins_and_email_identifies_without_rut():
+	deduper = main.CVBatchDeduper(set())
+	first = make_job(0, "ana@correo.cl\n2020")
+	second = make_job(1, "ANA@correo.cl\n2020")
+	anonymous = make_job(2, "sin datos de contacto")
+	for job in (first, second, anonymous):
+		deduper.check_person(job)
+	assert first["status"] == "duplicate"
+	assert second["status"] is None
+	assert anonymous["status"] is None and "version" not in anonymous
+
+
+def test_an_older_version_already_in_the_ai_stage_is_superseded():
+	deduper = main.CVBatchDeduper(set())
+	older = make_job(0, "RUT: 12.345.678-5\n2015")
+	deduper.check_person(older)
+	assert deduper.claim(older)
+	newer = make_job(1, "RUT: 12.345.678-5\n2023")
+	deduper.check_person(newer)
+	assert older["status"] is None and older["superseded_by"] == "cv1.pdf"
+	assert deduper.claim(newer)
+
+
+def test_claim_refuses_jobs_marked_while_waiting():
+	deduper = main.CVBatchDeduper(set())
+	older = make_job(0, "RUT: 12.345.678-5\n2015")
+	newer = make_job(1, "RUT: 12.345.678-5\n2023")
+	deduper.check_person(older)
+	deduper.check_person(newer)
+	assert not deduper.claim(older)
+	assert not older.get("claimed")
+
+
+def test_people_already_in_the_table_are_processed_as_updates(monkeypatch):
+	# Un CV nuevo de una persona registrada no se descarta ni consulta la tabla por archivo
+	supabase = FakeSupabase({"personal": [{"id": 1, "rut": "12345678", "cv_hash": "cv-anterior"}]})
+	monkeypatch.setattr(main, "_extract_cv_text", lambda buffer, file_type: buffer.data.decode("utf-8"))
+	jobs = [make_job(0, "RUT: 12.345.678-5\n2023"), make_job(1, "RUT: 12.345.678-5\n2015")]
+	for job in jobs:
+		del job["text"], job["local_fields"]
+
+	deduper = main.CVBatchDeduper(main._fetch_existing_cv_hashes(supabase, [job["hash"] for job in jobs]))
+	deduper.check_files(jobs)
+	reached_ai = []
+
+	def ai_stage(job):
+		if deduper.claim(job):
+			reached_ai.append(job["name"])
+		return job
+
+	stages = [("extract", lambda job: main._bulk_extract_stage(job, deduper), 1), ("ai", ai_stage, 2)]
+	results = list(main.run_pipeline(jobs, stages))
+	assert [job["status"] for job in results] == [None, "duplicate"]
+	assert reached_ai == ["cv0.pdf"]
+	assert len(supabase.log) == 1
+	assert supabase.log[0][:3] == ("personal", "select", ["cv_hash"])
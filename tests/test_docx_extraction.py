@@ -0,0 +1,78 @@
+"""Pruebas del lector de DOCX en streaming (cv_extraction.extract_docx_text)."""
+import zipfile
+from io import BytesIO
+
+from cv_extraction import extract_docx_text
+
+NAMESPACES = (
+	'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+	'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+)
+
+
+def paragraph(*runs: str) -> str:
+	return "<w:p>" + "".join(f"<w:r><w:t>{run}</w:t></w:r>" for run in runs) + "</w:p>"
+
+
+def table(*rows) -> str:
+	return "<w:tbl>" + "".join(
+		"<w:tr>" + "".join(f"<w:tc>{''.join(paragraph(text) for text in cell)}</w:tc>" for cell in row) + "</w:tr>"
+		for row in rows
+	) + "</w:tbl>"
+
+
+def build_docx(body: str, headers=(), footers=()) -> bytes:
+	output = BytesIO()
+	with zipfile.ZipFile(output, "w") as archive:
+		archive.writestr("word/document.xml", f"<w:document {NAMESPACES}><w:body>{body}</w:body></w:document>")
+		for number, content in enumerate(headers, start=1):
+			archive.writestr(f"word/header{number}.xml", f"<w:hdr {NAMESPACES}>{content}</w:hdr>")
+		for number, content in enumerate(footers, start=1):
+			archive.writestr(f"word/footer{number}.xml", f"<w:ftr {NAMESPACES}>{content}</w:ftr>")
+	return output.getvalue()
+
+
+def test_paragraphs_keep_their_order_and_join_runs():
+	data = build_docx(paragraph("Juan ", "Pérez") + "<w:p/>" + paragraph("Inspector de obras"))
+	assert extract_docx_text(data) == "Juan Pérez\nInspector de obras"
+
+
+def test_table_rows_become_lines_with_label_and_value():
+	body = paragraph("DATOS PERSONALES") + table(
+		[["RUT"], ["12.345.678-5"]],
+		[["Correo"], ["juan@correo.cl"]],
+		[["Experiencia"], ["Inspector", "Supervisor"]],
+	) + paragraph("FORMACIÓN")
+	data = build_docx(body)
+	assert extract_docx_text(data).split("\n") == [
+		"DATOS PERSONALES",
+		"RUT | 12.345.678-5",
+		"Correo | juan@correo.cl",
+		"Experiencia | Inspector Supervisor",
+		"FORMACIÓN",
+	]
+	assert extract_docx_text(BytesIO(data)) == extract_docx_text(data)
+
+
+def test_headers_go_first_and_footers_last_without_repeats():
+	data = build_docx(
+		paragraph("EXPERIENCIA"),
+		headers=[paragraph("Juan Pérez - CV"), paragraph("Juan Pérez - CV")],
+		footers=[paragraph("juan@correo.cl"), paragraph("Juan Pérez - CV")],
+	)
+	assert extract_docx_text(data).split("\n") == ["Juan Pérez - CV", "EXPERIENCIA", "juan@correo.cl"]
+
+
+def test_alternate_content_fallback_is_not_duplicated():
+	text_box = (
+		"<w:p><w:r><mc:AlternateContent>"
+		f"<mc:Choice>{paragraph('RUT 12.345.678-5')}</mc:Choice>"
+		f"<mc:Fallback>{paragraph('RUT 12.345.678-5')}</mc:Fallback>"
+		"</mc:AlternateContent></w:r></w:p>"
+	)
+	assert extract_docx_text(build_docx(text_box)) == "RUT 12.345.678-5"
+
+
+def test_tabs_and_breaks_are_kept():
+	body = "<w:p><w:r><w:t>Fono</w:t><w:tab/><w:t>+56 9 1234 5678</w:t><w:br/><w:t>Santiago</w:t></w:r></w:p>"
+	assert extract_docx_text(build_docx(body)) == "Fono\t+56 9 1234 5678\nSantiago"
@@ -0,0 +1,160 @@
+"""Pruebas del arriendo, la renovación y los reintentos de las colas de trabajos."""
+import time
+
+import pytest
+
+import job_queue
+import worker
+from fakes import FakeSupabase
+from job_queue import SQLiteJobQueue, SupabaseJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+	return SQLiteJobQueue(str(tmp_path / "jobs" / "queue.db"))
+
+
+def test_claim_takes_each_job_once(queue):
+	first = queue.enqueue("a.pdf", "pdf", b"uno")
+	second = queue.enqueue("b.pdf", "pdf", b"dos")
+	job = queue.claim("w1", lease_seconds=60)
+	assert (job["id"], job["status"], job["attempts"], job["worker_id"]) == (first, "running", 1, "w1")
+	assert queue.get_payload(job) == b"uno"
+	assert queue.claim("w2", lease_seconds=60)["id"] == second
+	assert queue.claim("w3", lease_seconds=60) is None
+
+
+def test_expired_lease_is_claimed_again(queue):
+	job_id = queue.enqueue("a.pdf", "pdf", b"uno")
+	queue.claim("w1", lease_seconds=-1)
+	job = queue.claim("w2", lease_seconds=60)
+	assert (job["id"], job["attempts"]) == (job_id, 2)
+	assert queue.claim("w3", lease_seconds=60) is None
+
+
+def test_expired_lease_without_attempts_left_fails(queue, monkeypatch):
+	monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 1)
+	job_id = queue.enqueue("a.pdf", "pdf", b"uno")
+	queue.claim("w1", lease_seconds=-1)
+	assert queue.claim("w2", lease_seconds=60) is None
+	[status] = queue.get_status([job_id])
+	assert (status["status"], status["message"]) == ("failed", "Arriendo vencido sin más intentos")
+
+
+def test_renew_keeps_the_job_from_being_claimed(queue):
+	queue.enqueue("a.pdf", "pdf", b"uno")
+	job = queue.claim("w1", lease_seconds=-1)
+	assert queue.renew(job, 60)
+	assert queue.claim("w2", lease_seconds=60) is None
+
+
+def test_a_worker_that_lost_the_lease_cannot_finish_retry_or_renew(queue):
+	job_id = queue.enqueue("a.pdf", "pdf", b"uno")
+	stale = queue.claim("w1", lease_seconds=-1)
+	current = queue.claim("w2", lease_seconds=60)
+	assert not queue.renew(stale, 60)
+	assert not queue.finish(stale, "done", "resultado tardío")
+	assert not queue.retry(stale, "error tardío")
+	assert queue.finish(current, "done", "ok")
+	assert queue.get_status([job_id])[0]["message"] == "ok"
+
+
+def test_retry_waits_for_backoff(queue):
+	job_id = queue.enqueue("a.pdf", "pdf", b"uno")
+	assert queue.retry(queue.claim("w1", lease_seconds=60), "error temporal")
+	assert queue.claim("w1", lease_seconds=60) is None
+	assert queue.get_status([job_id])[0]["status"] == "queued"
+
+
+def test_retry_requeues_the_job(queue, monkeypatch):
+	monkeypatch.setattr(job_queue, "JOB_RETRY_BASE_SECONDS", 0)
+	job_id = queue.enqueue("a.pdf", "pdf", b"uno")
+	queue.retry(queue.claim("w1", lease_seconds=60), "error temporal")
+	job = queue.claim("w2", lease_seconds=60)
+	assert (job["id"], job["attempts"]) == (job_id, 2)
+
+
+def test_retry_without_attempts_left_fails(queue, monkeypatch):
+	monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 1)
+	job_id = queue.enqueue("a.pdf", "pdf", b"uno")
+	queue.retry(queue.claim("w1", lease_seconds=60), "error permanente")
+	assert queue.get_status([job_id])[0]["status"] == "failed"
+
+
+def test_finish_is_final_and_drops_the_payload(queue):
+	job_id = queue.enqueue("a.pdf", "pdf", b"uno")
+	job = queue.claim("w1", lease_seconds=-1)
+	assert queue.finish(job, "done", "ok")
+	assert queue.claim("w2", lease_seconds=60) is None
+	assert queue.get_status([job_id])[0]["status"] == "done"
+	assert queue.get_payload(job) == b""
+	assert queue.get_status([]) == []
+
+
+def test_supabase_queue_claims_once_and_deletes_the_file_when_finished():
+	supabase = FakeSupabase()
+	queue = SupabaseJobQueue(supabase)
+	job_id = queue.enqueue("a.pdf", "application/pdf", b"uno")
+	files = supabase.storage.files["cvs"]
+	assert list(files) == [f"jobs/{job_id}.pdf"]
+
+	stale = queue.claim("w1", lease_seconds=-1)
+	assert queue.get_payload(stale) == b"uno"
+	current = queue.claim("w2", lease_seconds=60)
+	assert (current["id"], current["attempts"], current["worker_id"]) == (job_id, 2, "w2")
+	assert queue.claim("w3", lease_seconds=60) is None
+
+	assert not queue.renew(stale, 60)
+	assert not queue.finish(stale, "done", "resultado tardío")
+	assert files
+	assert queue.renew(current, 60)
+	assert queue.finish(current, "done", "ok")
+	assert files == {}
+	assert queue.get_status([job_id])[0]["message"] == "ok"
+
+
+def test_supabase_queue_retry_keeps_the_file(monkeypatch):
+	monkeypatch.setattr(job_queue, "JOB_RETRY_BASE_SECONDS", 0)
+	supabase = FakeSupabase()
+	queue = SupabaseJobQueue(supabase)
+	job_id = queue.enqueue("a.pdf", "application/pdf", b"uno")
+	assert queue.retry(queue.claim("w1", lease_seconds=60), "error temporal")
+	assert supabase.storage.files["cvs"]
+	assert queue.claim("w2", lease_seconds=60)["id"] == job_id
+
+
+def test_worker_renews_the_lease_of_a_slow_job(queue, monkeypatch):
+	queue.enqueue("a.pdf", "application/pdf", b"uno")
+	job = queue.claim("w1", lease_seconds=0.3)
+	stolen = []
+
+	def slow_job(name, file_type, data, client, supabase):
+		# El trabajo dura más que el arriendo; otro worker intenta tomarlo mientras tanto
+		for _ in range(4):
+			time.sleep(0.15)
+			stolen.append(queue.claim("w2", lease_seconds=60))
+		return {"status": "skipped", "message": "RUT no encontrado en el CV"}
+
+	monkeypatch.setattr(worker.main, "process_cv_job", slow_job)
+	worker.process_job(queue, job, supabase=None, client=None, lease_seconds=0.3)
+	assert stolen == [None] * 4
+	assert queue.get_status([job["id"]])[0]["status"] == "skipped"
+
+
+def test_worker_does_not_save_after_losing_the_lease(queue, monkeypatch):
+	queue.enqueue("a.pdf", "application/pdf", b"uno")
+	job = queue.claim("w1", lease_seconds=0.3)
+	saved = []
+
+	def slow_job(name, file_type, data, client, supabase):
+		# Otro worker retoma el trabajo (como si este proceso hubiera estado detenido más que el arriendo)
+		queue._conn.execute("UPDATE jobs SET worker_id = 'w2', attempts = attempts + 1 WHERE id = ?", (job["id"],))
+		time.sleep(0.3)
+		return {"status": None, "data": {"rut": "12345678", "nombre": "Ana", "apellido": "Soto"}}
+
+	monkeypatch.setattr(worker.main, "process_cv_job", slow_job)
+	monkeypatch.setattr(worker.main, "save_personal_batch_to_db", lambda *args, **kwargs: saved.append(args))
+	monkeypatch.setattr(worker.main, "get_embedder", lambda client: None)
+	worker.process_job(queue, job, supabase=None, client=None, lease_seconds=0.3)
+	assert saved == []
+	assert queue.get_status([job["id"]])[0]["status"] == "running"
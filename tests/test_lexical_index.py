@@ -0,0 +1,40 @@
+"""Pruebas del stemmer, el tokenizador y el índice BM25 (candidate_search)."""
+from candidate_search import BM25Index, stem_es, tokenize_es
+
+
+def test_stem_es_joins_number_and_gender():
+	assert stem_es("ingenieros") == stem_es("ingeniera") == stem_es("ingeniero") == "ingenier"
+	assert stem_es("certificaciones") == stem_es("certificación".replace("ó", "o"))
+	assert stem_es("obra") == "obra"
+	assert stem_es("2019") == "2019"
+
+
+def test_tokenize_es_folds_accents_drops_stopwords_and_keeps_qualified_letters():
+	assert tokenize_es("Los Ingenieros Eléctricos, licencia clase B") == ["ingenier", "electric", "licenci", "clas", "clase b"]
+	assert tokenize_es("") == []
+
+
+def test_bm25_ranks_matching_documents_and_weights_certifications():
+	index = BM25Index()
+	index.sync({
+		1: ("a", {"experiencia": "Inspector de obras civiles"}),
+		2: ("a", {"certificaciones": "Inspector de obras certificado"}),
+		3: ("a", {"experiencia": "Contador auditor"})
+	})
+	results = index.search("inspectora de obra")
+	assert [doc_id for doc_id, _ in results] == [2, 1]
+	assert index.search("inspectora de obra", allowed_ids={1}) == [results[1]]
+	assert index.search("de la") == []
+
+
+def test_bm25_sync_only_touches_changed_rows():
+	index = BM25Index()
+	assert index.sync({1: ("a", {"experiencia": "soldador"}), 2: ("a", {"experiencia": "electricista"})}) == 2
+	assert index.stale_ids({1: "a", 2: "b", 3: "a"}) == [2, 3]
+	# La fila 1 no cambió de firma: no se lee (puede venir como None)
+	assert index.sync({1: ("a", None), 2: ("b", {"experiencia": "soldador"})}) == 1
+	assert {doc_id for doc_id, _ in index.search("soldador")} == {1, 2}
+	assert index.sync({1: ("a", None)}) == 1
+	assert len(index) == 1
+	index.upsert(1, {"experiencia": "electricista"}, "c")
+	assert index.search("soldador") == []
@@ -0,0 +1,17 @@
+"""Pruebas del parser de JSON parcial usado al mostrar la extracción en streaming."""
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("text, expected", [
+	('{"nombre": "Ju', {"nombre": "Ju"}),
+	('{"a": 1, "b', {"a": 1}),
+	('{"a": 1, "b": ', {"a": 1}),
+	('{"a": [1, 2', {"a": [1, 2]}),
+	('{"a": "x\\', {"a": "x"}),
+	('', {}),
+	('{"a": 1, "b": 2}', {"a": 1, "b": 2}),
+])
+def test_parse_partial_json(text, expected):
+	assert main.parse_partial_json(text) == expected
@@ -0,0 +1,71 @@
+"""Pruebas de la extracción de PDF por rangos de páginas (cv_extraction.extract_pdf_text)."""
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pytest
+from PyPDF2 import PageObject, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+import cv_extraction
+from cv_extraction import _page_ranges, extract_pdf_text
+
+
+def build_pdf(page_count: int) -> bytes:
+	"""PDF con una línea de texto distinta en cada página"""
+	writer = PdfWriter()
+	font = writer._add_object(DictionaryObject({
+		NameObject("/Type"): NameObject("/Font"),
+		NameObject("/Subtype"): NameObject("/Type1"),
+		NameObject("/BaseFont"): NameObject("/Helvetica"),
+	}))
+	for page_number in range(page_count):
+		page = PageObject.create_blank_page(width=612, height=792)
+		stream = DecodedStreamObject()
+		stream.set_data(f"BT /F1 12 Tf 40 760 Td (Pagina {page_number}) Tj ET".encode("latin-1"))
+		page[NameObject("/Contents")] = writer._add_object(stream)
+		page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+		writer.add_page(page)
+	output = BytesIO()
+	writer.write(output)
+	return output.getvalue()
+
+
+class CountingPool(ThreadPoolExecutor):
+	"""Pool en hilos que registra los rangos enviados"""
+
+	def __init__(self):
+		super().__init__(max_workers=4)
+		self.ranges = []
+
+	def submit(self, function, source, start, stop):
+		self.ranges.append((start, stop))
+		return super().submit(function, source, start, stop)
+
+
+@pytest.mark.parametrize("page_count, chunks, expected", [
+	(10, 3, [(0, 4), (4, 7), (7, 10)]),
+	(2, 4, [(0, 1), (1, 2)]),
+])
+def test_page_ranges(page_count, chunks, expected):
+	assert _page_ranges(page_count, chunks) == expected
+
+
+def test_small_documents_stay_in_process(monkeypatch):
+	monkeypatch.setattr(cv_extraction, "_get_pool", lambda workers: pytest.fail("no debería usar el pool"))
+	assert extract_pdf_text(build_pdf(3), max_workers=4, min_parallel_pages=8).split("\n") == ["Pagina 0", "Pagina 1", "Pagina 2"]
+
+
+def test_parallel_path_sends_one_range_per_worker_and_keeps_page_order(monkeypatch):
+	pool = CountingPool()
+	monkeypatch.setattr(cv_extraction, "_get_pool", lambda workers: pool)
+	data = build_pdf(9)
+	text = extract_pdf_text(data, max_workers=4, min_parallel_pages=0)
+	pool.shutdown()
+	assert text.split("\n") == [f"Pagina {number}" for number in range(9)]
+	# Cada rango recibe una copia del PDF: una por proceso, no más
+	assert pool.ranges == [(0, 3), (3, 5), (5, 7), (7, 9)]
+
+
+def test_parallel_path_in_child_processes():
+	data = build_pdf(6)
+	assert extract_pdf_text(data, max_workers=2, min_parallel_pages=0) == extract_pdf_text(data, max_workers=1)
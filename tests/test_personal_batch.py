@@ -0,0 +1,53 @@
+"""Pruebas del guardado masivo de personal (save_personal_batch_to_db)."""
+import pytest
+
+import main
+from candidate_search import HashingEmbedder
+from fakes import FakeSupabase
+
+
+def person(rut, **fields):
+	return {"rut": rut, "nombre": "Ana", "apellido": "Soto", **fields}
+
+
+@pytest.fixture
+def embedder():
+	return HashingEmbedder(16)
+
+
+def test_counts_inserted_and_updated_with_one_upsert_per_chunk(embedder):
+	supabase = FakeSupabase({"personal": [{"id": 1, "rut": "11111111", "nombre": "Antes"}]})
+	saved = main.save_personal_batch_to_db(
+		[person("11.111.111-1"), person("22222222"), person("33333333")], supabase, chunk_size=2, embedder=embedder
+	)
+	assert saved == {"inserted": ["22222222", "33333333"], "updated": ["11111111"], "failed": [], "duplicates": []}
+	assert len(supabase.queries("personal", "upsert")) == 2
+	assert {row["rut"]: row["nombre"] for row in supabase.tables["personal"]}["11111111"] == "Ana"
+	assert all(row["embedding_model"] == embedder.name for row in supabase.tables["personal"])
+
+
+def test_keeps_the_last_record_of_a_repeated_rut(embedder):
+	supabase = FakeSupabase()
+	saved = main.save_personal_batch_to_db(
+		[person("22222222", nombre="Primera"), person("22.222.222-2", nombre="Segunda")], supabase, embedder=embedder
+	)
+	assert saved["inserted"] == ["22222222"]
+	assert saved["duplicates"] == [("22222222", "RUT duplicado en el lote")]
+	assert [row["nombre"] for row in supabase.tables["personal"]] == ["Segunda"]
+
+
+def test_a_failing_record_does_not_fail_its_chunk(embedder):
+	supabase = FakeSupabase()
+
+	def fail(query):
+		if query.operation == "upsert" and any(row["rut"] == "44444444" for row in query.payload):
+			raise ValueError("violación de restricción")
+	supabase.fail = fail
+
+	saved = main.save_personal_batch_to_db(
+		[person("33333333"), person("44444444"), person(None), person("55555555")], supabase, embedder=embedder
+	)
+	assert saved["inserted"] == ["33333333", "55555555"]
+	assert saved["failed"] == [(None, "RUT faltante"), ("44444444", "violación de restricción")]
+	assert sum(len(values) for values in saved.values()) == 4
+	assert sorted(row["rut"] for row in supabase.tables["personal"]) == ["33333333", "55555555"]
@@ -0,0 +1,120 @@
+"""Pruebas del ranking map-reduce por grupos (iter_rank_candidates) con el LLM simulado."""
+import pytest
+
+import main
+from candidate_search import BM25Index
+from fakes import FakeSupabase
+
+# Relevancia "real" de cada candidato; el orden de la lista es el de la primera pasada
+RELEVANCE = {1: 5, 2: 3, 3: 2, 4: 1, 5: 9, 6: 4, 7: 0}
+
+
+@pytest.fixture
+def candidates(monkeypatch):
+	# Grupos de 4 (la referencia más 3 candidatos) sin el ranking final, salvo que la prueba lo active
+	monkeypatch.setattr(main, "RANKING_SHARD_MAX_CANDIDATES", 4)
+	monkeypatch.setattr(main, "RANKING_ANCHORS", 1)
+	monkeypatch.setattr(main, "RANKING_FINAL_RERANK", 0)
+	return [{"id": candidate_id, "ranking_snippet": f"Candidato {candidate_id}", "ranking_snippet_tokens": 5} for candidate_id in RELEVANCE]
+
+
+def fake_ranker(calls, failing_ids=(), generous_ids=(2,)):
+	"""Puntúa con RELEVANCE; el grupo que incluye a `generous_ids` suma 5 a todos y el que incluye a `failing_ids` falla"""
+	def rank_shard(client, description, shard):
+		ids = [candidate["id"] for candidate in shard]
+		calls.append(ids)
+		if any(candidate_id in ids for candidate_id in failing_ids):
+			raise RuntimeError("respuesta inválida")
+		bias = 5 if any(candidate_id in ids for candidate_id in generous_ids) else 0
+		return {str(candidate_id): float(RELEVANCE[candidate_id] + bias) for candidate_id in ids}
+	return rank_shard
+
+
+def final_order(candidates):
+	return [candidate["id"] for candidate in main.rank_candidates(None, "inspector", candidates)]
+
+
+def test_shards_share_the_anchor_and_calibration_removes_a_generous_shard(candidates, monkeypatch):
+	calls = []
+	monkeypatch.setattr(main, "_rank_shard", fake_ranker(calls))
+	assert final_order(candidates) == [5, 1, 6, 2, 3, 4, 7]
+	assert sorted(calls) == [[1, 2, 3, 4], [1, 5, 6, 7]]
+
+
+def test_partial_orders_are_yielded_before_the_final_one(candidates, monkeypatch):
+	monkeypatch.setattr(main, "_rank_shard", fake_ranker([]))
+	results = list(main.iter_rank_candidates(None, "inspector", candidates))
+	assert [done for _, done in results] == [False, True]
+	partial, _ = results[0]
+	# Solo un grupo terminó: sus candidatos se reordenan entre sus propias posiciones
+	assert sorted(candidate["id"] for candidate in partial) == sorted(RELEVANCE)
+	assert partial[0]["id"] == 1
+
+
+def test_a_failed_shard_keeps_first_pass_order_and_is_left_out_of_calibration(candidates, monkeypatch):
+	calls = []
+	monkeypatch.setattr(main, "_rank_shard", fake_ranker(calls, failing_ids=(5,)))
+	order = final_order(candidates)
+	assert sorted(order) == sorted(RELEVANCE)
+	# El grupo que respondió no se desplaza (sin la referencia del grupo fallido) y el que falló queda en su orden previo
+	assert order == [1, 2, 3, 4, 5, 6, 7]
+
+
+def test_fallback_scores_follow_the_first_pass_position():
+	shard = [{"id": 3}, {"id": 1}]
+	scores = main._fallback_shard_scores(shard, {"1": 0, "2": 1, "3": 2})
+	assert scores["1"] == 10
+	assert scores["1"] > scores["3"] > 1
+
+
+def test_all_shards_failing_raises(candidates, monkeypatch):
+	monkeypatch.setattr(main, "_rank_shard", fake_ranker([], failing_ids=(1,)))
+	with pytest.raises(RuntimeError, match="respuesta inválida"):
+		final_order(candidates)
+
+
+def test_a_failing_final_rerank_keeps_the_calibrated_order(candidates, monkeypatch):
+	calls = []
+	ranker = fake_ranker(calls)
+
+	def rank_shard(client, description, shard):
+		if len(calls) == 2:
+			calls.append("final")
+			raise RuntimeError("timeout")
+		return ranker(client, description, shard)
+	monkeypatch.setattr(main, "_rank_shard", rank_shard)
+	monkeypatch.setattr(main, "RANKING_FINAL_RERANK", 3)
+	assert final_order(candidates) == [5, 1, 6, 2, 3, 4, 7]
+	assert calls[-1] == "final"
+
+
+def test_small_lists_are_ranked_in_one_call(candidates, monkeypatch):
+	calls = []
+	monkeypatch.setattr(main, "_rank_shard", fake_ranker(calls, generous_ids=()))
+	assert final_order(candidates[:4]) == [1, 2, 3, 4]
+	assert calls == [[1, 2, 3, 4]]
+	assert list(main.iter_rank_candidates(None, "inspector", [])) == [([], True)]
+
+
+def test_shortlisted_rows_missing_when_ranking_keep_their_first_pass_place(monkeypatch):
+	supabase = FakeSupabase({"personal": [
+		{"id": candidate_id, "activo": True, "contratado": False, "updated_at": "2026-01-01", "anos_experiencia": years,
+			"ranking_snippet": f"Candidato {candidate_id}", "ranking_snippet_tokens": 5}
+		for candidate_id, years in ((1, 10), (2, 8), (3, 6), (4, 1))
+	]})
+	
+	def delete_before_ranking(query):
+		# El candidato 2 se borra entre el primer puntaje y la lectura de los perfiles de ranking
+		if query.columns and "ranking_snippet" in query.columns:
+			supabase.tables["personal"] = [row for row in supabase.tables["personal"] if row["id"] != 2]
+	supabase.fail = delete_before_ranking
+	monkeypatch.setattr(main, "get_embedder", lambda client=None: None)
+	monkeypatch.setattr(main, "get_lexical_index", lambda index=BM25Index(): index)
+	monkeypatch.setattr(main, "_search_cache_key", lambda *args: None)
+	monkeypatch.setattr(main, "SEARCH_TOP_K", 3)
+	monkeypatch.setattr(main, "_rank_shard", lambda client, description, shard: {"1": 4.0, "3": 9.0})
+	
+	results = list(main._iter_search_with_ai(supabase, None, "inspector"))
+	assert [candidate["id"] for candidate in results[0][0]] == [1, 2, 3, 4]
+	assert [candidate["id"] for candidate in results[-1][0]] == [3, 1, 2, 4]
+	assert all(done for _, done in results[1:])
@@ -0,0 +1,192 @@
+"""Pruebas del limitador de OpenAI (baldes de fichas, concurrencia AIMD) y del cupo de los streams."""
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import main
+from main import OpenAIRateLimiter, _parse_reset_seconds
+
+
+def acquire_in_thread(limiter, tokens):
+	"""Llama a acquire en otro hilo; el evento indica cuándo obtuvo el cupo"""
+	acquired = threading.Event()
+	threading.Thread(target=lambda: (limiter.acquire(tokens), acquired.set()), daemon=True).start()
+	return acquired
+
+
+def test_acquire_debits_both_buckets_and_release_corrects_tokens():
+	limiter = OpenAIRateLimiter(60, 1000, 2)
+	limiter.acquire(300)
+	assert limiter._requests == pytest.approx(59, abs=0.01)
+	assert limiter._tokens == pytest.approx(700, abs=1)
+	assert limiter._in_flight == 1
+	limiter.release(300, used_tokens=100)
+	assert limiter._tokens == pytest.approx(900, abs=1)
+	assert limiter._in_flight == 0
+
+
+def test_acquire_waits_for_the_token_bucket_to_refill():
+	limiter = OpenAIRateLimiter(6000, 600, 4)
+	limiter.acquire(600)
+	start = time.monotonic()
+	# 600 tokens por minuto = 10 por segundo: 5 tokens tardan ~0,5 s
+	limiter.acquire(5)
+	assert time.monotonic() - start >= 0.4
+
+
+def test_requests_larger_than_the_bucket_do_not_block_forever():
+	limiter = OpenAIRateLimiter(60, 100, 1)
+	limiter.acquire(5000)
+	assert limiter._tokens == pytest.approx(0, abs=1)
+
+
+def test_concurrency_cap_blocks_until_release():
+	limiter = OpenAIRateLimiter(600, 100000, 1)
+	limiter.acquire(10)
+	acquired = acquire_in_thread(limiter, 10)
+	assert not acquired.wait(0.2)
+	limiter.release(10)
+	assert acquired.wait(2)
+
+
+def test_rate_limit_halves_concurrency_and_pauses():
+	limiter = OpenAIRateLimiter(600, 100000, 4)
+	limiter.acquire(10)
+	limiter.fail(retry_after=0.3, rate_limited=True)
+	assert limiter.concurrency == 2
+	start = time.monotonic()
+	limiter.acquire(10)
+	assert time.monotonic() - start >= 0.25
+	limiter.fail()
+	assert limiter.concurrency == 2
+
+
+def test_successes_grow_concurrency_additively():
+	limiter = OpenAIRateLimiter(600, 100000, 4)
+	limiter.acquire(10)
+	limiter.fail(retry_after=0.01, rate_limited=True)
+	assert limiter.concurrency == 2
+	for _ in range(2):
+		limiter.acquire(10)
+		limiter.release(10)
+	assert limiter.concurrency == 3
+	for _ in range(10):
+		limiter.acquire(10)
+		limiter.release(10)
+	assert limiter.concurrency == 4
+
+
+def test_headers_adjust_capacity_and_balance():
+	limiter = OpenAIRateLimiter(60, 1000, 2)
+	limiter.acquire(10)
+	limiter.release(10, headers={
+		"x-ratelimit-limit-requests": "no es número",
+		"x-ratelimit-limit-tokens": "2000",
+		"x-ratelimit-remaining-tokens": "50"
+	})
+	assert limiter.request_capacity == 60
+	assert limiter.token_capacity == 2000
+	assert limiter._tokens <= 50
+
+
+@pytest.mark.parametrize("value, expected", [("6m0s", 360), ("250ms", 0.25), ("1.5s", 1.5)])
+def test_parse_reset_seconds(value, expected):
+	assert _parse_reset_seconds(value) == pytest.approx(expected)
+
+
+class FakeStream:
+	"""Respuesta en streaming de OpenAI: chunks de texto y un último chunk con el uso"""
+
+	def __init__(self, texts, total_tokens, broken=False):
+		self.chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None) for text in texts]
+		self.chunks.append(SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=total_tokens)))
+		self.broken = broken
+		self.closed = False
+
+	def __iter__(self):
+		if self.broken:
+			raise httpx.ReadError("conexión cortada")
+		yield from self.chunks
+
+	def close(self):
+		self.closed = True
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+	limiter = OpenAIRateLimiter(600, 100000, 2)
+	monkeypatch.setattr(main, "get_openai_limiter", lambda: limiter)
+	monkeypatch.setattr(main, "_openai_backoff_delay", lambda attempt, retry_after=None: 0.0)
+	return limiter
+
+
+def fake_client(*streams):
+	calls = []
+
+	def create(**kwargs):
+		calls.append(kwargs)
+		stream = streams[len(calls) - 1]
+		return SimpleNamespace(headers={}, parse=lambda: stream)
+	client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=create))))
+	return client, calls
+
+
+def stream_call(client):
+	return main.call_openai(client, 100, model="gpt-4o-mini", messages=[{"role": "user", "content": "hola"}], stream=True)
+
+
+def test_a_stream_that_is_never_iterated_holds_no_slot(limiter):
+	client, calls = fake_client(FakeStream(["{}"], 10))
+	stream = stream_call(client)
+	assert calls == []
+	assert limiter._in_flight == 0
+	del stream
+	assert limiter._in_flight == 0
+
+
+def test_the_slot_is_held_until_the_stream_ends_and_released_with_real_usage(limiter):
+	response = FakeStream(['{"a": ', '1}'], total_tokens=20)
+	client, calls = fake_client(response)
+	stream = stream_call(client)
+	assert next(stream).choices[0].delta.content == '{"a": '
+	assert limiter._in_flight == 1
+	tokens_while_streaming = limiter._tokens
+	assert len(list(stream)) == 2
+	assert limiter._in_flight == 0
+	assert response.closed
+	assert calls[0]["stream_options"] == {"include_usage": True}
+	# La reserva estimada se corrige con los 20 tokens reales
+	assert limiter._tokens > tokens_while_streaming
+
+
+def test_closing_a_stream_early_releases_the_slot(limiter):
+	response = FakeStream(["a", "b", "c"], 10)
+	client, _ = fake_client(response)
+	stream = stream_call(client)
+	next(stream)
+	stream.close()
+	assert limiter._in_flight == 0
+	assert response.closed
+
+
+def test_a_stream_broken_before_the_first_chunk_is_retried(limiter):
+	broken = FakeStream(["x"], 10, broken=True)
+	client, calls = fake_client(broken, FakeStream(["{}"], 10))
+	chunks = list(stream_call(client))
+	assert len(calls) == 2
+	assert broken.closed
+	assert chunks[0].choices[0].delta.content == "{}"
+	assert limiter._in_flight == 0
+
+
+def test_abandoning_the_cv_extraction_stream_releases_the_slot(limiter, tmp_path, monkeypatch):
+	monkeypatch.setattr(main, "get_cv_cache", lambda: main.CVCache(str(tmp_path / "cache.sqlite3"), 10**6))
+	client, _ = fake_client(FakeStream(['{"nombre": "Ana"', ', "apellido": "Soto"}'], 10))
+	updates = main._stream_cv_extraction(client, "Ana Soto\nInspectora")
+	assert next(updates) == {"nombre": "Ana"}
+	assert limiter._in_flight == 1
+	updates.close()
+	assert limiter._in_flight == 0
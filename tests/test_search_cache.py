@@ -0,0 +1,67 @@
+"""Pruebas de la caché de resultados de búsqueda (expiración y desalojo LRU)."""
+import main
+from main import SearchResultCache
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 1000.0
+	
+	def __call__(self):
+		return self.now
+
+
+def make_cache(monkeypatch, max_entries=2, ttl_seconds=60):
+	clock = FakeClock()
+	monkeypatch.setattr(main.time, "monotonic", clock)
+	return SearchResultCache(max_entries, ttl_seconds), clock
+
+
+def test_results_are_copies_without_embeddings(monkeypatch):
+	cache, _ = make_cache(monkeypatch)
+	cache.put("a", [{"id": 1, "embedding": [0.1, 0.2], "puntuacion_ia": 8}])
+	result = cache.get("a")
+	assert result == [{"id": 1, "puntuacion_ia": 8}]
+	result[0]["puntuacion_ia"] = 0
+	assert cache.get("a")[0]["puntuacion_ia"] == 8
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+	cache, clock = make_cache(monkeypatch, ttl_seconds=60)
+	cache.put("a", [{"id": 1}])
+	clock.now += 60
+	assert cache.get("a") == [{"id": 1}]
+	clock.now += 1
+	assert cache.get("a") is None
+	assert "a" not in cache._entries
+
+
+def test_the_least_recently_used_entry_is_evicted(monkeypatch):
+	cache, _ = make_cache(monkeypatch, max_entries=2)
+	cache.put("a", [{"id": 1}])
+	cache.put("b", [{"id": 2}])
+	# Leer "a" la deja como la más reciente, así que se desaloja "b"
+	assert cache.get("a") is not None
+	cache.put("c", [{"id": 3}])
+	assert cache.get("b") is None
+	assert cache.get("a") == [{"id": 1}]
+	assert cache.get("c") == [{"id": 3}]
+
+
+def test_putting_an_existing_key_refreshes_it(monkeypatch):
+	cache, clock = make_cache(monkeypatch, max_entries=2, ttl_seconds=60)
+	cache.put("a", [{"id": 1}])
+	cache.put("b", [{"id": 2}])
+	clock.now += 50
+	cache.put("a", [{"id": 10}])
+	cache.put("c", [{"id": 3}])
+	assert cache.get("b") is None
+	clock.now += 50
+	assert cache.get("a") == [{"id": 10}]
+
+
+def test_a_disabled_cache_stores_nothing(monkeypatch):
+	for max_entries, ttl_seconds in ((0, 60), (2, 0)):
+		cache, _ = make_cache(monkeypatch, max_entries=max_entries, ttl_seconds=ttl_seconds)
+		cache.put("a", [{"id": 1}])
+		assert cache.get("a") is None
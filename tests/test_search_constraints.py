@@ -0,0 +1,68 @@
+"""Pruebas de la lectura de requisitos obligatorios de la descripción (candidate_search)."""
+import re
+
+import pytest
+
+import main
+from candidate_search import constraint_like_pattern, describe_search_constraints, parse_search_constraints
+from fakes import FakeSupabase
+
+
+def like_matches(pattern: str, text: str) -> bool:
+	"""Evalúa un patrón ILIKE de PostgreSQL sobre un texto"""
+	regex = "".join(".*" if char == "%" else "." if char == "_" else re.escape(char) for char in pattern)
+	return re.fullmatch(regex, text, flags=re.IGNORECASE | re.DOTALL) is not None
+
+
+@pytest.mark.parametrize("description, expected", [
+	(
+		"Necesito un ingeniero civil con mínimo 5 años de experiencia y licencia clase A",
+		{"min_anos_experiencia": 5, "carreras": ["ingeniero civil"], "certificaciones": ["licencia clase a"]}
+	),
+	(
+		"Ingeniero eléctrico o constructor civil, certificación SEC, puntuación mínima 4",
+		{"min_puntuacion_calidad": 4, "carreras": ["ingeniero electrico", "constructor civil"], "certificaciones": ["sec"]}
+	),
+	("entre 3 y 5 años de experiencia", {"min_anos_experiencia": 3}),
+	("inspecciones técnicas de obras, deseable ingeniero civil", {}),
+	("", {}),
+])
+def test_parse_search_constraints(description, expected):
+	assert parse_search_constraints(description) == expected
+
+
+def test_constraint_like_pattern_is_accent_and_gender_insensitive():
+	pattern = constraint_like_pattern("ingeniero eléctrico")
+	assert pattern == "%_ng_n__r%_l_ctr_c%"
+	assert like_matches(pattern, "Ingeniera Eléctrica")
+	assert like_matches(pattern, "INGENIERO ELECTRICO industrial")
+	assert not like_matches(pattern, "Ingeniero Civil")
+	assert like_matches(constraint_like_pattern("licencia clase A"), "Licencia de conducir clase A")
+	assert not like_matches(constraint_like_pattern("licencia clase A"), "Licencia de conducir clase B")
+
+
+def test_describe_search_constraints():
+	constraints = parse_search_constraints("Ingeniero civil, 5 años de experiencia, licencia clase B, puntuación mínima 4")
+	assert describe_search_constraints(constraints) == [
+		"Carrera: ingeniero civil",
+		"Experiencia: 5 años o más",
+		"Certificación: licencia clase b",
+		"Puntuación de calidad: 4/5 o más",
+	]
+
+
+def test_constraints_are_pushed_down_to_supabase():
+	supabase = FakeSupabase({"personal": [
+		{"id": 1, "carrera_estudios": "Ingeniera Eléctrica", "anos_experiencia": 6, "certificaciones": "SEC clase A"},
+		{"id": 2, "carrera_estudios": "Constructor Civil", "anos_experiencia": 8, "certificaciones": "SEC"},
+		{"id": 3, "carrera_estudios": "Ingeniero Eléctrico", "anos_experiencia": 2, "certificaciones": "SEC"},
+		{"id": 4, "carrera_estudios": "Contador Auditor", "anos_experiencia": 9, "certificaciones": "SEC"},
+	]})
+	constraints = parse_search_constraints("Ingeniero eléctrico o constructor civil, mínimo 5 años de experiencia, certificación SEC")
+	rows = main._apply_search_constraints(supabase.table("personal").select("id"), constraints).execute().data
+	assert [row["id"] for row in rows] == [1, 2]
+	assert supabase.log[0][3] == [
+		"anos_experiencia>=5",
+		"or(carrera_estudios.ilike.%_ng_n__r%_l_ctr_c%,carrera_estudios.ilike.%c_nstr_ct_r%c_v_l%)",
+		"certificaciones ilike %s_c%",
+	]
@@ -0,0 +1,36 @@
+"""Pruebas del índice de vectores en memoria (candidate_search.VectorIndex)."""
+import numpy as np
+import pytest
+
+from candidate_search import HashingEmbedder, VectorIndex
+
+
+def test_vector_index_search_is_exact_and_respects_allowed_ids():
+	index = VectorIndex()
+	assert index.search([1, 0], 2) == []
+	assert index.sync({1: ("a", [1, 0]), 2: ("a", [0, 1]), 3: ("a", [1, 1])})
+	assert [item_id for item_id, _ in index.search([1, 0.1], 2)] == [1, 3]
+	assert index.search([1, 0], 5, allowed_ids={2, 9}) == [(2, pytest.approx(0.0))]
+	assert index.search([1, 0], 5, allowed_ids=set()) == []
+	np.testing.assert_allclose(index.similarities([1, 0], [3, 9]), [np.sqrt(0.5), 0], atol=1e-6)
+
+
+def test_vector_index_sync_keeps_unchanged_vectors():
+	index = VectorIndex()
+	index.sync({1: ("a", [1, 0]), 2: ("a", [0, 1])})
+	assert not index.sync({1: ("a", None), 2: ("a", None)})
+	assert index.stale_ids({1: "a", 2: "b"}) == [2]
+	assert index.sync({2: ("b", [1, 0])}, remove_missing=False)
+	assert len(index) == 2
+	np.testing.assert_allclose(index.similarities([1, 0], [1, 2]), [1, 1], atol=1e-6)
+	assert index.sync({2: ("b", None)})
+	assert len(index) == 1
+
+
+def test_hashing_embedder_ranks_related_text_first():
+	embedder = HashingEmbedder(256)
+	index = VectorIndex()
+	texts = {1: "inspector de obras civiles", 2: "contador auditor", 3: "inspectora técnica de obra"}
+	index.sync({item_id: ("a", vector) for item_id, vector in zip(texts, embedder.embed(list(texts.values())))})
+	[query] = embedder.embed(["inspector de obra"])
+	assert {item_id for item_id, _ in index.search(query, 2)} == {1, 3}
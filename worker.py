@@ -0,0 +1,156 @@
+"""Worker de ingesta de CVs: toma trabajos de la cola y los procesa fuera de Streamlit.
+
+Se pueden ejecutar varios workers a la vez (en el mismo equipo con la cola SQLite, o
+en varios equipos con la cola de Supabase).
+
+Uso:
+	python worker.py [--queue sqlite|supabase] [--poll-interval 2] [--lease-seconds 300] [--once]
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+
+import streamlit.logger
+
+# main.py ejecuta llamadas de Streamlit al importarse; fuera de `streamlit run` solo generan advertencias
+streamlit.logger.set_log_level("error")
+
+from openai import OpenAI  # noqa: E402
+from supabase import create_client  # noqa: E402
+
+import main  # noqa: E402
+from job_queue import SQLiteJobQueue, SupabaseJobQueue  # noqa: E402
+
+logger = logging.getLogger("worker")
+
+
+class LeaseHeartbeat:
+	"""Renueva el arriendo de un trabajo en un hilo aparte mientras se procesa
+
+	Las llamadas a OpenAI pueden reintentarse con esperas de hasta un minuto, así que un
+	trabajo lento puede durar más que el arriendo. Se renueva cada tercio del arriendo;
+	si la cola responde que el trabajo ya no es de este worker, `lost` queda en True.
+	"""
+
+	def __init__(self, queue, job, lease_seconds: float):
+		self.queue = queue
+		self.job = job
+		self.lease_seconds = lease_seconds
+		self.lost = False
+		self._stop = threading.Event()
+		self._thread = threading.Thread(target=self._run, name=f"lease-{job['id']}", daemon=True)
+
+	def _run(self):
+		while not self._stop.wait(self.lease_seconds / 3):
+			try:
+				if not self.queue.renew(self.job, self.lease_seconds):
+					logger.warning("Se perdió el arriendo de %s", self.job["file_name"])
+					self.lost = True
+					return
+			except Exception as e:
+				# Un error de red no significa que se perdió el arriendo: se reintenta en el siguiente ciclo
+				logger.warning("No se pudo renovar el arriendo de %s: %s", self.job["file_name"], e)
+
+	def __enter__(self):
+		self._thread.start()
+		return self
+
+	def __exit__(self, *exc_info):
+		self._stop.set()
+		self._thread.join()
+
+
+def _log_if_lost(job, applied: bool):
+	if not applied:
+		logger.warning("%s ya no es de este worker; se descarta su resultado", job["file_name"])
+
+
+def process_job(queue, job, supabase, client, lease_seconds: float = 300.0):
+	"""Procesa un trabajo de la cola renovando su arriendo y registra su resultado"""
+	with LeaseHeartbeat(queue, job, lease_seconds) as heartbeat:
+		try:
+			data = queue.get_payload(job)
+			result = main.process_cv_job(job["file_name"], job["file_type"], data, client, supabase)
+		except Exception as e:
+			logger.exception("Error procesando %s", job["file_name"])
+			_log_if_lost(job, queue.retry(job, str(e)))
+			return
+
+		if result["status"] == "skipped":
+			_log_if_lost(job, queue.finish(job, "skipped", result["message"]))
+			return
+		if result["status"] == "error":
+			# Los errores de extracción no cambian al reintentar; los de IA pueden ser transitorios
+			if result.get("stage") == "extract":
+				_log_if_lost(job, queue.finish(job, "failed", result["message"]))
+			else:
+				_log_if_lost(job, queue.retry(job, result["message"]))
+			return
+
+		# Otro worker ya retomó el trabajo: que sea él quien guarde el registro
+		if heartbeat.lost:
+			_log_if_lost(job, False)
+			return
+		record = result["data"]
+		saved = main.save_personal_batch_to_db([record], supabase, embedder=main.get_embedder(client))
+		if saved["failed"]:
+			_log_if_lost(job, queue.retry(job, f"Error al guardar: {saved['failed'][0][1]}"))
+			return
+		action = "actualizado" if saved["updated"] else "guardado"
+		_log_if_lost(job, queue.finish(job, "done", f"{record['nombre']} {record['apellido']} (RUT: {record['rut']}) {action}"))
+
+
+def main_loop():
+	parser = argparse.ArgumentParser(description="Procesa los CVs encolados desde la Carga Masiva")
+	parser.add_argument("--queue", choices=["sqlite", "supabase"], default=main.CV_JOB_QUEUE or "sqlite")
+	parser.add_argument("--poll-interval", type=float, default=2.0, help="Segundos de espera cuando la cola está vacía")
+	parser.add_argument("--lease-seconds", type=float, default=300.0, help="Duración del arriendo de cada trabajo")
+	parser.add_argument("--once", action="store_true", help="Procesar los trabajos disponibles y terminar")
+	args = parser.parse_args()
+
+	logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+	supabase_url = os.getenv("SUPABASE_URL")
+	supabase_key = os.getenv("SUPABASE_KEY")
+	openai_key = os.getenv("OPENAI_API_KEY")
+	if not supabase_url or not supabase_key or not openai_key:
+		raise SystemExit("Configura SUPABASE_URL, SUPABASE_KEY y OPENAI_API_KEY en las variables de entorno")
+
+	supabase = create_client(supabase_url, supabase_key)
+	# Los reintentos los maneja main.call_openai, coordinados con el limitador del proceso
+	client = OpenAI(api_key=openai_key, max_retries=0)
+	if args.queue == "supabase":
+		queue = SupabaseJobQueue(supabase)
+	else:
+		queue = SQLiteJobQueue(main.CV_JOB_DB_PATH)
+
+	worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+	stopping = False
+
+	def request_stop(signum, frame):
+		nonlocal stopping
+		logger.info("Señal %s recibida, terminando después del trabajo actual", signum)
+		stopping = True
+
+	signal.signal(signal.SIGINT, request_stop)
+	signal.signal(signal.SIGTERM, request_stop)
+
+	logger.info("Worker %s escuchando la cola %s", worker_id, args.queue)
+	while not stopping:
+		job = queue.claim(worker_id, args.lease_seconds)
+		if job is None:
+			if args.once:
+				break
+			time.sleep(args.poll_interval)
+			continue
+		logger.info("Procesando %s (intento %s/%s)", job["file_name"], job["attempts"], job["max_attempts"])
+		process_job(queue, job, supabase, client, args.lease_seconds)
+
+
+if __name__ == "__main__":
+	main_loop()